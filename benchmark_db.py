@@ -0,0 +1,395 @@
+import argparse
+import os
+import random
+import sqlite3
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+import numpy as np
+from dateutil.relativedelta import relativedelta
+
+import database
+from models.budget_models import BudgetModel
+from models.column_cache import get_column_cache
+from models.read_cache import read_cache
+from models.transaction import TransactionModel
+
+CATEGORIES = ['Housing', 'Food', 'Transportation', 'Utilities', 'Entertainment',
+              'Health', 'Shopping', 'Travel', 'Education', 'Salary']
+TYPES = ['Expense', 'Expense', 'Expense', 'Income']
+
+
+def build_database(path, rows):
+    """Create a transactions table with `rows` synthetic rows spread over ten years."""
+    database.set_database(path)
+    database.init_db()
+
+    random.seed(42)
+    start = date(2015, 1, 1)
+
+    def generate():
+        for _ in range(rows):
+            day = start + timedelta(days=random.randrange(3650))
+            yield (day.isoformat(), random.choice(CATEGORIES), round(random.uniform(1, 500), 2),
+                   random.choice(TYPES), '', 'GBP', None)
+
+    stats = TransactionModel().add_transactions_bulk(generate())
+    print(f"Bulk insert: {stats['rows']:,} rows in {stats['seconds']:.2f}s "
+          f"({stats['rows_per_second']:,.0f} rows/s)")
+
+
+def time_calls(fn, calls):
+    start = time.perf_counter()
+    for i in range(calls):
+        fn(i)
+    return (time.perf_counter() - start) / calls
+
+
+def benchmark_connections(path, rows, calls):
+    """Per-call latency of a primary-key lookup: connect-per-call vs. the managed connection."""
+    def per_call_connect(i):
+        conn = sqlite3.connect(path)
+        conn.execute("SELECT * FROM transactions WHERE id = ?", (i % rows + 1,)).fetchone()
+        conn.close()
+
+    def managed(i):
+        with database.db_connection() as conn:
+            conn.execute("SELECT * FROM transactions WHERE id = ?", (i % rows + 1,)).fetchone()
+
+    before = time_calls(per_call_connect, calls)
+    after = time_calls(managed, calls)
+    print(f"Connection per call: {before * 1e6:10.1f} us/call")
+    print(f"Managed connection:  {after * 1e6:10.1f} us/call  ({before / after:.1f}x faster)")
+
+
+# What startup used to run before schema versioning: init_db() plus the
+# init_table() of each model, every one on its own fresh connection.
+LEGACY_STARTUP = (
+    ("CREATE TABLE IF NOT EXISTS transactions (id INTEGER PRIMARY KEY, date TEXT, category TEXT, "
+     "amount REAL, type TEXT, comment TEXT, currency TEXT, goal_id INTEGER)",
+     "CREATE TABLE IF NOT EXISTS debts (id INTEGER PRIMARY KEY, name TEXT, balance REAL, apr REAL)",
+     "CREATE TABLE IF NOT EXISTS categories (id INTEGER PRIMARY KEY, name TEXT UNIQUE)",
+     "PRAGMA table_info(transactions)"),
+    ("CREATE TABLE IF NOT EXISTS debts (id INTEGER PRIMARY KEY, name TEXT, balance REAL, apr REAL)",
+     "PRAGMA table_info(debts)",
+     "UPDATE debts SET original_balance = balance WHERE original_balance IS NULL",
+     "UPDATE debts SET current_balance = balance WHERE current_balance IS NULL"),
+    ("CREATE TABLE IF NOT EXISTS investment_savings_goals (id INTEGER PRIMARY KEY, name TEXT NOT NULL, "
+     "target_amount REAL NOT NULL, current_amount REAL NOT NULL, target_date TEXT NOT NULL, "
+     "goal_type TEXT NOT NULL, category TEXT NOT NULL, risk_level TEXT NOT NULL, "
+     "creation_date TEXT NOT NULL, annual_return REAL)",
+     "CREATE TABLE IF NOT EXISTS investments (id INTEGER PRIMARY KEY, name TEXT NOT NULL, "
+     "amount REAL NOT NULL, type TEXT NOT NULL, date TEXT NOT NULL, annual_return REAL, risk_level TEXT)"),
+    ("CREATE TABLE IF NOT EXISTS savings_goals (id INTEGER PRIMARY KEY, name TEXT NOT NULL, "
+     "target_amount REAL NOT NULL, current_amount REAL NOT NULL, target_date TEXT NOT NULL, "
+     "category TEXT NOT NULL)",),
+    ("CREATE TABLE IF NOT EXISTS monthly_budgets (id INTEGER PRIMARY KEY, month TEXT NOT NULL, "
+     "category TEXT NOT NULL, amount REAL NOT NULL, item_type TEXT DEFAULT 'Mandatory', "
+     "total_income REAL DEFAULT 0)",),
+)
+
+
+def benchmark_startup(path, runs=20):
+    """Schema bootstrap cost on an up-to-date database: legacy DDL vs. the user_version check."""
+    def legacy():
+        for statements in LEGACY_STARTUP:
+            conn = sqlite3.connect(path)
+            for statement in statements:
+                conn.execute(statement).fetchall()
+            conn.commit()
+            conn.close()
+
+    def versioned():
+        database.set_database(path)
+        database.init_db()
+
+    before = time_calls(lambda i: legacy(), runs)
+    after = time_calls(lambda i: versioned(), runs)
+    print(f"Legacy startup DDL:  {before * 1e3:10.2f} ms")
+    print(f"Versioned startup:   {after * 1e3:10.2f} ms  ({before / after:.1f}x faster)")
+
+
+# The aggregate queries as they ran before transaction_rollups existed
+LEGACY_AGGREGATES = (
+    "SELECT category_id, SUM(amount) FROM transactions WHERE type = 'Expense' GROUP BY category_id",
+    "SELECT strftime('%Y-%m', date) as month, SUM(CASE WHEN type = 'Income' THEN amount ELSE 0 END), "
+    "SUM(CASE WHEN type = 'Expense' THEN amount ELSE 0 END) FROM transactions GROUP BY month ORDER BY month LIMIT 12",
+)
+
+
+def benchmark_aggregates(calls=20):
+    """Dashboard aggregate latency: scanning transactions vs. reading transaction_rollups."""
+    transaction_model = TransactionModel()
+
+    def legacy(i):
+        with database.db_connection() as conn:
+            for statement in LEGACY_AGGREGATES:
+                conn.execute(statement).fetchall()
+
+    def rollups(i):
+        read_cache.clear()
+        transaction_model.get_spending_by_category()
+        transaction_model.get_income_vs_expenses()
+
+    before = time_calls(legacy, calls)
+    after = time_calls(rollups, calls)
+    print(f"Aggregates from transactions: {before * 1e3:10.2f} ms")
+    print(f"Aggregates from rollups:      {after * 1e3:10.2f} ms  ({before / after:.1f}x faster)")
+
+
+def legacy_cash_flow(transactions):
+    # EnhancedSmartSavingsAdvisor.analyze_cash_flow before TransactionFrame
+    income = sum(float(t[3]) for t in transactions if t[4] == 'Income')
+    expenses = {
+        category: sum(float(t[3]) for t in transactions if t[2] == category and t[4] == 'Expense')
+        for category in set(t[2] for t in transactions if t[4] == 'Expense')
+    }
+    return income, expenses
+
+
+def legacy_monthly_expenses(transactions):
+    totals = {}
+    for t in transactions:
+        if t[4] == 'Expense':
+            key = (t[1][:7], t[2])
+            totals[key] = totals.get(key, 0.0) + t[3]
+    return totals
+
+
+def benchmark_analytics(runs=3):
+    """Cash-flow and monthly analytics: loops over row tuples vs. TransactionFrame."""
+    transaction_model = TransactionModel()
+    start, end = date(1900, 1, 1), date(2100, 1, 1)
+
+    load_start = time.perf_counter()
+    transactions = transaction_model.get_transactions_in_range(start, end)
+    tuples_load = time.perf_counter() - load_start
+    load_start = time.perf_counter()
+    get_column_cache().rebuild()
+    cache_build = time.perf_counter() - load_start
+    load_start = time.perf_counter()
+    frame = transaction_model.get_transaction_frame()
+    frame_load = time.perf_counter() - load_start
+
+    def legacy(i):
+        legacy_cash_flow(transactions)
+        legacy_monthly_expenses(transactions)
+
+    def vectorized(i):
+        expenses = frame.expenses
+        frame.total(frame.income)
+        frame.sum_by_category(expenses)
+        frame.sum_by_bucket('month', expenses, by_category=True)
+
+    before = time_calls(legacy, runs)
+    after = time_calls(vectorized, runs)
+    print(f"Analytics load as tuples:     {tuples_load * 1e3:10.2f} ms ({len(transactions):,} rows)")
+    print(f"Analytics column cache build: {cache_build * 1e3:10.2f} ms")
+    print(f"Analytics load as frame:      {frame_load * 1e3:10.2f} ms (memory-mapped from the cache)")
+    print(f"Analytics over tuples:        {before * 1e3:10.2f} ms")
+    print(f"Analytics over frame:         {after * 1e3:10.2f} ms  ({before / after:.1f}x faster)")
+
+
+def benchmark_money_sums(calls=5):
+    """SUM over amounts as REAL major units (the old schema) vs. INTEGER minor units."""
+    with database.db_connection() as conn:
+        conn.execute("DROP TABLE IF EXISTS temp.real_amounts")
+        conn.execute("CREATE TEMP TABLE real_amounts AS SELECT amount / 100.0 AS amount FROM transactions")
+        exact = conn.execute("SELECT SUM(amount) FROM transactions").fetchone()[0]
+        drift = conn.execute("SELECT SUM(amount) FROM real_amounts").fetchone()[0] * 100 - exact
+
+        real = time_calls(lambda i: conn.execute("SELECT SUM(amount) FROM real_amounts").fetchone(), calls)
+        integer = time_calls(lambda i: conn.execute("SELECT SUM(amount) FROM transactions").fetchone(), calls)
+        conn.execute("DROP TABLE temp.real_amounts")
+
+    frame = TransactionModel().get_transaction_frame()
+    as_float = frame.amount / 100.0
+    float_sum = time_calls(lambda i: as_float.sum(), calls)
+    int_sum = time_calls(lambda i: frame.amount.sum(), calls)
+    print(f"Money SUM over REAL:          {real * 1e3:10.2f} ms (off by {drift:.6f} minor units)")
+    print(f"Money SUM over INTEGER:       {integer * 1e3:10.2f} ms (exact)")
+    print(f"Money sum of float64 column:  {float_sum * 1e3:10.2f} ms "
+          f"(off by {float(np.sum(as_float)) * 100 - int(frame.amount.sum()):.6f} minor units)")
+    print(f"Money sum of int64 column:    {int_sum * 1e3:10.2f} ms (exact)")
+
+
+def benchmark_category_ids(calls=5):
+    """Storage and GROUP BY cost of transactions carrying category names vs. category ids.
+
+    Each layout is copied into a database file of its own, holding only
+    id, category and amount plus a (category, amount) index, so the file
+    sizes compare like for like.
+    """
+    directory = tempfile.mkdtemp()
+    layouts = {
+        'names': "(SELECT name FROM src.categories WHERE id = category_id) AS category",
+        'ids': "category_id AS category",
+    }
+    for layout, category_sql in layouts.items():
+        path = os.path.join(directory, f'{layout}.db')
+        conn = sqlite3.connect(path)
+        conn.execute("ATTACH DATABASE ? AS src", (database.get_database_path(),))
+        conn.execute(f"CREATE TABLE t AS SELECT id, {category_sql}, amount FROM src.transactions")
+        conn.execute("CREATE INDEX idx_t_category ON t (category, amount)")
+        conn.commit()
+        conn.execute("DETACH DATABASE src")
+        seconds = time_calls(
+            lambda i: conn.execute("SELECT category, SUM(amount) FROM t GROUP BY category").fetchall(), calls)
+        conn.close()
+        print(f"Category {layout + ':':6}              {os.path.getsize(path) / 2 ** 20:8.1f} MiB, "
+              f"GROUP BY {seconds * 1e3:8.2f} ms")
+
+
+def benchmark_read_cache(calls=200):
+    """One budget planner refresh, reading through the model layer cold vs. from the read cache.
+
+    Every other refresh follows a budget write, as editing an item does.
+    """
+    transaction_model = TransactionModel()
+    budget_model = BudgetModel()
+    month = datetime(2020, 1, 1)
+    budget_model.update_total_income(month, 5000)
+
+    def refresh(i):
+        budget_model.get_available_months()
+        budget_model.get_budget_report(month)
+        for _ in range(3):
+            budget_model.get_total_income(month)
+        budget_model.get_budget(month)
+        transaction_model.get_spending_by_category()
+        transaction_model.get_category_spending(month, 'Food')
+
+    def cold(i):
+        read_cache.clear()
+        refresh(i)
+
+    def edit_and_refresh(i):
+        if i % 2:
+            budget_model.update_budget(month, {'Food': 400 + i})
+        refresh(i)
+
+    before = time_calls(cold, calls)
+    read_cache.reset_stats()
+    after = time_calls(edit_and_refresh, calls)
+    stats = read_cache.stats()
+    print(f"Planner refresh, uncached:    {before * 1e3:10.2f} ms")
+    print(f"Planner refresh, read cache:  {after * 1e3:10.2f} ms  ({before / after:.1f}x faster, "
+          f"{stats['hit_rate']:.0%} of {stats['hits'] + stats['misses']:,} reads hit)")
+
+
+def benchmark_budget_plan(months=60):
+    """A five-year budget: one month at a time, an INSERT per line, vs. one roll_forward()."""
+    budget_model = BudgetModel()
+    start = datetime(2100, 1, 1)
+    budget_model.update_budget(start, {category: {'amount': 100 + i, 'type': 'Flexible'}
+                                       for i, category in enumerate(CATEGORIES)})
+
+    def month_by_month(i):
+        month = start
+        for _ in range(months):
+            budget = budget_model.get_budget(month)
+            month += relativedelta(months=1)
+            with database.db_connection() as conn:
+                for category, item in budget.items():
+                    conn.execute("INSERT OR REPLACE INTO monthly_budgets (month, category_id, amount, item_type) "
+                                 "VALUES (?, (SELECT id FROM categories WHERE name = ?), ?, ?)",
+                                 (month.strftime('%Y-%m'), category, round(item['amount'] * 100), item['type']))
+
+    before = time_calls(month_by_month, 3)
+    after = time_calls(lambda i: budget_model.roll_forward(months, from_month=start, inflation=0.002), 3)
+    print(f"{months}-month plan, by month:     {before * 1e3:10.2f} ms")
+    print(f"{months}-month plan, rolled:       {after * 1e3:10.2f} ms  ({before / after:.1f}x faster)")
+    with database.db_connection() as conn:
+        database.record_write('monthly_budgets')
+        conn.execute("DELETE FROM monthly_budgets WHERE month >= ?", (start.strftime('%Y-%m'),))
+
+
+def benchmark_budget_variance(categories=300, months=120, calls=5):
+    """Variance history of `categories` budgeted categories over `months` months: per month vs. in one pass."""
+    budget_model = BudgetModel()
+    start = datetime(2015, 1, 1)
+    budget_model.update_budget(start, {f'Budgeted {i}': 100 + i for i in range(categories)}
+                               | {category: 4000 for category in CATEGORIES})
+    budget_model.roll_forward(months - 1, from_month=start, inflation=0.001)
+
+    def month_by_month(i):
+        report = [budget_model.get_budget_report(start + relativedelta(months=offset)) for offset in range(months)]
+        # The statistics still need a matrix built from the reports
+        return len(report)
+
+    def one_pass(i):
+        read_cache.clear()
+        variance = budget_model.get_budget_variance()
+        return variance.summary()
+
+    def cached(i):
+        return budget_model.get_budget_variance().until('2020-06').summary()
+
+    read_cache.clear()
+    before = time_calls(lambda i: (read_cache.clear(), month_by_month(i)), calls)
+    after = time_calls(one_pass, calls)
+    warm = time_calls(cached, calls)
+    print(f"Variance, month reports:      {before * 1e3:10.2f} ms ({months} months x "
+          f"{categories + len(CATEGORIES)} categories, reports only)")
+    print(f"Variance, one pass + NumPy:   {after * 1e3:10.2f} ms  ({before / after:.1f}x faster)")
+    print(f"Variance, from read cache:    {warm * 1e3:10.2f} ms")
+    with database.db_connection() as conn:
+        database.record_write('monthly_budgets')
+        conn.execute("DELETE FROM monthly_budgets WHERE month BETWEEN ? AND ?",
+                     (start.strftime('%Y-%m'), (start + relativedelta(months=months - 1)).strftime('%Y-%m')))
+
+
+def benchmark_budget_suggestion(calls=20):
+    """Budget suggestions from a year of spending: per-category month lookups vs. one query, cold and cached."""
+    transaction_model = TransactionModel()
+    budget_model = BudgetModel()
+    month = datetime(2021, 1, 1)
+    categories = CATEGORIES
+
+    def month_by_month(i):
+        # What suggesting from the existing readers would take: one lookup
+        # per category and month, before any statistics
+        return [[transaction_model.get_category_spending(month - relativedelta(months=offset), category)
+                 for offset in range(1, 13)] for category in categories]
+
+    def cold(i):
+        read_cache.clear()
+        return budget_model.suggest_budget(month, 5000)
+
+    before = time_calls(lambda i: (read_cache.clear(), month_by_month(i)), calls)
+    after = time_calls(cold, calls)
+    warm = time_calls(lambda i: budget_model.suggest_budget(month, 4000 + i), calls)
+    print(f"Suggestion, spending lookups: {before * 1e3:10.2f} ms ({len(categories)} categories x 12 months)")
+    print(f"Suggestion, one query:        {after * 1e3:10.2f} ms  ({before / after:.1f}x faster)")
+    print(f"Suggestion, cached history:   {warm * 1e3:10.2f} ms  (new income each call)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Database performance benchmarks")
+    parser.add_argument('--rows', type=int, default=1_000_000, help="Number of synthetic transactions")
+    parser.add_argument('--calls', type=int, default=2000, help="Calls per latency measurement")
+    parser.add_argument('--db', help="Reuse an existing benchmark database instead of building one")
+    args = parser.parse_args()
+
+    path = args.db
+    if path is None:
+        path = os.path.join(tempfile.mkdtemp(), 'benchmark.db')
+        print(f"Building {args.rows:,} row database at {path}...")
+        build_database(path, args.rows)
+    database.set_database(path)
+
+    benchmark_connections(path, args.rows, args.calls)
+    benchmark_startup(path)
+    benchmark_aggregates()
+    benchmark_analytics()
+    benchmark_money_sums()
+    benchmark_category_ids()
+    benchmark_read_cache()
+    benchmark_budget_plan()
+    benchmark_budget_variance()
+    benchmark_budget_suggestion()
+
+
+if __name__ == '__main__':
+    main()
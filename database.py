@@ -1,51 +1,213 @@
+import logging
 import sqlite3
+import threading
+from contextlib import contextmanager
+
+from migrations import LATEST_VERSION, get_schema_version, migrate
+
+logger = logging.getLogger(__name__)
 
 DATABASE_NAME = 'expenses.db'
 
+# Applied to every connection handed out by this module. WAL lets the UI read
+# while a write is in progress, and the larger page cache / mmap window keep
+# hot pages of big transaction tables out of the syscall path.
+CONNECTION_PRAGMAS = (
+    "PRAGMA journal_mode = WAL",
+    "PRAGMA synchronous = NORMAL",
+    "PRAGMA cache_size = -65536",  # negative value is in KiB, i.e. 64 MiB
+    "PRAGMA mmap_size = 268435456",  # 256 MiB
+    "PRAGMA temp_store = MEMORY",
+)
+
+_local = threading.local()
+_generation = 0
+_generation_lock = threading.Lock()
+
+# Column names per (database, table), filled on first use and dropped whenever
+# a migration may have changed the schema.
+_schema_cache = {}
+_schema_generation = 0
+
+# Write counter per table, bumped when a unit of work that wrote the table
+# ends. Readers that keep results in memory compare these to tell whether a
+# result is still current.
+_table_versions = {}
+
+
+def configure_connection(conn):
+    for pragma in CONNECTION_PRAGMAS:
+        conn.execute(pragma)
+    return conn
+
 
 def get_db_connection():
-    return sqlite3.connect(DATABASE_NAME)
+    """Open a new, independently owned connection. The caller must close it.
+
+    Models should prefer db_connection(), which reuses a long-lived connection
+    per thread instead of paying the connect/PRAGMA cost on every call.
+    """
+    return configure_connection(sqlite3.connect(DATABASE_NAME))
+
+
+def set_database(path):
+    """Point the connection manager at a different database file.
+
+    Connections already opened by other threads are reopened lazily the next
+    time those threads ask for one.
+    """
+    global DATABASE_NAME, _generation
+    with _generation_lock:
+        DATABASE_NAME = path
+        _generation += 1
+        _table_versions.clear()
+    close_thread_connection()
+    invalidate_schema_cache()
+
+
+def get_database_path():
+    return DATABASE_NAME
+
+
+def get_thread_connection():
+    conn = getattr(_local, 'conn', None)
+    if conn is not None and _local.generation != _generation:
+        conn.close()
+        conn = None
+    if conn is None:
+        conn = get_db_connection()
+        _local.conn = conn
+        _local.generation = _generation
+        _local.depth = 0
+        _local.written = set()
+        _local.on_commit = []
+    return conn
+
+
+def close_thread_connection():
+    conn = getattr(_local, 'conn', None)
+    if conn is not None:
+        conn.close()
+        _local.conn = None
+        _local.depth = 0
+        _bump_table_versions(_local.written)
+        _local.on_commit.clear()
+
+
+@contextmanager
+def db_connection():
+    """Yield this thread's long-lived connection as a unit of work.
+
+    The outermost block commits on success and rolls back on error; nested
+    blocks (a model method calling another model method) join the outer
+    transaction instead of committing halfway through it.
+    """
+    conn = get_thread_connection()
+    _local.depth += 1
+    try:
+        yield conn
+    except BaseException:
+        if _local.depth == 1:
+            conn.rollback()
+            _local.on_commit.clear()
+        raise
+    else:
+        if _local.depth == 1:
+            conn.commit()
+    finally:
+        _local.depth -= 1
+        if _local.depth == 0:
+            _bump_table_versions(_local.written)
+            _run_on_commit()
+
+
+def record_write(*tables):
+    """Note that the current unit of work writes `tables`.
+
+    Their versions are bumped once it ends, after the commit, so a reader
+    that sees the new version also sees the new rows. A rolled-back unit of
+    work bumps them too: a spurious bump costs a re-read, a missed one a
+    stale result. Call it inside the db_connection() block that writes.
+    """
+    get_thread_connection()
+    _local.written.update(tables)
+    if _local.depth == 0:
+        _bump_table_versions(_local.written)
+
+
+def on_commit(callback):
+    """Call `callback()` once the current unit of work has committed, or never if it rolls back.
+
+    It runs on the writing thread after the table versions are bumped, so it
+    reads what was committed. Outside a db_connection() block it runs at once.
+    An exception it raises is logged rather than raised: the write it follows
+    has committed, and must not look to its caller as if it failed.
+    """
+    get_thread_connection()
+    _local.on_commit.append(callback)
+    if _local.depth == 0:
+        _run_on_commit()
+
+
+def _run_on_commit():
+    callbacks = _local.on_commit[:]
+    _local.on_commit.clear()
+    for callback in callbacks:
+        try:
+            callback()
+        except Exception:
+            logger.exception("Error in a callback run after commit")
+
+
+def _bump_table_versions(tables):
+    if tables:
+        with _generation_lock:
+            for table in tables:
+                _table_versions[table] = _table_versions.get(table, 0) + 1
+        tables.clear()
+
+
+def get_table_versions(tables):
+    """The write counters of `tables`, plus the database generation, as a tuple to compare."""
+    return (_generation, _schema_generation, *(_table_versions.get(table, 0) for table in tables))
+
+
+def get_table_columns(table):
+    """Return the column names of `table`, reading PRAGMA table_info only on first use."""
+    key = (DATABASE_NAME, table)
+    columns = _schema_cache.get(key)
+    if columns is None:
+        with db_connection() as conn:
+            columns = frozenset(column[1] for column in conn.execute(f"PRAGMA table_info({table})"))
+        _schema_cache[key] = columns
+    return columns
+
+
+def get_schema_generation():
+    """Counter bumped every time the schema cache is invalidated.
+
+    Callers that derive something from the schema (a chosen SQL statement, a
+    row mapper) can keep it until this number changes.
+    """
+    return _schema_generation
+
+
+def invalidate_schema_cache():
+    global _schema_generation
+    with _generation_lock:
+        _schema_cache.clear()
+        _schema_generation += 1
 
 
 def init_db():
-    conn = get_db_connection()
-    cursor = conn.cursor()
-
-    # Create transactions table with goal_id column
-    cursor.execute('''
-            CREATE TABLE IF NOT EXISTS transactions (
-                id INTEGER PRIMARY KEY,
-                date TEXT,
-                category TEXT,
-                amount REAL,
-                type TEXT,
-                comment TEXT,
-                currency TEXT,
-                goal_id INTEGER
-            )
-        ''')
-
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS debts (
-            id INTEGER PRIMARY KEY,
-            name TEXT,
-            balance REAL,
-            apr REAL
-        )
-    ''')
-
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS categories (
-            id INTEGER PRIMARY KEY,
-            name TEXT UNIQUE
-        )
-    ''')
-
-    # Check if goal_id column exists in transactions table
-    cursor.execute("PRAGMA table_info(transactions)")
-    columns = [column[1] for column in cursor.fetchall()]
-    if 'goal_id' not in columns:
-        cursor.execute("ALTER TABLE transactions ADD COLUMN goal_id INTEGER")
-
-    conn.commit()
-    conn.close()
\ No newline at end of file
+    """Bring the schema up to date.
+
+    An up-to-date database costs a single PRAGMA user_version read; pending
+    migrations run once and are recorded in the version number.
+    """
+    conn = get_thread_connection()
+    if get_schema_version(conn) < LATEST_VERSION:
+        try:
+            migrate(conn)
+        finally:
+            invalidate_schema_cache()
@@ -0,0 +1 @@
+from .writers import ExportError, export_monthly_totals, export_transactions
@@ -0,0 +1,106 @@
+"""Streaming writers for transaction exports.
+
+Each writer consumes an iterable of row batches, so only one batch is held in
+memory no matter how large the export is. Parquet support needs the optional
+pyarrow package.
+"""
+import csv
+import json
+import logging
+import os
+
+from models.transaction import MONTHLY_TOTAL_COLUMNS, TRANSACTION_COLUMNS
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+logger = logging.getLogger(__name__)
+
+
+class ExportError(Exception):
+    pass
+
+
+def write_csv(batches, columns, path):
+    count = 0
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(columns)
+        for batch in batches:
+            writer.writerows(batch)
+            count += len(batch)
+    return count
+
+
+def write_jsonl(batches, columns, path):
+    count = 0
+    with open(path, 'w', encoding='utf-8') as f:
+        for batch in batches:
+            f.writelines(json.dumps(dict(zip(columns, row)), ensure_ascii=False) + '\n' for row in batch)
+            count += len(batch)
+    return count
+
+
+def _parquet_schema(columns):
+    numeric = {
+        'id': pyarrow.int64(),
+        'goal_id': pyarrow.int64(),
+        'count': pyarrow.int64(),
+        'amount': pyarrow.float64(),
+        'total': pyarrow.float64(),
+    }
+    return pyarrow.schema([(column, numeric.get(column, pyarrow.string())) for column in columns])
+
+
+def write_parquet(batches, columns, path):
+    if pyarrow is None:
+        raise ExportError("Parquet export requires the pyarrow package")
+
+    # One row group per batch, written as it arrives
+    count = 0
+    schema = _parquet_schema(columns)
+    with pyarrow.parquet.ParquetWriter(path, schema) as writer:
+        for batch in batches:
+            arrays = [pyarrow.array(values, type=field.type) for values, field in zip(zip(*batch), schema)]
+            writer.write_table(pyarrow.Table.from_arrays(arrays, schema=schema))
+            count += len(batch)
+    return count
+
+
+WRITERS = {
+    'csv': write_csv,
+    'jsonl': write_jsonl,
+    'parquet': write_parquet,
+}
+
+
+def format_for_path(path):
+    extension = os.path.splitext(path)[1].lower().lstrip('.')
+    return {'json': 'jsonl', 'ndjson': 'jsonl', 'pq': 'parquet'}.get(extension, extension)
+
+
+def _export(batches, columns, path, fmt):
+    fmt = fmt or format_for_path(path)
+    writer = WRITERS.get(fmt)
+    if writer is None:
+        raise ExportError(f"Unsupported export format: {fmt}")
+    count = writer(batches, columns, path)
+    logger.info(f"Exported {count} rows to {path} as {fmt}")
+    return count
+
+
+def export_transactions(transaction_model, path, fmt=None, start_date=None, end_date=None, categories=None,
+                        batch_size=5000):
+    """Write matching transactions to `path`. The format defaults to the file extension."""
+    batches = transaction_model.iter_transaction_batches(start_date, end_date, categories, batch_size)
+    return _export(batches, TRANSACTION_COLUMNS, path, fmt)
+
+
+def export_monthly_totals(transaction_model, path, fmt=None, start_date=None, end_date=None, categories=None,
+                          batch_size=5000):
+    """Write per-month, per-category totals to `path`."""
+    batches = transaction_model.iter_monthly_total_batches(start_date, end_date, categories, batch_size)
+    return _export(batches, MONTHLY_TOTAL_COLUMNS, path, fmt)
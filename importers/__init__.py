@@ -0,0 +1,2 @@
+from .parsers import StatementParseError, iter_statement
+from .pipeline import StatementImporter
@@ -0,0 +1,146 @@
+"""Streaming parsers for bank statement files.
+
+Every parser is a generator over raw records, read incrementally from disk so
+that a statement of any size is processed in bounded memory. A record is a
+dict with the keys 'date', 'amount', 'description', 'category', 'currency'
+and 'id'; values are left as the strings found in the file and are cleaned
+up by the pipeline. Nothing here touches the database or Qt, so these
+functions can run in worker processes.
+"""
+import csv
+import os
+import re
+
+
+class StatementParseError(ValueError):
+    pass
+
+
+CSV_COLUMNS = {
+    'date': ('date', 'transaction date', 'posted date', 'posting date', 'booking date', 'value date'),
+    'amount': ('amount', 'value', 'transaction amount'),
+    'debit': ('debit', 'paid out', 'money out', 'withdrawal', 'withdrawals'),
+    'credit': ('credit', 'paid in', 'money in', 'deposit', 'deposits'),
+    'description': ('description', 'memo', 'details', 'narrative', 'payee', 'name', 'reference'),
+    'category': ('category',),
+    'currency': ('currency',),
+    'id': ('id', 'transaction id', 'reference number'),
+}
+
+
+def _match_columns(header):
+    normalized = {name.strip().lower(): name for name in header if name}
+    columns = {}
+    for field, candidates in CSV_COLUMNS.items():
+        for candidate in candidates:
+            if candidate in normalized:
+                columns[field] = normalized[candidate]
+                break
+    if 'date' not in columns or not ('amount' in columns or 'debit' in columns or 'credit' in columns):
+        raise StatementParseError(f"Unrecognised CSV header: {', '.join(header)}")
+    return columns
+
+
+def iter_csv(path):
+    with open(path, newline='', encoding='utf-8-sig') as f:
+        reader = csv.DictReader(f)
+        columns = _match_columns(reader.fieldnames or [])
+        for row in reader:
+            if 'amount' in columns:
+                amount = row.get(columns['amount'])
+            else:
+                # Split debit/credit columns: money out becomes a negative amount
+                debit = (row.get(columns.get('debit')) or '').strip()
+                credit = (row.get(columns.get('credit')) or '').strip()
+                amount = f"-{debit.lstrip('-')}" if debit else credit
+            yield {
+                'date': row.get(columns['date']),
+                'amount': amount,
+                'description': row.get(columns['description']) if 'description' in columns else '',
+                'category': row.get(columns['category']) if 'category' in columns else None,
+                'currency': row.get(columns['currency']) if 'currency' in columns else None,
+                'id': row.get(columns['id']) if 'id' in columns else None,
+            }
+
+
+_OFX_TAG = re.compile(r'<(/?)([A-Za-z0-9.]+)>([^<]*)')
+
+
+def _ofx_tokens(f, chunk_size=65536):
+    # OFX 1.x is SGML with unclosed leaf tags and may arrive as a single line,
+    # so tokenise fixed-size chunks. While more input is coming, stop at the
+    # last '<': that tag, or the value after it, may continue in the next chunk.
+    buffer = ''
+    while True:
+        chunk = f.read(chunk_size)
+        buffer += chunk
+        limit = buffer.rfind('<') if chunk else len(buffer)
+        if limit > 0:
+            for match in _OFX_TAG.finditer(buffer, 0, limit):
+                yield match.group(1) == '/', match.group(2).upper(), match.group(3).strip()
+            buffer = buffer[limit:]
+        if not chunk:
+            return
+
+
+def iter_ofx(path):
+    currency = None
+    record = None
+    with open(path, encoding='utf-8', errors='replace') as f:
+        for closing, tag, value in _ofx_tokens(f):
+            if tag == 'CURDEF' and not closing:
+                currency = value
+            elif tag == 'STMTTRN':
+                if closing and record is not None:
+                    yield {
+                        'date': record.get('DTPOSTED'),
+                        'amount': record.get('TRNAMT'),
+                        'description': ' '.join(filter(None, (record.get('NAME'), record.get('MEMO')))),
+                        'category': None,
+                        'currency': record.get('CURRENCY') or currency,
+                        'id': record.get('FITID'),
+                    }
+                    record = None
+                elif not closing:
+                    record = {}
+            elif record is not None and not closing:
+                record[tag] = value
+
+
+def iter_qif(path):
+    record = {}
+    with open(path, encoding='utf-8', errors='replace') as f:
+        for line in f:
+            line = line.rstrip('\r\n')
+            if not line or line.startswith('!'):
+                continue
+            code, value = line[0], line[1:].strip()
+            if code == '^':
+                if record:
+                    yield {
+                        'date': record.get('D'),
+                        'amount': record.get('T') or record.get('U'),
+                        'description': ' '.join(filter(None, (record.get('P'), record.get('M')))),
+                        'category': record.get('L'),
+                        'currency': None,
+                        'id': None,
+                    }
+                record = {}
+            else:
+                record[code] = value
+
+
+PARSERS = {
+    '.csv': iter_csv,
+    '.ofx': iter_ofx,
+    '.qfx': iter_ofx,
+    '.qif': iter_qif,
+}
+
+
+def iter_statement(path):
+    extension = os.path.splitext(path)[1].lower()
+    parser = PARSERS.get(extension)
+    if parser is None:
+        raise StatementParseError(f"Unsupported statement format: {extension or path}")
+    return parser(path)
@@ -0,0 +1,278 @@
+"""Generator pipeline that turns statement files into transactions.
+
+parse -> normalize (ISO dates, signed amounts) -> categorize -> fingerprint
+-> batched write. Every stage is a generator, so a single statement streams
+through in bounded memory; only one batch is ever materialised at a time.
+"""
+import hashlib
+import logging
+import multiprocessing
+import queue
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from functools import lru_cache
+from itertools import islice
+
+from database import db_connection
+from importers.parsers import iter_statement
+
+logger = logging.getLogger(__name__)
+
+DATE_FORMATS_DAY_FIRST = ('%Y-%m-%d', '%d/%m/%Y', '%d/%m/%y', '%d-%m-%Y', '%d.%m.%Y', '%Y%m%d', '%Y/%m/%d',
+                          '%d %b %Y', '%d %B %Y')
+DATE_FORMATS_MONTH_FIRST = ('%Y-%m-%d', '%m/%d/%Y', '%m/%d/%y', '%m-%d-%Y', '%Y%m%d', '%Y/%m/%d',
+                            '%b %d %Y', '%B %d %Y')
+
+DEFAULT_CATEGORY = 'Uncategorized'
+
+
+class ImportCounters:
+    def __init__(self):
+        self.parsed = 0
+        self.skipped = 0
+
+
+@lru_cache(maxsize=4096)
+def _parse_date(value, date_format):
+    # Statements repeat the same few hundred dates; strptime dominates the
+    # pipeline otherwise. Unparseable combinations cache as None.
+    try:
+        return datetime.strptime(value, date_format).strftime('%Y-%m-%d')
+    except ValueError:
+        return None
+
+
+def normalize_date(value, formats, last_format=None):
+    """Return (iso_date, format_used). The format that matched last is tried first."""
+    value = value.strip()
+    # OFX timestamps carry time and zone after the date: 20240131120000[-5:EST]
+    if len(value) > 8 and value[:8].isdigit():
+        value = value[:8]
+    # QIF writes two-digit years as 1/31'24
+    value = value.replace("'", '/')
+    candidates = (last_format,) + formats if last_format else formats
+    for date_format in candidates:
+        iso_date = _parse_date(value, date_format)
+        if iso_date is not None:
+            return iso_date, date_format
+    raise ValueError(f"Unrecognised date: {value}")
+
+
+_AMOUNT = re.compile(r'^(\()?([+-])?[£$€]?([+-])?(\d+(?:\.\d*)?|\.\d+)\)?$')
+
+
+def parse_amount(value):
+    """Parse '1,234.50', '-£12', '£-12' or '(12.00)' into a signed float."""
+    match = _AMOUNT.match(value.replace(',', '').replace(' ', ''))
+    if match is None:
+        raise ValueError(f"Unrecognised amount: {value}")
+    parenthesised, sign, inner_sign, digits = match.groups()
+    negative = bool(parenthesised) != ('-' in (sign, inner_sign))
+    return -float(digits) if negative else float(digits)
+
+
+def normalize(records, counters, day_first=True):
+    # The preferred ordering is tried first; the other one still rescues dates
+    # such as 1/31/24 that can only be read one way.
+    if day_first:
+        formats = DATE_FORMATS_DAY_FIRST + DATE_FORMATS_MONTH_FIRST
+    else:
+        formats = DATE_FORMATS_MONTH_FIRST + DATE_FORMATS_DAY_FIRST
+    formats = tuple(dict.fromkeys(formats))
+    last_format = None
+    for record in records:
+        counters.parsed += 1
+        try:
+            record['date'], last_format = normalize_date(record['date'] or '', formats, last_format)
+            record['amount'] = parse_amount(record['amount'] or '')
+        except ValueError as e:
+            counters.skipped += 1
+            logger.debug(f"Skipping statement line {counters.parsed}: {e}")
+            continue
+        record['description'] = (record['description'] or '').strip()
+        yield record
+
+
+def categorize(records, category_names, default_category=DEFAULT_CATEGORY):
+    """Map each record to one of the user's categories.
+
+    A category column that names a known category wins; otherwise the first
+    category whose name appears in the description is used.
+    """
+    known = {name.lower(): name for name in category_names}
+    for record in records:
+        category = known.get((record['category'] or '').strip().lower())
+        if category is None:
+            description = record['description'].lower()
+            category = next((name for key, name in known.items() if key and key in description), default_category)
+        record['category'] = category
+        yield record
+
+
+def fingerprint(records):
+    """Attach a stable fingerprint used to skip lines that were imported before.
+
+    Bank-assigned ids (OFX FITID) are used when present. Otherwise the
+    fingerprint is built from the line's content plus its position among
+    identical lines in the file, so two genuine identical purchases on one day
+    are both kept even when other days' lines come between them.
+    """
+    occurrences = {}
+    for record in records:
+        if record['id']:
+            key = f"id|{record['id']}"
+        else:
+            content = f"{record['date']}|{record['amount']:.2f}|{record['description']}"
+            occurrences[content] = occurrences.get(content, 0) + 1
+            key = f"{content}|{occurrences[content]}"
+        record['fingerprint'] = hashlib.sha1(key.encode('utf-8')).hexdigest()
+        yield record
+
+
+def to_rows(records, default_currency):
+    for record in records:
+        amount = record['amount']
+        transaction_type = 'Expense' if amount < 0 else 'Income'
+        yield record['fingerprint'], (record['date'], record['category'], abs(amount), transaction_type,
+                                      record['description'], record['currency'] or default_currency, None)
+
+
+def process_file(path, category_names, default_currency, day_first=True, counters=None):
+    """Full parse -> normalize -> categorize -> fingerprint chain for one file, as (fingerprint, row) pairs."""
+    counters = counters if counters is not None else ImportCounters()
+    records = iter_statement(path)
+    records = normalize(records, counters, day_first)
+    records = categorize(records, category_names)
+    records = fingerprint(records)
+    return to_rows(records, default_currency)
+
+
+def _process_file_in_worker(index, path, category_names, default_currency, day_first, batch_size, batches):
+    # Runs in a child process. Rows go back to the parent a batch at a time
+    # through the bounded `batches` queue, so a worker that gets ahead of the
+    # writer blocks rather than holding the rest of its file; (index, None)
+    # marks the file finished, whether or not it could be read.
+    counters = ImportCounters()
+    try:
+        for batch in batched(process_file(path, category_names, default_currency, day_first, counters), batch_size):
+            batches.put((index, batch))
+    finally:
+        batches.put((index, None))
+    return counters.parsed, counters.skipped
+
+
+def batched(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+class StatementImporter:
+    def __init__(self, transaction_model, category_names, default_currency='GBP', day_first=True,
+                 batch_size=5000, processes=None, parallel_threshold=4):
+        self.transaction_model = transaction_model
+        self.category_names = list(category_names)
+        self.default_currency = default_currency
+        self.day_first = day_first
+        self.batch_size = batch_size
+        self.processes = processes or multiprocessing.cpu_count()
+        self.parallel_threshold = parallel_threshold
+
+    def import_files(self, paths, progress_callback=None):
+        """Import statement files and return a summary dict.
+
+        progress_callback(rows_done, files_done, total_files) is called after
+        every written batch, from whichever thread runs the import.
+        """
+        start = time.perf_counter()
+        counters = ImportCounters()
+        summary = {'files': len(paths), 'imported': 0, 'duplicates': 0}
+        files_done = 0
+
+        for batch in self._iter_batches(paths, counters):
+            if batch is None:
+                files_done += 1
+            else:
+                inserted, duplicates = self._write_batch(batch)
+                summary['imported'] += inserted
+                summary['duplicates'] += duplicates
+            if progress_callback:
+                progress_callback(summary['imported'] + summary['duplicates'], files_done, len(paths))
+
+        summary['skipped'] = counters.skipped
+        summary['seconds'] = time.perf_counter() - start
+        logger.info(f"Imported {summary['imported']} transactions from {len(paths)} files "
+                    f"({summary['duplicates']} duplicates, {summary['skipped']} unreadable lines) "
+                    f"in {summary['seconds']:.2f}s")
+        return summary
+
+    def _iter_batches(self, paths, counters):
+        """Yield batches of (fingerprint, row) pairs, and None each time a file is finished."""
+        if len(paths) < self.parallel_threshold or self.processes < 2:
+            for path in paths:
+                yield from batched(process_file(path, self.category_names, self.default_currency, self.day_first,
+                                                counters), self.batch_size)
+                yield None
+            return
+
+        # Spawned (not forked) workers: the parent may be a threaded Qt process.
+        # Files from different workers arrive interleaved, and at most two
+        # batches per worker wait in the queue, so parsed rows cannot pile up
+        # faster than they are written.
+        context = multiprocessing.get_context('spawn')
+        pool = ProcessPoolExecutor(max_workers=self.processes, mp_context=context)
+        manager = context.Manager()
+        try:
+            batches = manager.Queue(maxsize=self.processes * 2)
+            futures = [pool.submit(_process_file_in_worker, index, path, self.category_names,
+                                   self.default_currency, self.day_first, self.batch_size, batches)
+                       for index, path in enumerate(paths)]
+            unfinished = set(range(len(paths)))
+            while unfinished:
+                try:
+                    index, batch = batches.get(timeout=1)
+                except queue.Empty:
+                    # A worker that died outright never marks its file finished
+                    for index in unfinished:
+                        if futures[index].done() and futures[index].exception() is not None:
+                            raise futures[index].exception()
+                    continue
+                if batch is not None:
+                    yield batch
+                    continue
+                parsed, skipped = futures[index].result()
+                counters.parsed += parsed
+                counters.skipped += skipped
+                unfinished.discard(index)
+                yield None
+        finally:
+            # The manager goes first: workers blocked on the queue then fail
+            # instead of keeping the pool from shutting down
+            manager.shutdown()
+            pool.shutdown(cancel_futures=True)
+
+    def _write_batch(self, batch):
+        unique = {}
+        for key, row in batch:
+            unique.setdefault(key, row)
+
+        with db_connection() as conn:
+            existing = set()
+            keys = list(unique)
+            for chunk in batched(keys, 500):
+                placeholders = ','.join('?' * len(chunk))
+                existing.update(row[0] for row in conn.execute(
+                    f"SELECT fingerprint FROM import_fingerprints WHERE fingerprint IN ({placeholders})", chunk))
+
+            new_keys = [key for key in keys if key not in existing]
+            conn.executemany("INSERT INTO import_fingerprints (fingerprint) VALUES (?)",
+                             ((key,) for key in new_keys))
+            # Joins this block's transaction, so rows and fingerprints commit together
+            self.transaction_model.add_transactions_bulk(unique[key] for key in new_keys)
+
+        return len(new_keys), len(batch) - len(new_keys)
@@ -1,25 +1,45 @@
-import sqlite3
-from database import DATABASE_NAME, get_db_connection
+import argparse
+
+from database import get_db_connection
+from migrations import LATEST_VERSION, get_schema_version, migrate
+from models.column_cache import get_column_cache
+from models.transaction import TransactionModel
 
 
 def migrate_database():
     conn = get_db_connection()
-    cursor = conn.cursor()
+    try:
+        version = get_schema_version(conn)
+        if version >= LATEST_VERSION:
+            print(f"Database is already at schema version {version}.")
+            return
+
+        applied = migrate(conn)
+        print(f"Applied migrations {', '.join(map(str, applied))}; schema is now at version {LATEST_VERSION}.")
+    finally:
+        conn.close()
 
-    # Check if goal_id column exists in transactions table
-    cursor.execute("PRAGMA table_info(transactions)")
-    columns = [column[1] for column in cursor.fetchall()]
 
-    if 'goal_id' not in columns:
-        print("Adding goal_id column to transactions table...")
-        cursor.execute("ALTER TABLE transactions ADD COLUMN goal_id INTEGER")
-        print("Column added successfully.")
-    else:
-        print("goal_id column already exists in transactions table.")
+def rebuild_rollups():
+    count = TransactionModel().rebuild_rollups()
+    print(f"Rebuilt {count} transaction rollup rows.")
 
-    conn.commit()
-    conn.close()
+
+def rebuild_column_cache():
+    stats = get_column_cache().rebuild()
+    print(f"Rebuilt the column cache of {stats['appended']} transactions.")
 
 
 if __name__ == "__main__":
-    migrate_database()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Migrate the finance database to the latest schema")
+    parser.add_argument('--rebuild-rollups', action='store_true',
+                        help="Recompute the monthly transaction rollups from the transactions table")
+    parser.add_argument('--rebuild-column-cache', action='store_true',
+                        help="Rewrite the memory-mapped analytics column cache from the transactions table")
+    args = parser.parse_args()
+
+    migrate_database()
+    if args.rebuild_rollups:
+        rebuild_rollups()
+    if args.rebuild_column_cache:
+        rebuild_column_cache()
@@ -0,0 +1,618 @@
+import logging
+import sqlite3
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+
+def _table_columns(cursor, table):
+    cursor.execute(f"PRAGMA table_info({table})")
+    return [column[1] for column in cursor.fetchall()]
+
+
+def _baseline_schema(cursor):
+    # Databases created before versioning may already hold any subset of these
+    # tables, possibly missing columns that were added later, so every step
+    # here has to be safe to run against a partially built schema.
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS transactions (
+            id INTEGER PRIMARY KEY,
+            date TEXT,
+            category TEXT,
+            amount REAL,
+            type TEXT,
+            comment TEXT,
+            currency TEXT,
+            goal_id INTEGER
+        )
+    ''')
+    if 'goal_id' not in _table_columns(cursor, 'transactions'):
+        cursor.execute("ALTER TABLE transactions ADD COLUMN goal_id INTEGER")
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS debts (
+            id INTEGER PRIMARY KEY,
+            name TEXT,
+            balance REAL,
+            apr REAL
+        )
+    ''')
+    columns = _table_columns(cursor, 'debts')
+    if 'original_balance' not in columns:
+        cursor.execute("ALTER TABLE debts ADD COLUMN original_balance REAL")
+    if 'current_balance' not in columns:
+        cursor.execute("ALTER TABLE debts ADD COLUMN current_balance REAL")
+    cursor.execute("UPDATE debts SET original_balance = balance WHERE original_balance IS NULL")
+    cursor.execute("UPDATE debts SET current_balance = balance WHERE current_balance IS NULL")
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS categories (
+            id INTEGER PRIMARY KEY,
+            name TEXT UNIQUE
+        )
+    ''')
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS monthly_budgets (
+            id INTEGER PRIMARY KEY,
+            month TEXT NOT NULL,
+            category TEXT NOT NULL,
+            amount REAL NOT NULL,
+            item_type TEXT DEFAULT 'Mandatory',
+            total_income REAL DEFAULT 0
+        )
+    ''')
+    columns = _table_columns(cursor, 'monthly_budgets')
+    if 'item_type' not in columns:
+        cursor.execute("ALTER TABLE monthly_budgets ADD COLUMN item_type TEXT DEFAULT 'Mandatory'")
+    if 'total_income' not in columns:
+        cursor.execute("ALTER TABLE monthly_budgets ADD COLUMN total_income REAL DEFAULT 0")
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS savings_goals (
+            id INTEGER PRIMARY KEY,
+            name TEXT NOT NULL,
+            target_amount REAL NOT NULL,
+            current_amount REAL NOT NULL,
+            target_date TEXT NOT NULL,
+            category TEXT NOT NULL
+        )
+    ''')
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS investment_savings_goals (
+            id INTEGER PRIMARY KEY,
+            name TEXT NOT NULL,
+            target_amount REAL NOT NULL,
+            current_amount REAL NOT NULL,
+            target_date TEXT NOT NULL,
+            goal_type TEXT NOT NULL,
+            category TEXT NOT NULL,
+            risk_level TEXT NOT NULL,
+            creation_date TEXT NOT NULL,
+            annual_return REAL
+        )
+    ''')
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS investments (
+            id INTEGER PRIMARY KEY,
+            name TEXT NOT NULL,
+            amount REAL NOT NULL,
+            type TEXT NOT NULL,
+            date TEXT NOT NULL,
+            annual_return REAL,
+            risk_level TEXT
+        )
+    ''')
+
+
+def _query_indexes(cursor):
+    # The composite index carries amount as a trailing column so the
+    # SUM()/GROUP BY aggregates can be answered from the index alone.
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_transactions_date ON transactions(date)")
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_transactions_category_type_date
+        ON transactions(category, type, date, amount)
+    ''')
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_transactions_goal_id ON transactions(goal_id)")
+
+    # Older databases accumulated duplicate (month, category) rows because
+    # INSERT OR REPLACE had no key to conflict on. Keep the newest row of
+    # each pair so the unique index can be created.
+    cursor.execute('''
+        DELETE FROM monthly_budgets
+        WHERE id NOT IN (SELECT MAX(id) FROM monthly_budgets GROUP BY month, category)
+    ''')
+    cursor.execute('''
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_monthly_budgets_month_category
+        ON monthly_budgets(month, category)
+    ''')
+
+
+def _import_fingerprints(cursor):
+    # One row per imported statement line, so re-importing an overlapping
+    # statement skips the lines that are already in transactions.
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS import_fingerprints (
+            fingerprint TEXT PRIMARY KEY
+        ) WITHOUT ROWID
+    ''')
+
+
+# Rollup keys are NOT NULL so that legacy rows with a missing category or
+# currency still land on a single, addressable rollup row. Rollups were keyed
+# by category name until migration 10 moved them to category ids; each pair is
+# (rollup column, key expression for a transactions row).
+_CATEGORY_NAME_KEY = ('category', "ifnull({t}.category, '')")
+_CATEGORY_ID_KEY = ('category_id', "ifnull({t}.category_id, 0)")
+
+
+def _rollup_key(t, category):
+    return (f"substr(ifnull({t}.date, ''), 1, 7), {category[1].format(t=t)}, "
+            f"ifnull({t}.type, ''), ifnull({t}.currency, '')")
+
+
+def _rollup_match(t, category):
+    return (f"month = substr(ifnull({t}.date, ''), 1, 7) AND {category[0]} = {category[1].format(t=t)} "
+            f"AND type = ifnull({t}.type, '') AND currency = ifnull({t}.currency, '')")
+
+
+def _rollup_add(t, category=_CATEGORY_NAME_KEY):
+    return f"""
+        INSERT INTO transaction_rollups (month, {category[0]}, type, currency, total, count)
+        VALUES ({_rollup_key(t, category)}, ifnull({t}.amount, 0), 1)
+        ON CONFLICT (month, {category[0]}, type, currency)
+        DO UPDATE SET total = total + excluded.total, count = count + 1;
+    """
+
+
+def _rollup_remove(t, category=_CATEGORY_NAME_KEY):
+    return f"""
+        UPDATE transaction_rollups SET total = total - ifnull({t}.amount, 0), count = count - 1
+        WHERE {_rollup_match(t, category)};
+        DELETE FROM transaction_rollups WHERE {_rollup_match(t, category)} AND count <= 0;
+    """
+
+
+def _rebuild_rollups_sql(category):
+    return f"""
+        INSERT INTO transaction_rollups (month, {category[0]}, type, currency, total, count)
+        SELECT {_rollup_key('transactions', category)}, SUM(ifnull(amount, 0)), COUNT(*)
+        FROM transactions
+        GROUP BY 1, 2, 3, 4
+    """
+
+
+# Used by the steps that ran while rollups were keyed by name
+_REBUILD_NAME_ROLLUPS_SQL = _rebuild_rollups_sql(_CATEGORY_NAME_KEY)
+REBUILD_ROLLUPS_SQL = _rebuild_rollups_sql(_CATEGORY_ID_KEY)
+
+# Transactions whose date cannot be read roll up under months such as '' or
+# 'garbage'; readers that take a rollup month for a calendar month keep only
+# the rows this matches
+WELL_FORMED_MONTH = "month GLOB '[0-9][0-9][0-9][0-9]-[01][0-9]' AND substr(month, 6) BETWEEN '01' AND '12'"
+
+
+def _transaction_rollups(cursor):
+    # Per (month, category, type, currency) totals, kept current by triggers
+    # so aggregate reads cost the number of months and categories rather than
+    # the number of transactions, whichever code path writes the rows.
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS transaction_rollups (
+            month TEXT NOT NULL,
+            category TEXT NOT NULL,
+            type TEXT NOT NULL,
+            currency TEXT NOT NULL,
+            total REAL NOT NULL DEFAULT 0,
+            count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (month, category, type, currency)
+        ) WITHOUT ROWID
+    ''')
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_transactions_rollup_insert
+        AFTER INSERT ON transactions
+        BEGIN {_rollup_add('NEW')} END
+    """)
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_transactions_rollup_delete
+        AFTER DELETE ON transactions
+        BEGIN {_rollup_remove('OLD')} END
+    """)
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_transactions_rollup_update
+        AFTER UPDATE OF date, category, amount, type, currency ON transactions
+        BEGIN {_rollup_remove('OLD')} {_rollup_add('NEW')} END
+    """)
+    cursor.execute("DELETE FROM transaction_rollups")
+    cursor.execute(_REBUILD_NAME_ROLLUPS_SQL)
+
+
+def _sort_indexes(cursor):
+    # Indexes carry the rowid as an implicit trailing column, so the amount
+    # index serves ORDER BY amount, id keyset pages directly, and (category,
+    # date) serves both "one category, newest first" and sorting by category
+    # (with date as the tie-breaker). Type, currency and comment are left unindexed; their sorts
+    # are rare and not worth the extra write cost.
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_transactions_category_date ON transactions(category, date)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_transactions_amount ON transactions(amount)")
+
+
+def _comment_search(cursor):
+    # External-content FTS5 index over transactions.comment: the text lives
+    # only in transactions, the index stores tokens keyed by transaction id.
+    # SQLite builds without FTS5 skip this step and search falls back to LIKE.
+    try:
+        cursor.execute('''
+            CREATE VIRTUAL TABLE IF NOT EXISTS transactions_fts
+            USING fts5(comment, content='transactions', content_rowid='id', prefix='2 3')
+        ''')
+    except sqlite3.OperationalError:
+        logger.warning("SQLite was built without FTS5; transaction search will scan comments")
+        return
+
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_transactions_fts_insert
+        AFTER INSERT ON transactions
+        BEGIN
+            INSERT INTO transactions_fts (rowid, comment) VALUES (NEW.id, NEW.comment);
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_transactions_fts_delete
+        AFTER DELETE ON transactions
+        BEGIN
+            INSERT INTO transactions_fts (transactions_fts, rowid, comment) VALUES ('delete', OLD.id, OLD.comment);
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_transactions_fts_update
+        AFTER UPDATE OF comment ON transactions
+        BEGIN
+            INSERT INTO transactions_fts (transactions_fts, rowid, comment) VALUES ('delete', OLD.id, OLD.comment);
+            INSERT INTO transactions_fts (rowid, comment) VALUES (NEW.id, NEW.comment);
+        END
+    ''')
+    cursor.execute("INSERT INTO transactions_fts (transactions_fts) VALUES ('rebuild')")
+
+
+def _transaction_change_log(cursor):
+    # Ids of updated and deleted transactions, in the order the changes
+    # happened. New rows need no entry: readers that keep a copy of the table
+    # pick them up by id above their high-water mark. AUTOINCREMENT keeps seq
+    # growing even after consumed entries are pruned.
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS transaction_changes (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            transaction_id INTEGER NOT NULL
+        )
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_transactions_log_update
+        AFTER UPDATE ON transactions
+        BEGIN
+            INSERT INTO transaction_changes (transaction_id) SELECT OLD.id UNION SELECT NEW.id;
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_transactions_log_delete
+        AFTER DELETE ON transactions
+        BEGIN
+            INSERT INTO transaction_changes (transaction_id) VALUES (OLD.id);
+        END
+    ''')
+
+
+# Money columns moved to INTEGER minor units by migration 8. The scale is
+# written out rather than imported so the step keeps meaning what it meant
+# when it shipped.
+_MONEY_COLUMNS = {
+    'transactions': ('amount',),
+    'debts': ('balance', 'original_balance', 'current_balance'),
+    'monthly_budgets': ('amount', 'total_income'),
+    'savings_goals': ('target_amount', 'current_amount'),
+    'investment_savings_goals': ('target_amount', 'current_amount'),
+    'investments': ('amount',),
+}
+
+
+def _retype_money_columns(cursor, table, money_columns):
+    # SQLite cannot change a column's type in place, and a REAL column would
+    # turn stored integers back into floats, so the table is rebuilt under
+    # the same name with its indexes and triggers recreated on the copy.
+    columns = cursor.execute(f"PRAGMA table_info({table})").fetchall()
+    if not columns:
+        return
+    definitions, values = [], []
+    for _, name, declared_type, not_null, default, primary_key in columns:
+        if name in money_columns:
+            declared_type = 'INTEGER'
+            if default is not None:
+                default = str(round(float(default) * 100))
+            values.append(f"CAST(round({name} * 100) AS INTEGER)")
+        else:
+            values.append(name)
+        definition = f"{name} {declared_type}"
+        if primary_key:
+            definition += " PRIMARY KEY"
+        if not_null:
+            definition += " NOT NULL"
+        if default is not None:
+            definition += f" DEFAULT {default}"
+        definitions.append(definition)
+
+    dependents = [row[0] for row in cursor.execute(
+        "SELECT sql FROM sqlite_master WHERE tbl_name = ? AND type IN ('index', 'trigger') AND sql IS NOT NULL",
+        (table,))]
+    cursor.execute(f"CREATE TABLE {table}_new ({', '.join(definitions)})")
+    cursor.execute(f"INSERT INTO {table}_new SELECT {', '.join(values)} FROM {table}")
+    cursor.execute(f"DROP TABLE {table}")
+    cursor.execute(f"ALTER TABLE {table}_new RENAME TO {table}")
+    for sql in dependents:
+        cursor.execute(sql)
+
+
+def _integer_money(cursor):
+    # Amounts become whole pence/cents so SUM() is exact integer arithmetic
+    for table, money_columns in _MONEY_COLUMNS.items():
+        _retype_money_columns(cursor, table, money_columns)
+
+    # Rollup totals are derived data: recreate them as INTEGER and re-sum
+    cursor.execute("DROP TABLE IF EXISTS transaction_rollups")
+    cursor.execute('''
+        CREATE TABLE transaction_rollups (
+            month TEXT NOT NULL,
+            category TEXT NOT NULL,
+            type TEXT NOT NULL,
+            currency TEXT NOT NULL,
+            total INTEGER NOT NULL DEFAULT 0,
+            count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (month, category, type, currency)
+        ) WITHOUT ROWID
+    ''')
+    cursor.execute(_REBUILD_NAME_ROLLUPS_SQL)
+
+
+
+# Spellings of a date that legacy rows may hold; anything else is left as it
+# was, with a NULL day. Written out here rather than shared with the model so
+# the step keeps meaning what it meant when it shipped.
+_LEGACY_DATE_FORMATS = ('%Y-%m-%d', '%Y/%m/%d', '%Y.%m.%d', '%Y%m%d')
+
+
+def _legacy_iso_date(value):
+    value = value.strip().replace('T', ' ').split(' ')[0]
+    for date_format in _LEGACY_DATE_FORMATS:
+        try:
+            return datetime.strptime(value, date_format).strftime('%Y-%m-%d')
+        except ValueError:
+            pass
+    return None
+
+
+def _transaction_day(cursor):
+    # Dates were stored as typed, so rewrite every spelling that can be read
+    # as a date to YYYY-MM-DD; the rollup triggers move rows whose month
+    # changes. One UPDATE per distinct spelling, not per row.
+    rewrites, unreadable = [], 0
+    for (value,) in cursor.execute("SELECT DISTINCT date FROM transactions WHERE date IS NOT NULL").fetchall():
+        iso_date = _legacy_iso_date(value)
+        if iso_date is None:
+            unreadable += 1
+        elif iso_date != value:
+            rewrites.append((iso_date, value))
+    cursor.executemany("UPDATE transactions SET date = ? WHERE date = ?", rewrites)
+    if rewrites or unreadable:
+        logger.info(f"Normalized {len(rewrites)} transaction date spellings; {unreadable} could not be read")
+
+    # Days since 1970-01-01, derived by SQLite itself so no write path can let
+    # it disagree with date. Range predicates compare integers on this index
+    # instead of strings, and it orders rows exactly as the ISO dates do, so
+    # the date sort indexes move over to it as well.
+    cursor.execute("""
+        ALTER TABLE transactions
+        ADD COLUMN day INTEGER GENERATED ALWAYS AS (CAST(julianday(date) - 2440587.5 AS INTEGER)) VIRTUAL
+    """)
+    cursor.execute("DROP INDEX IF EXISTS idx_transactions_date")
+    cursor.execute("DROP INDEX IF EXISTS idx_transactions_category_date")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_transactions_day ON transactions(day)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_transactions_category_day ON transactions(category, day)")
+
+
+
+def _category_ids(cursor):
+    # Every category name in use becomes a categories row, so the rebuilt
+    # tables can refer to it by id
+    for table in ('transactions', 'monthly_budgets'):
+        cursor.execute(f"""
+            INSERT OR IGNORE INTO categories (name)
+            SELECT DISTINCT category FROM {table}
+            WHERE category IS NOT NULL AND category != '' AND category != 'TotalIncome'
+        """)
+
+    # Total income lived in a sentinel 'TotalIncome' budget row, which has no
+    # category to refer to; it gets a table of its own
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS monthly_income (
+            month TEXT PRIMARY KEY,
+            total_income INTEGER NOT NULL DEFAULT 0
+        ) WITHOUT ROWID
+    """)
+    cursor.execute("""
+        INSERT OR REPLACE INTO monthly_income (month, total_income)
+        SELECT month, ifnull(total_income, 0) FROM monthly_budgets WHERE category = 'TotalIncome'
+    """)
+
+    cursor.execute("""
+        CREATE TABLE monthly_budgets_new (
+            id INTEGER PRIMARY KEY,
+            month TEXT NOT NULL,
+            category_id INTEGER NOT NULL REFERENCES categories(id),
+            amount INTEGER NOT NULL,
+            item_type TEXT DEFAULT 'Mandatory'
+        )
+    """)
+    cursor.execute("""
+        INSERT INTO monthly_budgets_new (id, month, category_id, amount, item_type)
+        SELECT b.id, b.month, c.id, b.amount, b.item_type
+        FROM monthly_budgets b JOIN categories c ON c.name = b.category
+    """)
+    cursor.execute("DROP TABLE monthly_budgets")
+    cursor.execute("ALTER TABLE monthly_budgets_new RENAME TO monthly_budgets")
+    cursor.execute("""
+        CREATE UNIQUE INDEX idx_monthly_budgets_month_category
+        ON monthly_budgets(month, category_id)
+    """)
+
+    # Rebuilt with ids kept, so the external-content FTS index still lines
+    # up. Its triggers and the change log's are recreated as they were; the
+    # rollup triggers and the category indexes are rewritten for category_id.
+    triggers = [row[0] for row in cursor.execute("""
+        SELECT sql FROM sqlite_master
+        WHERE tbl_name = 'transactions' AND type = 'trigger' AND name NOT LIKE 'trg_transactions_rollup_%'
+    """)]
+    cursor.execute("""
+        CREATE TABLE transactions_new (
+            id INTEGER PRIMARY KEY,
+            date TEXT,
+            category_id INTEGER REFERENCES categories(id),
+            amount INTEGER,
+            type TEXT,
+            comment TEXT,
+            currency TEXT,
+            goal_id INTEGER,
+            day INTEGER GENERATED ALWAYS AS (CAST(julianday(date) - 2440587.5 AS INTEGER)) VIRTUAL
+        )
+    """)
+    cursor.execute("""
+        INSERT INTO transactions_new (id, date, category_id, amount, type, comment, currency, goal_id)
+        SELECT t.id, t.date, c.id, t.amount, t.type, t.comment, t.currency, t.goal_id
+        FROM transactions t LEFT JOIN categories c ON c.name = t.category
+    """)
+    cursor.execute("DROP TABLE transactions")
+    cursor.execute("ALTER TABLE transactions_new RENAME TO transactions")
+    cursor.execute("CREATE INDEX idx_transactions_day ON transactions(day)")
+    cursor.execute("CREATE INDEX idx_transactions_category_day ON transactions(category_id, day)")
+    cursor.execute("""
+        CREATE INDEX idx_transactions_category_type_day
+        ON transactions(category_id, type, day, amount)
+    """)
+    cursor.execute("CREATE INDEX idx_transactions_goal_id ON transactions(goal_id)")
+    cursor.execute("CREATE INDEX idx_transactions_amount ON transactions(amount)")
+    for sql in triggers:
+        cursor.execute(sql)
+
+    cursor.execute("DROP TABLE IF EXISTS transaction_rollups")
+    cursor.execute("""
+        CREATE TABLE transaction_rollups (
+            month TEXT NOT NULL,
+            category_id INTEGER NOT NULL,
+            type TEXT NOT NULL,
+            currency TEXT NOT NULL,
+            total INTEGER NOT NULL DEFAULT 0,
+            count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (month, category_id, type, currency)
+        ) WITHOUT ROWID
+    """)
+    cursor.execute(f"""
+        CREATE TRIGGER trg_transactions_rollup_insert
+        AFTER INSERT ON transactions
+        BEGIN {_rollup_add('NEW', _CATEGORY_ID_KEY)} END
+    """)
+    cursor.execute(f"""
+        CREATE TRIGGER trg_transactions_rollup_delete
+        AFTER DELETE ON transactions
+        BEGIN {_rollup_remove('OLD', _CATEGORY_ID_KEY)} END
+    """)
+    cursor.execute(f"""
+        CREATE TRIGGER trg_transactions_rollup_update
+        AFTER UPDATE OF date, category_id, amount, type, currency ON transactions
+        BEGIN {_rollup_remove('OLD', _CATEGORY_ID_KEY)} {_rollup_add('NEW', _CATEGORY_ID_KEY)} END
+    """)
+    cursor.execute(REBUILD_ROLLUPS_SQL)
+
+
+def _budget_templates(cursor):
+    # A template is a named set of budget lines, stamped onto months on demand
+    cursor.execute("""
+        CREATE TABLE budget_templates (
+            id INTEGER PRIMARY KEY,
+            name TEXT NOT NULL UNIQUE
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE budget_template_items (
+            template_id INTEGER NOT NULL REFERENCES budget_templates(id),
+            category_id INTEGER NOT NULL REFERENCES categories(id),
+            amount INTEGER NOT NULL,
+            item_type TEXT DEFAULT 'Mandatory',
+            PRIMARY KEY (template_id, category_id)
+        ) WITHOUT ROWID
+    """)
+
+
+def _undated_day_indexes(cursor):
+    # Legacy rows whose date could not be read have a NULL day, and a keyset
+    # row-value comparison against NULL is never true, so paging stopped at
+    # them. The date sort indexes key those rows on a day before any real one
+    # instead; the model orders and seeks on the same expression. Written out
+    # here rather than shared with the model, like the date formats above.
+    cursor.execute("DROP INDEX IF EXISTS idx_transactions_day")
+    cursor.execute("DROP INDEX IF EXISTS idx_transactions_category_day")
+    cursor.execute("CREATE INDEX idx_transactions_day ON transactions(ifnull(day, -2147483648))")
+    cursor.execute("""
+        CREATE INDEX idx_transactions_category_day
+        ON transactions(category_id, ifnull(day, -2147483648))
+    """)
+
+
+# Ordered (version, description, step) triples. Append new steps to the end;
+# never edit or reorder a step that has shipped, because databases record
+# the last version they ran in PRAGMA user_version.
+MIGRATIONS = (
+    (1, "Baseline schema", _baseline_schema),
+    (2, "Secondary indexes and unique monthly budgets", _query_indexes),
+    (3, "Statement import fingerprints", _import_fingerprints),
+    (4, "Monthly transaction rollups", _transaction_rollups),
+    (5, "Transaction list sort indexes", _sort_indexes),
+    (6, "Full-text search over transaction comments", _comment_search),
+    (7, "Transaction change log", _transaction_change_log),
+    (8, "Money as integer minor units", _integer_money),
+    (9, "Normalized dates and an indexed integer transaction day", _transaction_day),
+    (10, "Category ids on transactions and budgets", _category_ids),
+    (11, "Budget templates", _budget_templates),
+    (12, "Date sort indexes that key undated transactions", _undated_day_indexes),
+)
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+def get_schema_version(conn):
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate(conn):
+    """Run every migration newer than the database's user_version, in order.
+
+    Each step commits together with its version bump, so an interrupted run
+    resumes from the first step that did not finish. Returns the versions
+    that were applied.
+    """
+    applied = []
+    version = get_schema_version(conn)
+    for target, description, step in MIGRATIONS:
+        if target <= version:
+            continue
+        logger.info(f"Migrating database to version {target}: {description}")
+        conn.commit()
+        conn.execute("BEGIN")
+        try:
+            step(conn.cursor())
+            conn.execute(f"PRAGMA user_version = {target}")
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            logger.exception(f"Migration to version {target} failed")
+            raise
+        applied.append(target)
+    return applied
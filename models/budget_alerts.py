@@ -0,0 +1,138 @@
+"""Alerts for budget lines whose spending crosses a share of their budget.
+
+BudgetAlerts keeps a running expense total per (month, category) for the
+budget lines that have been spent on, and TransactionModel hands it the
+change each committed add, bulk import or delete makes to those totals.
+Checking thresholds is then a dictionary update per line touched: a line's
+total is read from the rollups by primary key the first time it changes, and
+a month's budget lines with one indexed query, again whenever budgets are
+written. Nothing rescans the transactions.
+
+The totals follow writes made through the models of this process only.
+"""
+import logging
+import threading
+
+from database import db_connection, get_table_versions
+from models.category import get_category_registry
+from models.money import to_major
+
+logger = logging.getLogger(__name__)
+
+# Shares of a line's budget whose crossing is reported
+DEFAULT_THRESHOLDS = (0.8, 1.0)
+
+
+class BudgetAlerts:
+    def __init__(self, thresholds=DEFAULT_THRESHOLDS):
+        self.thresholds = tuple(sorted(thresholds))
+        self.category_thresholds = {}
+        self._spent = {}  # (month, category_id): minor units spent
+        self._budgets = {}  # month: (monthly_budgets version, {category_id: minor units budgeted})
+        self._database = None
+        self._listeners = []
+        self._lock = threading.Lock()
+
+    def add_listener(self, listener):
+        """Call `listener(alerts)` with the alerts of each write that crosses a threshold.
+
+        It runs on the thread that wrote, after the commit. Each alert is a
+        dict of 'month' ('YYYY-MM'), 'category', 'threshold' (the highest
+        share crossed), 'spent' and 'budgeted'.
+        """
+        self._listeners.append(listener)
+
+    def remove_listener(self, listener):
+        self._listeners.remove(listener)
+
+    def set_thresholds(self, thresholds, category=None):
+        """Alert at these shares of the budget, e.g. (0.5, 0.9, 1.0), for every line or only `category`'s.
+
+        Thresholds of None give `category` the default ones back.
+        """
+        if category is None:
+            self.thresholds = tuple(sorted(thresholds))
+        elif thresholds is None:
+            self.category_thresholds.pop(category, None)
+        else:
+            self.category_thresholds[category] = tuple(sorted(thresholds))
+
+    def reset(self):
+        """Forget the running totals, e.g. after the rollups were rebuilt."""
+        with self._lock:
+            self._spent.clear()
+            self._budgets.clear()
+
+    def record(self, deltas):
+        """Apply committed changes to expense totals, {(month, category_id): minor units}, and notify listeners.
+
+        Returns the alerts raised.
+        """
+        with self._lock:
+            # A different database starts from nothing
+            database = get_table_versions(())
+            if database != self._database:
+                self._spent.clear()
+                self._budgets.clear()
+                self._database = database
+
+            try:
+                alerts = self._apply(deltas)
+            except Exception:
+                # Totals part-updated would drift; they are read afresh instead
+                self._spent.clear()
+                self._budgets.clear()
+                raise
+
+        for listener in list(self._listeners) if alerts else ():
+            try:
+                listener(alerts)
+            except Exception:
+                logger.exception("Error delivering budget alerts")
+        return alerts
+
+    def _apply(self, deltas):
+        registry = get_category_registry()
+        alerts = []
+        for (month, category_id), delta in deltas.items():
+            key = (month, category_id)
+            spent = self._spent.get(key)
+            if spent is not None:
+                self._spent[key] = spent + delta
+            budgeted = self._month_budget(month).get(category_id)
+            if not delta or not budgeted:
+                continue
+            if spent is None:
+                # Read after the commit, so the total already includes this change
+                self._spent[key] = self._read_spent(month, category_id)
+                spent = self._spent[key] - delta
+            category = registry.name(category_id)
+            thresholds = self.category_thresholds.get(category, self.thresholds)
+            crossed = [threshold for threshold in thresholds
+                       if spent < threshold * budgeted <= self._spent[key]]
+            if crossed:
+                alerts.append({'month': month, 'category': category, 'threshold': crossed[-1],
+                               'spent': to_major(self._spent[key]), 'budgeted': to_major(budgeted)})
+        return alerts
+
+    def _month_budget(self, month):
+        versions = get_table_versions(('monthly_budgets',))
+        cached = self._budgets.get(month)
+        if cached is None or cached[0] != versions:
+            with db_connection() as conn:
+                lines = dict(conn.execute("SELECT category_id, amount FROM monthly_budgets WHERE month = ?",
+                                          (month,)).fetchall())
+            cached = self._budgets[month] = (versions, lines)
+        return cached[1]
+
+    @staticmethod
+    def _read_spent(month, category_id):
+        with db_connection() as conn:
+            total = conn.execute('''
+                SELECT SUM(total) FROM transaction_rollups
+                WHERE month = ? AND category_id = ? AND type = 'Expense'
+            ''', (month, category_id)).fetchone()[0]
+        return total or 0
+
+
+budget_alerts = BudgetAlerts()
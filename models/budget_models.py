@@ -1,158 +1,442 @@
 # In a new file called budget_models.py
 
-from database import get_db_connection
+from database import db_connection, record_write
+from migrations import WELL_FORMED_MONTH
+from models.budget_suggestion import HISTORY_MONTHS, ITEM_TYPES, classify, fit_to_income, quantile_amounts
+from models.budget_variance import BudgetVariance
+from models.category import NO_CATEGORY_ID, get_category_registry
+from models.money import Money, to_major, to_minor
+from models.read_cache import cached_read
 from datetime import datetime
 from dateutil.relativedelta import relativedelta
 import logging
 
+import numpy as np
+
 logger = logging.getLogger(__name__)
 
 
+def _month_key(month):
+    """'YYYY-MM' for a date, datetime or 'YYYY-MM' string."""
+    return month if isinstance(month, str) else month.strftime('%Y-%m')
+
+
+def _budget_items(budget):
+    """(category, amount, item_type) for a budget mapping categories to amounts or {'amount', 'type'} dicts."""
+    for category, item in budget.items():
+        if isinstance(item, dict):
+            yield category, item['amount'], item.get('type', 'Mandatory')
+        else:
+            yield category, item, 'Mandatory'
+
+
+def _plan_rows(lines, first_month, steps, inflation=0.0, overrides=None):
+    """monthly_budgets rows stamping budget lines onto consecutive months.
+
+    `lines` are (category_id, minor amount, item_type) and `steps` gives, for
+    each planned month from `first_month` ('YYYY-MM') on, how many months it
+    lies after the month the lines come from. Amounts grow by `inflation`, a
+    rate per month compounded over the steps, in one array operation over
+    the whole (months x categories) plan. `overrides` maps months to
+    {category_id: minor amount}, where None leaves the line out of that month.
+    """
+    steps = np.asarray(steps)
+    months = (np.datetime64(first_month, 'M') + np.arange(len(steps))).astype(str)
+    category_ids = [category_id for category_id, _, _ in lines]
+    item_types = [item_type for _, _, item_type in lines]
+    base = [amount for _, amount, _ in lines]
+
+    # Categories only an override budgets become extra columns, absent elsewhere
+    for changes in (overrides or {}).values():
+        for category_id in changes:
+            if category_id not in category_ids:
+                category_ids.append(category_id)
+                item_types.append('Mandatory')
+                base.append(0)
+    present = np.zeros((len(steps), len(category_ids)), dtype=bool)
+    present[:, :len(lines)] = True
+
+    growth = (1 + inflation) ** steps.astype(np.float64)
+    amounts = np.rint(growth[:, None] * np.array(base, dtype=np.float64)[None, :]).astype(np.int64)
+
+    columns = {category_id: column for column, category_id in enumerate(category_ids)}
+    rows = {month: row for row, month in enumerate(months)}
+    for month, changes in (overrides or {}).items():
+        row = rows.get(_month_key(month))
+        if row is None:
+            raise ValueError(f"Override for {_month_key(month)} falls outside the planned months "
+                             f"{months[0]} to {months[-1]}")
+        for category_id, amount in changes.items():
+            present[row, columns[category_id]] = amount is not None
+            if amount is not None:
+                amounts[row, columns[category_id]] = amount
+
+    planned_rows, planned_columns = np.nonzero(present)
+    month_list = months.tolist()
+    return [(month_list[row], category_ids[column], amount, item_types[column])
+            for row, column, amount in zip(planned_rows.tolist(), planned_columns.tolist(),
+                                           amounts[planned_rows, planned_columns].tolist())]
+
+
 class BudgetModel:
-    def __init__(self):
-        self.init_table()
-
-    def init_table(self):
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS monthly_budgets (
-                id INTEGER PRIMARY KEY,
-                month TEXT NOT NULL,
-                category TEXT NOT NULL,
-                amount REAL NOT NULL,
-                item_type TEXT DEFAULT 'Mandatory',
-                total_income REAL DEFAULT 0
-            )
-        ''')
-        conn.commit()
-        conn.close()
+    """Monthly budgets, by category name.
+
+    Budget rows refer to categories by id; names go in and come out through
+    the category registry. Reads are served from the read cache until a
+    budget, income or transaction is written.
+    """
 
+    @cached_read('monthly_budgets', 'monthly_income')
     def get_available_months(self):
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute("SELECT DISTINCT month FROM monthly_budgets ORDER BY month")
-        months = [datetime.strptime(row[0], '%Y-%m') for row in cursor.fetchall()]
-        conn.close()
+        with db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT month FROM monthly_budgets
+                UNION
+                SELECT month FROM monthly_income
+                ORDER BY month
+            """)
+            months = [datetime.strptime(row[0], '%Y-%m') for row in cursor.fetchall()]
         return months
 
+    @cached_read('monthly_budgets', 'categories')
     def get_budget(self, month):
-        conn = get_db_connection()
-        cursor = conn.cursor()
-
-        # First, check if item_type column exists
-        cursor.execute("PRAGMA table_info(monthly_budgets)")
-        columns = [column[1] for column in cursor.fetchall()]
-
-        if 'item_type' in columns:
-            cursor.execute(
-                "SELECT category, amount, item_type FROM monthly_budgets WHERE month = ?",
-                (month.strftime('%Y-%m'),)
-            )
-            budget = {row[0]: {'amount': row[1], 'type': row[2]} for row in cursor.fetchall()}
-        else:
-            cursor.execute(
-                "SELECT category, amount FROM monthly_budgets WHERE month = ?",
-                (month.strftime('%Y-%m'),)
-            )
-            budget = {row[0]: {'amount': row[1], 'type': 'Mandatory'} for row in cursor.fetchall()}
-
-        conn.close()
+        registry = get_category_registry()
+        with db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT category_id, amount, item_type FROM monthly_budgets WHERE month = ?",
+                           (month.strftime('%Y-%m'),))
+            budget = {registry.name(category_id): {'amount': to_major(amount), 'type': item_type}
+                      for category_id, amount, item_type in cursor.fetchall()}
         return budget
 
-    def create_budget(self, month, base_budget=None):
-        conn = get_db_connection()
-        cursor = conn.cursor()
+    @cached_read('monthly_budgets', 'transactions', 'categories')
+    def get_budget_report(self, month):
+        """Budgeted vs. actual spending for every budgeted category of `month`.
+
+        Returns {category: {'budgeted', 'actual', 'remaining', 'type'}} ordered
+        by category, from a single join against the monthly rollups. Amounts
+        are Money, so totals built from the report stay exact.
+        """
+        registry = get_category_registry()
+        with db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT b.category_id, b.amount, b.item_type, COALESCE(SUM(r.total), 0)
+                FROM monthly_budgets b
+                LEFT JOIN transaction_rollups r
+                    ON r.month = b.month AND r.category_id = b.category_id AND r.type = 'Expense'
+                WHERE b.month = ?
+                GROUP BY b.category_id
+            ''', (month.strftime('%Y-%m'),))
+            rows = [(registry.name(category_id), budgeted, item_type, actual)
+                    for category_id, budgeted, item_type, actual in cursor.fetchall()]
+        return {
+            category: {'budgeted': Money(budgeted), 'actual': Money(actual), 'remaining': Money(budgeted - actual),
+                       'type': item_type}
+            for category, budgeted, item_type, actual in sorted(rows)
+        }
+
+    @cached_read('monthly_budgets', 'transactions', 'categories')
+    def get_budget_variance(self):
+        """Budgeted vs. actual spending of every category ever budgeted, over all months, as a BudgetVariance.
+
+        One pass over the budgets, each line joined to its month's expense
+        rollups by primary key, then over the spending of budgeted categories
+        in months that leave them out. Spending without a readable date has
+        no month to compare against and is left out.
+        """
+        month_number = "(CAST(substr(month, 1, 4) AS INTEGER) * 12 + CAST(substr(month, 6, 2) AS INTEGER) - 1)"
+        with db_connection() as conn:
+            rows = conn.execute(f'''
+                SELECT {month_number}, category_id, amount,
+                       ifnull((SELECT SUM(r.total) FROM transaction_rollups r
+                               WHERE r.month = monthly_budgets.month AND r.category_id = monthly_budgets.category_id
+                                 AND r.type = 'Expense'), 0),
+                       1
+                FROM monthly_budgets
+                WHERE {WELL_FORMED_MONTH}
+                UNION ALL
+                SELECT {month_number}, category_id, 0, SUM(total), 0
+                FROM transaction_rollups
+                WHERE type = 'Expense' AND {WELL_FORMED_MONTH} AND category_id IN (SELECT category_id FROM monthly_budgets)
+                  AND NOT EXISTS (SELECT 1 FROM monthly_budgets b
+                                  WHERE b.month = transaction_rollups.month
+                                    AND b.category_id = transaction_rollups.category_id)
+                GROUP BY month, category_id
+            ''').fetchall()
+        covering = max((row[1] for row in rows), default=0)
+        return BudgetVariance.from_rows(rows, get_category_registry().names(covering))
 
+    def suggest_budget(self, month, total_income=None, history_months=HISTORY_MONTHS):
+        """A budget for `month` drawn from the spending of the `history_months` months before it.
+
+        Returns {category: {'amount', 'type'}}, like get_budget, fitted to
+        `total_income` or else to the month's saved income. The spending
+        quantiles are cached until a transaction, budget or category is
+        written, so asking again, even with another income, costs no query.
+        """
+        categories, type_index, amounts = self._spending_profile(month, history_months)
+        if total_income is None:
+            total_income = self.get_total_income(month)
+        amounts = fit_to_income(amounts, type_index, to_minor(total_income))
+        return {category: {'amount': to_major(amount), 'type': ITEM_TYPES[index]}
+                for category, index, amount in zip(categories, type_index.tolist(), amounts.tolist())}
+
+    @cached_read('transactions', 'monthly_budgets', 'categories')
+    def _spending_profile(self, month, history_months):
+        """(categories, ITEM_TYPES indexes, quantile amounts) of every category spent on in the months before `month`.
+
+        Categories keep the type of their line in the latest budget before
+        `month`; the others are typed by how regularly they are spent on.
+        Uncategorized spending has no line to budget and is left out.
+        """
+        registry = get_category_registry()
+        with db_connection() as conn:
+            rows = conn.execute('''
+                SELECT month, category_id, SUM(total) FROM transaction_rollups
+                WHERE type = 'Expense' AND month >= ? AND month < ? AND category_id != ?
+                GROUP BY month, category_id
+            ''', (_month_key(month - relativedelta(months=history_months)), _month_key(month),
+                  NO_CATEGORY_ID)).fetchall()
+            budgeted_types = dict(conn.execute('''
+                SELECT category_id, item_type FROM monthly_budgets
+                WHERE month = (SELECT max(month) FROM monthly_budgets WHERE month < ?)
+            ''', (_month_key(month),)).fetchall())
+        if not rows:
+            return [], np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+
+        # History starts at the first month with any spending, so a short one
+        # is not padded out with months that had no transactions yet
+        months, category_ids = sorted({row[0] for row in rows}), sorted({row[1] for row in rows})
+        first = datetime.strptime(months[0], '%Y-%m')
+        span = (month.year - first.year) * 12 + month.month - first.month
+        month_rows = {_month_key(first + relativedelta(months=offset)): offset for offset in range(span)}
+        columns = {category_id: column for column, category_id in enumerate(category_ids)}
+        spending = np.zeros((span, len(category_ids)), dtype=np.int64)
+        for spent_month, category_id, total in rows:
+            spending[month_rows[spent_month], columns[category_id]] = total
+
+        type_index = classify(spending)
+        for column, category_id in enumerate(category_ids):
+            if budgeted_types.get(category_id) in ITEM_TYPES:
+                type_index[column] = ITEM_TYPES.index(budgeted_types[category_id])
+        return [registry.name(category_id) for category_id in category_ids], type_index, \
+            quantile_amounts(spending, type_index)
+
+    def create_budget(self, month, base_budget=None):
+        """Budget `month` with `base_budget`, shaped as get_budget returns it, or else with the month before's."""
         if base_budget is None:
-            base_budget = self.get_budget(month - relativedelta(months=1))
+            self.roll_forward(1, from_month=month - relativedelta(months=1))
+            return
 
-        for category, amount in base_budget.items():
-            cursor.execute(
-                "INSERT INTO monthly_budgets (month, category, amount) VALUES (?, ?, ?)",
-                (month.strftime('%Y-%m'), category, amount)
-            )
+        registry = get_category_registry()
+        try:
+            with db_connection() as conn:
+                record_write('monthly_budgets')
+                conn.executemany(
+                    "INSERT OR REPLACE INTO monthly_budgets (month, category_id, amount, item_type) VALUES (?, ?, ?, ?)",
+                    [(month.strftime('%Y-%m'), registry.ensure(category), to_minor(amount), item_type)
+                     for category, amount, item_type in _budget_items(base_budget)])
+        except Exception:
+            registry.invalidate()
+            raise
 
-        conn.commit()
-        conn.close()
+    def roll_forward(self, months, from_month=None, inflation=0.0, overrides=None):
+        """Copy a month's budget onto each of the `months` months after it, in one transaction.
 
-    def update_budget(self, month, new_budget):
-        conn = get_db_connection()
-        cursor = conn.cursor()
-
-        # Check if item_type column exists
-        cursor.execute("PRAGMA table_info(monthly_budgets)")
-        columns = [column[1] for column in cursor.fetchall()]
-
-        for category, item in new_budget.items():
-            if isinstance(item, dict):
-                amount = item['amount']
-                item_type = item.get('type', 'Mandatory')
-            else:
-                amount = item
-                item_type = 'Mandatory'
-
-            if 'item_type' in columns:
-                cursor.execute('''
-                    INSERT OR REPLACE INTO monthly_budgets (month, category, amount, item_type)
+        `from_month` defaults to the latest budgeted month. Amounts grow by
+        `inflation` per month, compounded (0.002 adds 0.2% a month), and
+        `overrides` maps months to {category: amount}, an amount of None
+        dropping that line for the month. Lines already budgeted in those
+        months are replaced. Returns the months written, as datetimes.
+        """
+        with db_connection() as conn:
+            if from_month is None:
+                latest = conn.execute("SELECT max(month) FROM monthly_budgets").fetchone()[0]
+                if latest is None:
+                    return []
+                from_month = datetime.strptime(latest, '%Y-%m')
+            lines = conn.execute("SELECT category_id, amount, item_type FROM monthly_budgets WHERE month = ?",
+                                 (_month_key(from_month),)).fetchall()
+        first_month = _month_key(from_month + relativedelta(months=1))
+        return self._write_plan(lines, first_month, np.arange(1, months + 1), inflation, overrides)
+
+    def _write_plan(self, lines, first_month, steps, inflation, overrides):
+        registry = get_category_registry()
+        try:
+            with db_connection() as conn:
+                record_write('monthly_budgets')
+                overrides = {month: {registry.ensure(category): to_minor(amount)
+                                     for category, amount in changes.items()}
+                             for month, changes in (overrides or {}).items()}
+                rows = _plan_rows(lines, first_month, steps, inflation, overrides)
+                conn.executemany(
+                    "INSERT OR REPLACE INTO monthly_budgets (month, category_id, amount, item_type) VALUES (?, ?, ?, ?)",
+                    rows)
+        except Exception:
+            registry.invalidate()
+            raise
+        logger.info(f"Planned {len(rows)} budget lines over {len(steps)} months from {first_month}")
+        start = datetime.strptime(first_month, '%Y-%m')
+        return [start + relativedelta(months=offset) for offset in range(len(steps))]
+
+    # Templates
+
+    @cached_read('budget_templates')
+    def get_template_names(self):
+        with db_connection() as conn:
+            return [row[0] for row in conn.execute("SELECT name FROM budget_templates ORDER BY name")]
+
+    @cached_read('budget_templates', 'categories')
+    def get_template(self, name):
+        """The lines of template `name` as {category: {'amount', 'type'}}, like get_budget."""
+        registry = get_category_registry()
+        with db_connection() as conn:
+            rows = conn.execute('''
+                SELECT i.category_id, i.amount, i.item_type
+                FROM budget_template_items i JOIN budget_templates t ON t.id = i.template_id
+                WHERE t.name = ?
+            ''', (name,)).fetchall()
+        return {registry.name(category_id): {'amount': to_major(amount), 'type': item_type}
+                for category_id, amount, item_type in rows}
+
+    def save_template(self, name, budget):
+        """Create or replace template `name` with `budget`, given as for create_budget."""
+        registry = get_category_registry()
+        try:
+            with db_connection() as conn:
+                template_id = self._reset_template(conn, name)
+                conn.executemany('''
+                    INSERT INTO budget_template_items (template_id, category_id, amount, item_type)
                     VALUES (?, ?, ?, ?)
-                ''', (month.strftime('%Y-%m'), category, amount, item_type))
-            else:
-                cursor.execute('''
-                    INSERT OR REPLACE INTO monthly_budgets (month, category, amount)
-                    VALUES (?, ?, ?)
-                ''', (month.strftime('%Y-%m'), category, amount))
+                ''', [(template_id, registry.ensure(category), to_minor(amount), item_type)
+                      for category, amount, item_type in _budget_items(budget)])
+        except Exception:
+            registry.invalidate()
+            raise
 
-        conn.commit()
-        conn.close()
+    def save_month_as_template(self, name, month):
+        """Create or replace template `name` with the budget of `month`."""
+        with db_connection() as conn:
+            template_id = self._reset_template(conn, name)
+            conn.execute('''
+                INSERT INTO budget_template_items (template_id, category_id, amount, item_type)
+                SELECT ?, category_id, amount, item_type FROM monthly_budgets WHERE month = ?
+            ''', (template_id, _month_key(month)))
 
-    def delete_budget_item(self, month, category):
-        conn = get_db_connection()
-        cursor = conn.cursor()
+    @staticmethod
+    def _reset_template(conn, name):
+        record_write('budget_templates')
+        conn.execute("INSERT OR IGNORE INTO budget_templates (name) VALUES (?)", (name,))
+        template_id = conn.execute("SELECT id FROM budget_templates WHERE name = ?", (name,)).fetchone()[0]
+        conn.execute("DELETE FROM budget_template_items WHERE template_id = ?", (template_id,))
+        return template_id
+
+    def delete_template(self, name):
+        with db_connection() as conn:
+            record_write('budget_templates')
+            conn.execute('''
+                DELETE FROM budget_template_items
+                WHERE template_id = (SELECT id FROM budget_templates WHERE name = ?)
+            ''', (name,))
+            conn.execute("DELETE FROM budget_templates WHERE name = ?", (name,))
+
+    def apply_template(self, name, start_month, months=1, inflation=0.0, overrides=None):
+        """Budget `months` months from `start_month` on with template `name`, in one transaction.
+
+        The first month gets the template as it is; `inflation` and
+        `overrides` work as for roll_forward. Returns the months written.
+        Raises ValueError if there is no such template.
+        """
+        with db_connection() as conn:
+            template = conn.execute("SELECT id FROM budget_templates WHERE name = ?", (name,)).fetchone()
+            if template is None:
+                raise ValueError(f"No budget template named {name!r}")
+            lines = conn.execute("SELECT category_id, amount, item_type FROM budget_template_items "
+                                 "WHERE template_id = ?", template).fetchall()
+        return self._write_plan(lines, _month_key(start_month), np.arange(months), inflation, overrides)
 
+    def update_budget(self, month, new_budget):
+        registry = get_category_registry()
         try:
-            cursor.execute('''
-                 DELETE FROM monthly_budgets
-                 WHERE month = ? AND category = ?
-             ''', (month.strftime('%Y-%m'), category))
+            with db_connection() as conn:
+                record_write('monthly_budgets')
+                cursor = conn.cursor()
+                for category, amount, item_type in _budget_items(new_budget):
+                    cursor.execute('''
+                        INSERT OR REPLACE INTO monthly_budgets (month, category_id, amount, item_type)
+                        VALUES (?, ?, ?, ?)
+                    ''', (month.strftime('%Y-%m'), registry.ensure(category), to_minor(amount), item_type))
+        except Exception:
+            registry.invalidate()
+            raise
+
+    def apply_changes(self, month, budget=None, deleted=(), total_income=None):
+        """Save a batch of edits to `month` in one unit of work, as BudgetSession.take_changes() returns them.
+
+        `budget` maps categories to {'amount', 'type'} to insert or replace,
+        `deleted` lists categories whose lines go, and `total_income`, unless
+        None, replaces the month's income.
+        """
+        month = month.strftime('%Y-%m')
+        registry = get_category_registry()
+        try:
+            with db_connection() as conn:
+                record_write('monthly_budgets', 'monthly_income')
+                conn.executemany('''
+                    INSERT OR REPLACE INTO monthly_budgets (month, category_id, amount, item_type)
+                    VALUES (?, ?, ?, ?)
+                ''', [(month, registry.ensure(category), to_minor(item['amount']), item['type'])
+                      for category, item in (budget or {}).items()])
+                conn.executemany("DELETE FROM monthly_budgets WHERE month = ? AND category_id = ?",
+                                 [(month, registry.id_of(category)) for category in deleted])
+                if total_income is not None:
+                    conn.execute("INSERT OR REPLACE INTO monthly_income (month, total_income) VALUES (?, ?)",
+                                 (month, to_minor(total_income)))
+        except Exception:
+            registry.invalidate()
+            raise
+        logger.info(f"Saved budget changes for {month}: {len(budget or {})} lines, {len(deleted)} deleted"
+                    f"{', income' if total_income is not None else ''}")
+
+    def delete_budget_item(self, month, category):
+        try:
+            with db_connection() as conn:
+                record_write('monthly_budgets')
+                cursor = conn.cursor()
+                cursor.execute('''
+                     DELETE FROM monthly_budgets
+                     WHERE month = ? AND category_id = ?
+                 ''', (month.strftime('%Y-%m'), get_category_registry().id_of(category)))
 
-            conn.commit()
             logger.info(f"Deleted budget item: {category} for {month.strftime('%Y-%m')}")
             return True
         except Exception as e:
-            conn.rollback()
             logger.exception(f"Error deleting budget item {category}: {str(e)}")
             return False
-        finally:
-            conn.close()
 
     def update_total_income(self, month, total_income):
-        conn = get_db_connection()
-        cursor = conn.cursor()
         try:
-            cursor.execute('''
-                INSERT OR REPLACE INTO monthly_budgets (month, category, amount, total_income)
-                VALUES (?, 'TotalIncome', 0, ?)
-            ''', (month.strftime('%Y-%m'), total_income))
-            conn.commit()
+            with db_connection() as conn:
+                record_write('monthly_income')
+                cursor = conn.cursor()
+                cursor.execute('''
+                    INSERT OR REPLACE INTO monthly_income (month, total_income)
+                    VALUES (?, ?)
+                ''', (month.strftime('%Y-%m'), to_minor(total_income)))
             logger.info(f"Updated total income for {month.strftime('%Y-%m')}: {total_income}")
         except Exception as e:
             logger.exception(f"Error updating total income: {str(e)}")
-        finally:
-            conn.close()
 
+    @cached_read('monthly_income')
     def get_total_income(self, month):
-        conn = get_db_connection()
-        cursor = conn.cursor()
         try:
-            cursor.execute('''
-                SELECT total_income FROM monthly_budgets
-                WHERE month = ? AND category = 'TotalIncome'
-            ''', (month.strftime('%Y-%m'),))
-            result = cursor.fetchone()
-            return result[0] if result else 0
+            with db_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute("SELECT total_income FROM monthly_income WHERE month = ?", (month.strftime('%Y-%m'),))
+                result = cursor.fetchone()
+            return to_major(result[0]) if result and result[0] is not None else 0
         except Exception as e:
             logger.exception(f"Error retrieving total income: {str(e)}")
             return 0
-        finally:
-            conn.close()
\ No newline at end of file
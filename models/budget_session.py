@@ -0,0 +1,145 @@
+"""The budget of one month, as the budget planner edits it.
+
+A BudgetSession holds the month's budget lines, total income and actual
+spending as Money, and keeps the totals as running sums: an edit moves them
+by its difference instead of re-adding every line, and nothing is parsed back
+out of widgets or read from the database. Edits are remembered as pending
+changes until the planner takes them and writes them with
+BudgetModel.apply_changes().
+"""
+from models.money import Money
+
+
+class BudgetLine:
+    __slots__ = ('budgeted', 'actual', 'item_type')
+
+    def __init__(self, budgeted=Money(), actual=Money(), item_type='Mandatory'):
+        self.budgeted = budgeted
+        self.actual = actual
+        self.item_type = item_type
+
+    @property
+    def remaining(self):
+        return self.budgeted - self.actual
+
+
+class BudgetSession:
+    """Budget lines by category, income and totals of `month`, with the edits not yet saved."""
+
+    def __init__(self, month, total_income=Money()):
+        self.month = month
+        self.lines = {}
+        self.total_income = total_income
+        self.total_budgeted = Money()
+        self.total_actual = Money()
+        self._changed = set()
+        self._deleted = set()
+        self._income_changed = False
+
+    @classmethod
+    def from_report(cls, month, report, total_income):
+        """A session holding a BudgetModel.get_budget_report() and get_total_income() of `month`."""
+        session = cls(month, Money.from_major(total_income))
+        for category, item in report.items():
+            session._put(category, BudgetLine(item['budgeted'], item['actual'], item['type']))
+        return session
+
+    @classmethod
+    def load(cls, budget_model, month):
+        return cls.from_report(month, budget_model.get_budget_report(month), budget_model.get_total_income(month))
+
+    @property
+    def total_remaining(self):
+        """Budgeted minus spent, over all lines."""
+        return self.total_budgeted - self.total_actual
+
+    @property
+    def unallocated(self):
+        """Income not budgeted yet; negative when the budget exceeds it."""
+        return self.total_income - self.total_budgeted
+
+    # Edits
+
+    def set_income(self, amount):
+        """Set the month's income. Returns False if it already had that value."""
+        amount = Money.from_major(amount)
+        if amount == self.total_income:
+            return False
+        self.total_income = amount
+        self._income_changed = True
+        return True
+
+    def set_budgeted(self, category, amount, item_type=None):
+        """Set the budget of a line, adding the line if the month has none for `category`."""
+        amount = Money.from_major(amount)
+        line = self.lines.get(category)
+        if line is None:
+            self._put(category, BudgetLine(amount, Money(), item_type or 'Mandatory'))
+        else:
+            self.total_budgeted += amount - line.budgeted
+            line.budgeted = amount
+            if item_type is not None:
+                line.item_type = item_type
+        self._deleted.discard(category)
+        self._changed.add(category)
+
+    def add_to_budgeted(self, category, amount, item_type=None):
+        line = self.lines.get(category)
+        current = line.budgeted if line is not None else Money()
+        self.set_budgeted(category, current + Money.from_major(amount), item_type)
+
+    def remove(self, category):
+        line = self.lines.pop(category, None)
+        if line is not None:
+            self.total_budgeted -= line.budgeted
+            self.total_actual -= line.actual
+            self._changed.discard(category)
+            self._deleted.add(category)
+
+    def set_actual(self, category, amount):
+        """Set what was spent on a line, as read from the transactions; this is not saved."""
+        line = self.lines.get(category)
+        if line is not None:
+            amount = Money.from_major(amount)
+            self.total_actual += amount - line.actual
+            line.actual = amount
+
+    def _put(self, category, line):
+        self.lines[category] = line
+        self.total_budgeted += line.budgeted
+        self.total_actual += line.actual
+
+    # Saving
+
+    @property
+    def has_changes(self):
+        return bool(self._changed or self._deleted or self._income_changed)
+
+    def take_changes(self):
+        """The edits made since the last call, as BudgetModel.apply_changes() arguments, or None if there are none.
+
+        They count as saved from here on; if writing them fails, hand them
+        to restore_changes().
+        """
+        if not self.has_changes:
+            return None
+        changes = {
+            'month': self.month,
+            'budget': {category: {'amount': self.lines[category].budgeted, 'type': self.lines[category].item_type}
+                       for category in sorted(self._changed)},
+            'deleted': sorted(self._deleted),
+            'total_income': self.total_income if self._income_changed else None,
+        }
+        self._changed, self._deleted, self._income_changed = set(), set(), False
+        return changes
+
+    def restore_changes(self, changes):
+        """Mark changes that failed to save as pending again. Later edits of the same lines win."""
+        for category in changes['budget']:
+            if category in self.lines:
+                self._changed.add(category)
+        for category in changes['deleted']:
+            if category not in self.lines:
+                self._deleted.add(category)
+        if changes['total_income'] is not None:
+            self._income_changed = True
@@ -0,0 +1,62 @@
+"""Budget amounts suggested from past spending.
+
+Spending history is a (months x categories) matrix of monthly expense totals
+in minor units. Each category is typed by how regularly it is spent on and
+budgeted at a quantile of its monthly totals that fits the type: a
+Mandatory line covers all but its most expensive months, a Flexible line its
+typical month, an Optional line a lean one. The quantiles of every category
+come from one np.quantile over the month axis, and fitting the suggestion to
+the month's income scales whole types at a time.
+"""
+import numpy as np
+
+from models.money import MINOR_UNITS
+
+ITEM_TYPES = ('Mandatory', 'Flexible', 'Optional')
+# Quantile of the monthly totals budgeted for each item type
+QUANTILES = (0.9, 0.5, 0.25)
+# Share of months a category must be spent on to count as Mandatory or Flexible
+MANDATORY_SHARE = 0.9
+FLEXIBLE_SHARE = 0.5
+HISTORY_MONTHS = 12
+
+
+def classify(spending):
+    """Index into ITEM_TYPES for each column of `spending`, by the share of months spent on."""
+    share = (spending > 0).mean(axis=0) if len(spending) else np.zeros(spending.shape[1])
+    return np.where(share >= MANDATORY_SHARE, 0, np.where(share >= FLEXIBLE_SHARE, 1, 2))
+
+
+def quantile_amounts(spending, type_index):
+    """Minor amounts of whole major units, each column at the quantile of its item type."""
+    if not len(spending):
+        return np.zeros(len(type_index), dtype=np.int64)
+    quantiles = np.quantile(spending, QUANTILES, axis=0)
+    chosen = quantiles[type_index, np.arange(len(type_index))]
+    return (np.ceil(chosen / MINOR_UNITS) * MINOR_UNITS).astype(np.int64)
+
+
+def fit_to_income(amounts, type_index, income):
+    """Scale `amounts` down so they add up to no more than `income` (minor units).
+
+    Types are funded in ITEM_TYPES order: Mandatory lines first, then
+    Flexible, then Optional, and the first type that does not fit in full is
+    scaled to what is left, leaving nothing for those after it. An income of
+    zero or less is taken as not known yet, and the amounts are kept.
+    """
+    if income <= 0:
+        return amounts
+    fitted = amounts.copy()
+    left = income
+    for index in range(len(ITEM_TYPES)):
+        lines = type_index == index
+        wanted = int(amounts[lines].sum())
+        if wanted <= left:
+            left -= wanted
+            continue
+        # Whole units, rounded down, so the scaled lines stay within income
+        scale = left / wanted
+        fitted[lines] = np.floor(amounts[lines] * scale / MINOR_UNITS).astype(np.int64) * MINOR_UNITS
+        fitted[type_index > index] = 0
+        break
+    return fitted
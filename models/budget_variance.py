@@ -0,0 +1,141 @@
+"""Budgeted vs. actual spending over every month at once.
+
+A BudgetVariance holds two (months x categories) matrices of minor units,
+budgeted and actual spending, over a contiguous run of months, so the
+questions asked of budget history are whole-array operations: a rolling mean
+is one cumulative sum down the month axis, an overspend streak one running
+count, a percentile one np.percentile per column.
+"""
+import numpy as np
+
+from models.money import MINOR_UNITS
+
+WINDOWS = (3, 6, 12)
+PERCENTILES = (50, 75, 90)
+
+
+class BudgetVariance:
+    """Budget history of the budgeted categories, one row per month and one column per category.
+
+    `months` are contiguous 'YYYY-MM' strings and `categories` names.
+    `budgeted` and `actual` are int64 minor units; `has_budget` marks the
+    cells that have a budget line, as a month can leave a category out.
+    Methods return major units.
+    """
+
+    def __init__(self, months, categories, budgeted, actual, has_budget):
+        self.months = list(months)
+        self.categories = list(categories)
+        self.budgeted = budgeted
+        self.actual = actual
+        self.has_budget = has_budget
+
+    @classmethod
+    def from_rows(cls, rows, category_names):
+        """Build from (month number, category_id, budgeted, actual, has_budget) rows.
+
+        Month numbers count months since year 0 (year * 12 + month - 1), and
+        `category_names` names the ids, as CategoryRegistry.names() does.
+        """
+        if not rows:
+            empty = np.zeros((0, 0), dtype=np.int64)
+            return cls([], [], empty, empty, empty.astype(bool))
+        month_numbers, category_ids, budgeted, actual, has_budget = np.array(rows, dtype=np.int64).T
+        first = int(month_numbers.min())
+        span = int(month_numbers.max()) - first + 1
+        # Category ids are small integers, so a lookup table maps them to
+        # columns without sorting
+        present_ids = np.flatnonzero(np.bincount(category_ids))
+        column_of = np.zeros(int(category_ids.max()) + 1, dtype=np.int64)
+        column_of[present_ids] = np.arange(len(present_ids))
+        cells = (month_numbers - first, column_of[category_ids])
+
+        shape = (span, len(present_ids))
+        budgeted_matrix = np.zeros(shape, dtype=np.int64)
+        actual_matrix = np.zeros(shape, dtype=np.int64)
+        has_budget_matrix = np.zeros(shape, dtype=bool)
+        budgeted_matrix[cells] = budgeted
+        actual_matrix[cells] = actual
+        has_budget_matrix[cells] = has_budget.astype(bool)
+
+        labels = (np.datetime64(f'{first // 12:04d}-{first % 12 + 1:02d}', 'M') + np.arange(span)).astype(str)
+        return cls(labels.tolist(), [category_names[category_id] for category_id in present_ids.tolist()],
+                   budgeted_matrix, actual_matrix, has_budget_matrix)
+
+    def until(self, month):
+        """The history up to and including `month` ('YYYY-MM'), which latest-month figures are then taken at."""
+        end = np.searchsorted(np.array(self.months), month, side='right')
+        return BudgetVariance(self.months[:end], self.categories, self.budgeted[:end], self.actual[:end],
+                              self.has_budget[:end])
+
+    @property
+    def variance(self):
+        """Budgeted minus actual per month and category: negative where a line was overspent."""
+        return (self.budgeted - self.actual) / MINOR_UNITS
+
+    @property
+    def overspent(self):
+        """Mask of the budgeted lines whose spending went over budget."""
+        return self.has_budget & (self.actual > self.budgeted)
+
+    def rolling_mean(self, window, of='actual'):
+        """Mean over the `window` months ending at each month, of 'actual', 'budgeted' or 'variance'.
+
+        Months before the first count as missing rather than zero, so early
+        windows average over the months there are.
+        """
+        values = self.budgeted - self.actual if of == 'variance' else getattr(self, of)
+        running = np.zeros((len(self.months) + 1, len(self.categories)), dtype=np.int64)
+        np.cumsum(values, axis=0, out=running[1:])
+        ends = np.arange(1, len(running))
+        starts = np.maximum(ends - window, 0)
+        return (running[ends] - running[starts]) / (ends - starts)[:, None] / MINOR_UNITS
+
+    def streaks(self):
+        """(current, longest) runs of consecutive overspent months per category."""
+        overspent = self.overspent
+        counts = np.cumsum(overspent, axis=0)
+        # The count as of each category's most recent on-budget month; the
+        # run length is how far the count has moved since
+        resets = np.maximum.accumulate(np.where(overspent, 0, counts), axis=0)
+        runs = counts - resets
+        if not len(runs):
+            return np.zeros(len(self.categories), dtype=np.int64), np.zeros(len(self.categories), dtype=np.int64)
+        return runs[-1], runs.max(axis=0)
+
+    def percentiles(self, q=PERCENTILES, of='actual'):
+        """(len(q) x categories) percentiles of monthly 'actual' spending or 'variance' over all months."""
+        values = self.budgeted - self.actual if of == 'variance' else getattr(self, of)
+        if not len(values):
+            return np.zeros((len(q), len(self.categories)))
+        return np.percentile(values, q, axis=0) / MINOR_UNITS
+
+    def summary(self):
+        """One dict per category, in category order, of totals, latest rolling means, streaks and percentiles."""
+        if not self.months:
+            return []
+        current, longest = self.streaks()
+        rolling = {window: self.rolling_mean(window) for window in WINDOWS}
+        percentiles = self.percentiles()
+        budgeted_months = self.has_budget.sum(axis=0)
+        overspent_months = self.overspent.sum(axis=0)
+        budgeted = self.budgeted.sum(axis=0)
+        actual = self.actual.sum(axis=0)
+        rows = []
+        for column, category in enumerate(self.categories):
+            row = {
+                'category': category,
+                'budgeted_months': int(budgeted_months[column]),
+                'budgeted': int(budgeted[column]) / MINOR_UNITS,
+                'actual': int(actual[column]) / MINOR_UNITS,
+                'variance': int(budgeted[column] - actual[column]) / MINOR_UNITS,
+                'overspent_months': int(overspent_months[column]),
+                'current_streak': int(current[column]),
+                'longest_streak': int(longest[column]),
+            }
+            for window in WINDOWS:
+                row[f'mean_{window}'] = float(rolling[window][-1, column])
+            for index, q in enumerate(PERCENTILES):
+                row[f'p{q}'] = float(percentiles[index, column])
+            rows.append(row)
+        return rows
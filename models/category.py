@@ -1,39 +1,162 @@
-from database import get_db_connection
+import threading
+
+from database import db_connection, get_database_path, get_schema_generation, record_write
+
+# The category id of transactions that have none; its name is ''
+NO_CATEGORY_ID = 0
+
+
+class CategoryRegistry:
+    """Category ids and names, held in memory.
+
+    Transactions, budgets and rollups store category ids; this is where they
+    turn back into names, without a query. CategoryModel keeps it current as
+    categories are added, renamed and deleted, and an id that is not known
+    yet (a category added by another process) reloads it.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._names = None  # indexed by id; None where no category has that id
+        self._ids = None
+
+    def _load(self):
+        if self._names is None:
+            with db_connection() as conn:
+                rows = conn.execute("SELECT id, name FROM categories").fetchall()
+            names = [None] * (max((category_id for category_id, _ in rows), default=0) + 1)
+            names[NO_CATEGORY_ID] = ''
+            for category_id, name in rows:
+                names[category_id] = name
+            self._names = names
+            self._ids = {name: category_id for category_id, name in rows}
+
+    def invalidate(self):
+        """Forget everything, e.g. after a rollback undid categories added through ensure()."""
+        with self._lock:
+            self._names = self._ids = None
+
+    def names(self, covering=NO_CATEGORY_ID):
+        """Category names as a list indexed by id, long enough to hold id `covering`."""
+        with self._lock:
+            self._load()
+            if covering >= len(self._names):
+                self._names = None
+                self._load()
+            if covering >= len(self._names):
+                self._names.extend([None] * (covering + 1 - len(self._names)))
+            return self._names
+
+    def name(self, category_id):
+        if category_id is None:
+            return ''
+        names = self.names(category_id)
+        return names[category_id]
+
+    def id_of(self, name):
+        """The id of category `name`, or None if there is no such category."""
+        if not name:
+            return None
+        with self._lock:
+            self._load()
+            return self._ids.get(name)
+
+    def ensure(self, name):
+        """The id of category `name`, creating the category if it does not exist yet.
+
+        The INSERT joins the caller's unit of work; if that rolls back, call
+        invalidate().
+        """
+        if not name:
+            return None
+        category_id = self.id_of(name)
+        if category_id is None:
+            with db_connection() as conn:
+                record_write('categories')
+                conn.execute("INSERT OR IGNORE INTO categories (name) VALUES (?)", (name,))
+                category_id = conn.execute("SELECT id FROM categories WHERE name = ?", (name,)).fetchone()[0]
+            self._set(category_id, name)
+        return category_id
+
+    def items(self):
+        """(id, name) of every category, by id."""
+        with self._lock:
+            self._load()
+            return [(category_id, name) for category_id, name in enumerate(self._names)
+                    if name and category_id != NO_CATEGORY_ID]
+
+    def _set(self, category_id, name):
+        with self._lock:
+            self._load()
+            if category_id >= len(self._names):
+                self._names.extend([None] * (category_id + 1 - len(self._names)))
+            old_name = self._names[category_id]
+            if old_name is not None:
+                self._ids.pop(old_name, None)
+            self._names[category_id] = name
+            if name is not None:
+                self._ids[name] = category_id
+
+
+_registry = None
+_registry_key = None
+_registry_lock = threading.Lock()
+
+
+def get_category_registry():
+    """The category registry of the current database, reloaded after a migration or a switch of database."""
+    global _registry, _registry_key
+    key = (get_database_path(), get_schema_generation())
+    with _registry_lock:
+        if _registry is None or _registry_key != key:
+            _registry, _registry_key = CategoryRegistry(), key
+        return _registry
+
 
 class CategoryModel:
+    @property
+    def registry(self):
+        return get_category_registry()
+
     def add_category(self, name):
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute("INSERT INTO categories (name) VALUES (?)", (name,))
-        conn.commit()
-        conn.close()
+        with db_connection() as conn:
+            record_write('categories')
+            cursor = conn.cursor()
+            cursor.execute("INSERT INTO categories (name) VALUES (?)", (name,))
+            self.registry._set(cursor.lastrowid, name)
 
     def get_all_categories(self):
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute("SELECT * FROM categories")
-        categories = cursor.fetchall()
-        conn.close()
-        return categories
+        return self.registry.items()
+
+    def rename_category(self, category_id, name):
+        """Rename a category everywhere at once: transactions, budgets and rollups refer to it by id."""
+        with db_connection() as conn:
+            record_write('categories')
+            conn.execute("UPDATE categories SET name = ? WHERE id = ?", (name, category_id))
+            self.registry._set(category_id, name)
 
     def delete_category(self, category_id):
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute("DELETE FROM categories WHERE id = ?", (category_id,))
-        conn.commit()
-        conn.close()
+        """Delete a category. Raises ValueError while transactions, budgets or templates still use it."""
+        with db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT (SELECT COUNT(*) FROM transactions WHERE category_id = ?),
+                       (SELECT COUNT(*) FROM monthly_budgets WHERE category_id = ?),
+                       (SELECT COUNT(*) FROM budget_template_items WHERE category_id = ?)
+            """, (category_id, category_id, category_id))
+            transactions, budgets, template_items = cursor.fetchone()
+            if transactions or budgets or template_items:
+                raise ValueError(f"Category {self.registry.name(category_id)!r} is still used by "
+                                 f"{transactions} transactions, {budgets} budget items and "
+                                 f"{template_items} template items")
+            record_write('categories')
+            cursor.execute("DELETE FROM categories WHERE id = ?", (category_id,))
+            self.registry._set(category_id, None)
 
     def get_category_names(self):
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute("SELECT name FROM categories")
-        categories = cursor.fetchall()
-        conn.close()
-        return [category[0] for category in categories]
+        return [name for _, name in self.registry.items()]
 
     def delete_category_by_name(self, name):
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute("DELETE FROM categories WHERE name = ?", (name,))
-        conn.commit()
-        conn.close()
\ No newline at end of file
+        category_id = self.registry.id_of(name)
+        if category_id is not None:
+            self.delete_category(category_id)
@@ -0,0 +1,251 @@
+"""Memory-mapped on-disk copy of the TransactionFrame columns.
+
+One .npy file per column lives in a directory beside the database, and
+frames open them with np.load(mmap_mode='r'): the operating system pages the
+history in on first touch and shares it with its file cache, so nothing is
+read from SQLite or copied into the Python heap at startup.
+
+meta.json records the highest transaction id copied (the high-water mark) and
+the last transaction_changes entry applied. A refresh appends rows above the
+mark in place; a column with updated or deleted rows is written out afresh
+and renamed over the old file, so frames already mapping it are left
+untouched. Only a missing, damaged or outdated cache costs a full read of
+the table.
+"""
+import io
+import json
+import logging
+import os
+import threading
+import time
+
+import numpy as np
+
+from database import db_connection, get_database_path
+from migrations import get_schema_version
+from models.category import get_category_registry
+from models.transaction_frame import FRAME_SELECT, TransactionFrame
+
+logger = logging.getLogger(__name__)
+
+FORMAT_VERSION = 3
+# File name and dtype of each column, in TransactionFrame argument order
+COLUMNS = (
+    ('ids', np.int64),
+    ('day', np.int32),
+    ('category', np.int32),
+    ('amount', np.int64),
+    ('type', np.int8),
+)
+REBUILD_BATCH_SIZE = 100_000
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def get_column_cache():
+    """The column cache beside the current database, or None for an in-memory database."""
+    path = get_database_path()
+    if path == ':memory:':
+        return None
+    with _caches_lock:
+        if path not in _caches:
+            _caches[path] = ColumnCache(os.path.splitext(path)[0] + '.columns')
+        return _caches[path]
+
+
+def _write_column(path, values):
+    # Written aside and renamed over the old file, so a crash never leaves a
+    # half-written column behind
+    temp_path = path + '.tmp'
+    np.save(temp_path, values, allow_pickle=False)
+    os.replace(temp_path + '.npy', path)
+
+
+def _append_column(path, values):
+    """Append to a 1-D .npy file in place. Returns False if its header cannot hold the new length."""
+    with open(path, 'r+b') as f:
+        version = np.lib.format.read_magic(f)
+        if version == (1, 0):
+            shape, _, dtype = np.lib.format.read_array_header_1_0(f)
+        else:
+            shape, _, dtype = np.lib.format.read_array_header_2_0(f)
+        data_offset = f.tell()
+
+        header = io.BytesIO()
+        header_data = {'descr': np.lib.format.dtype_to_descr(dtype), 'fortran_order': False,
+                       'shape': (shape[0] + len(values),)}
+        if version == (1, 0):
+            np.lib.format.write_array_header_1_0(header, header_data)
+        else:
+            np.lib.format.write_array_header_2_0(header, header_data)
+        if header.tell() != data_offset:
+            return False
+
+        # Data first, header last: until the header is rewritten the file
+        # still reads as the old, shorter array
+        f.seek(data_offset + shape[0] * dtype.itemsize)
+        f.write(np.ascontiguousarray(values, dtype=dtype).tobytes())
+        f.truncate()
+        f.flush()
+        f.seek(0)
+        f.write(header.getvalue())
+    return True
+
+
+def _last_change_seq(conn):
+    row = conn.execute("SELECT seq FROM sqlite_sequence WHERE name = 'transaction_changes'").fetchone()
+    return row[0] if row else 0
+
+
+class ColumnCache:
+    def __init__(self, directory):
+        self.directory = directory
+        self._meta = None
+        self._lock = threading.Lock()
+
+    def _path(self, name):
+        return os.path.join(self.directory, f'{name}.npy')
+
+    def frame(self):
+        """Bring the cache up to date and return a TransactionFrame memory-mapped from it."""
+        with self._lock:
+            self._refresh()
+            # An empty file cannot be mapped; an empty array costs nothing to read
+            mmap_mode = 'r' if self._meta['rows'] else None
+            # Plain ndarray views of the maps: results of arithmetic on an
+            # np.memmap are memmap objects too, which slows every operation
+            columns = [np.asarray(np.load(self._path(name), mmap_mode=mmap_mode)) for name, _ in COLUMNS]
+            # Names come from the registry rather than the cache, so a renamed
+            # category needs no refresh
+            covering = int(columns[2].max()) if len(columns[2]) else 0
+            return TransactionFrame(*columns, get_category_registry().names(covering))
+
+    def refresh(self):
+        """Apply changes made since the last refresh. Returns what was done, as a dict of counts."""
+        with self._lock:
+            return self._refresh()
+
+    def rebuild(self):
+        with self._lock:
+            with db_connection() as conn:
+                return self._rebuild(conn)
+
+    def _read_meta(self):
+        try:
+            with open(os.path.join(self.directory, 'meta.json'), encoding='utf-8') as f:
+                meta = json.load(f)
+            mmap_mode = 'r' if meta['rows'] else None
+            for name, _ in COLUMNS:
+                if np.load(self._path(name), mmap_mode=mmap_mode).shape != (meta['rows'],):
+                    raise ValueError(f"{name} column does not match meta.json")
+            return meta
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"Discarding column cache in {self.directory}: {e}")
+            return None
+
+    def _write_meta(self, meta):
+        path = os.path.join(self.directory, 'meta.json')
+        with open(path + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump(meta, f)
+        os.replace(path + '.tmp', path)
+        self._meta = meta
+
+    def _refresh(self):
+        start = time.perf_counter()
+        meta = self._meta or self._read_meta()
+        with db_connection() as conn:
+            if (meta is None or meta.get('format') != FORMAT_VERSION
+                    or meta['schema_version'] != get_schema_version(conn)
+                    or meta['change_seq'] > _last_change_seq(conn)):
+                return self._rebuild(conn)
+
+            changes = conn.execute("SELECT seq, transaction_id FROM transaction_changes WHERE seq > ? ORDER BY seq",
+                                   (meta['change_seq'],)).fetchall()
+            changed_ids = sorted({transaction_id for _, transaction_id in changes
+                                  if transaction_id <= meta['high_water']})
+            current = {}
+            for offset in range(0, len(changed_ids), 500):
+                chunk = changed_ids[offset:offset + 500]
+                placeholders = ','.join('?' * len(chunk))
+                current.update((row[0], row) for row in conn.execute(
+                    f"{FRAME_SELECT} AND id IN ({placeholders})", chunk))
+            new_rows = conn.execute(f"{FRAME_SELECT} AND id > ? ORDER BY id", (meta['high_water'],)).fetchall()
+
+            if not changes and not new_rows:
+                self._meta = meta
+                return {'rebuilt': False, 'appended': 0, 'patched': 0, 'deleted': 0}
+
+            ids = np.load(self._path('ids'), mmap_mode='r' if meta['rows'] else None)
+            positions = np.searchsorted(ids, changed_ids)
+            if np.any(positions >= len(ids)) or np.any(ids[np.minimum(positions, len(ids) - 1)] != changed_ids):
+                # An id at or below the mark that the cache never held: it no
+                # longer lines up with the table
+                return self._rebuild(conn)
+
+            patched = [(position, current[transaction_id])
+                       for position, transaction_id in zip(positions, changed_ids) if transaction_id in current]
+            deleted = [position for position, transaction_id in zip(positions, changed_ids)
+                       if transaction_id not in current]
+            patch = TransactionFrame.from_rows([row for _, row in patched])
+            appended = TransactionFrame.from_rows(new_rows)
+            self._apply(meta, [position for position, _ in patched], patch, deleted, appended)
+
+            meta = dict(meta, rows=meta['rows'] + len(appended) - len(deleted),
+                        change_seq=changes[-1][0] if changes else meta['change_seq'],
+                        high_water=int(appended.ids[-1]) if len(appended) else meta['high_water'])
+            self._write_meta(meta)
+            conn.execute("DELETE FROM transaction_changes WHERE seq <= ?", (meta['change_seq'],))
+
+        stats = {'rebuilt': False, 'appended': len(appended), 'patched': len(patched), 'deleted': len(deleted)}
+        logger.info(f"Refreshed column cache in {time.perf_counter() - start:.3f}s: {stats}")
+        return stats
+
+    def _apply(self, meta, patch_positions, patch, deleted, appended):
+        for (name, dtype), patch_values, new_values in zip(COLUMNS, self._columns(patch), self._columns(appended)):
+            path = self._path(name)
+            if patch_positions or deleted:
+                # Rewritten aside rather than patched through a writable map:
+                # frames already handed out map the old file and keep seeing
+                # the snapshot they were built from
+                values = np.load(path)
+                values[patch_positions] = patch_values
+                if deleted:
+                    # Compact rather than leave tombstones, so frames never
+                    # need a liveness mask
+                    values = np.delete(values, deleted)
+                _write_column(path, np.concatenate((values, new_values.astype(dtype))))
+            elif len(new_values) and not _append_column(path, new_values):
+                _write_column(path, np.concatenate((np.load(path), new_values.astype(dtype))))
+
+    @staticmethod
+    def _columns(frame):
+        return frame.ids, frame.day, frame.category, frame.amount, frame.type
+
+    def _rebuild(self, conn):
+        start = time.perf_counter()
+        os.makedirs(self.directory, exist_ok=True)
+        # Changes logged from here on are applied by the next refresh
+        change_seq = _last_change_seq(conn)
+        high_water = conn.execute("SELECT ifnull(max(id), 0) FROM transactions").fetchone()[0]
+
+        cursor = conn.execute(f"{FRAME_SELECT} AND id <= ? ORDER BY id", (high_water,))
+        batches = []
+        while True:
+            rows = cursor.fetchmany(REBUILD_BATCH_SIZE)
+            if not rows:
+                break
+            batches.append(self._columns(TransactionFrame.from_rows(rows)))
+
+        for index, (name, dtype) in enumerate(COLUMNS):
+            values = np.concatenate([batch[index] for batch in batches]) if batches else np.empty(0)
+            _write_column(self._path(name), values.astype(dtype))
+        rows = sum(len(batch[0]) for batch in batches)
+        self._write_meta({'format': FORMAT_VERSION, 'schema_version': get_schema_version(conn), 'rows': rows,
+                          'high_water': high_water, 'change_seq': change_seq})
+        conn.execute("DELETE FROM transaction_changes WHERE seq <= ?", (change_seq,))
+
+        logger.info(f"Rebuilt column cache of {rows} transactions in {time.perf_counter() - start:.2f}s")
+        return {'rebuilt': True, 'appended': rows, 'patched': 0, 'deleted': 0}
@@ -1,98 +1,82 @@
-from database import get_db_connection
+from database import db_connection, record_write
+from models.money import MINOR_UNITS, to_major, to_minor
+from models.read_cache import cached_read
 import logging
 
 logger = logging.getLogger(__name__)
 
 
-class DebtModel:
-    def __init__(self):
-        self.init_table()
-
-    def init_table(self):
-        conn = get_db_connection()
-        cursor = conn.cursor()
-
-        # Create the table if it doesn't exist
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS debts (
-                id INTEGER PRIMARY KEY,
-                name TEXT,
-                balance REAL,
-                apr REAL
-            )
-        ''')
-
-        # Check if original_balance column exists, if not, add it
-        cursor.execute("PRAGMA table_info(debts)")
-        columns = [column[1] for column in cursor.fetchall()]
-        if 'original_balance' not in columns:
-            cursor.execute("ALTER TABLE debts ADD COLUMN original_balance REAL")
-
-        # Check if current_balance column exists, if not, add it
-        if 'current_balance' not in columns:
-            cursor.execute("ALTER TABLE debts ADD COLUMN current_balance REAL")
+# get_all_debts column order, balances in major units
+DEBT_SELECT = f"SELECT id, name, original_balance / {MINOR_UNITS}.0, current_balance / {MINOR_UNITS}.0, apr FROM debts"
 
-        # If original_balance is NULL, set it to balance
-        cursor.execute("UPDATE debts SET original_balance = balance WHERE original_balance IS NULL")
 
-        # If current_balance is NULL, set it to balance
-        cursor.execute("UPDATE debts SET current_balance = balance WHERE current_balance IS NULL")
-
-        conn.commit()
-        conn.close()
+class DebtModel:
+    def _get_debt(self, cursor, debt_id):
+        cursor.execute(f"{DEBT_SELECT} WHERE id = ?", (debt_id,))
+        return cursor.fetchone()
 
     def add_debt(self, name, balance, apr):
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute(
-            "INSERT INTO debts (name, balance, original_balance, current_balance, apr) VALUES (?, ?, ?, ?, ?)",
-            (name, balance, balance, balance, apr))
-        conn.commit()
-        conn.close()
-
+        """Insert a debt and return its row, in get_all_debts column order."""
+        minor = to_minor(balance)
+        with db_connection() as conn:
+            record_write('debts')
+            cursor = conn.cursor()
+            cursor.execute(
+                "INSERT INTO debts (name, balance, original_balance, current_balance, apr) VALUES (?, ?, ?, ?, ?)",
+                (name, minor, minor, minor, apr))
+            return cursor.lastrowid, name, to_major(minor), to_major(minor), apr
+
+    @cached_read('debts')
     def get_all_debts(self):
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute("SELECT id, name, original_balance, current_balance, apr FROM debts")
-        debts = cursor.fetchall()
-        conn.close()
+        with db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(DEBT_SELECT)
+            debts = cursor.fetchall()
         return debts
 
     def delete_debt(self, debt_id):
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute("DELETE FROM debts WHERE id = ?", (debt_id,))
-        conn.commit()
-        conn.close()
+        """Delete a debt and return the deleted row, or None if it did not exist."""
+        with db_connection() as conn:
+            record_write('debts')
+            cursor = conn.cursor()
+            debt = self._get_debt(cursor, debt_id)
+            cursor.execute("DELETE FROM debts WHERE id = ?", (debt_id,))
+        return debt
 
     def update_debt_balance(self, debt_id, amount_paid):
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute("UPDATE debts SET current_balance = current_balance - ? WHERE id = ?", (amount_paid, debt_id))
-        conn.commit()
-        conn.close()
+        """Apply a payment and return the debt's updated row."""
+        with db_connection() as conn:
+            record_write('debts')
+            cursor = conn.cursor()
+            cursor.execute("UPDATE debts SET current_balance = current_balance - ? WHERE id = ?",
+                           (to_minor(amount_paid), debt_id))
+            return self._get_debt(cursor, debt_id)
+
+    @staticmethod
+    def repayment_progress(original_balance, current_balance):
+        if original_balance is not None and original_balance > 0:
+            return ((original_balance - current_balance) / original_balance) * 100
+        return 0
 
+    @cached_read('debts')
     def calculate_repayment_progress(self, debt_id):
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute("SELECT original_balance, current_balance FROM debts WHERE id = ?", (debt_id,))
-        debt = cursor.fetchone()
-        conn.close()
+        with db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT original_balance, current_balance FROM debts WHERE id = ?", (debt_id,))
+            debt = cursor.fetchone()
         if debt:
-            original_balance, current_balance = debt
-            if original_balance is not None and original_balance > 0:
-                return ((original_balance - current_balance) / original_balance) * 100
+            return self.repayment_progress(*debt)
         return 0
 
     # In DebtModel
+    @cached_read('debts')
     def get_debt_repayment_progress(self):
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute("""
-            SELECT name, 
-                   (original_balance - current_balance) / original_balance * 100 as progress
-            FROM debts
-        """)
-        results = cursor.fetchall()
-        conn.close()
-        return {name: progress for name, progress in results}
\ No newline at end of file
+        with db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT name,
+                       (original_balance - current_balance) * 100.0 / original_balance as progress
+                FROM debts
+            """)
+            results = cursor.fetchall()
+        return {name: progress for name, progress in results}
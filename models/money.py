@@ -0,0 +1,139 @@
+"""Exact amounts of money.
+
+Amounts are stored as INTEGER minor units (pence, cents: hundredths of the
+currency unit, per MINOR_UNIT_EXPONENT), so totals are exact integer sums in
+SQLite and NumPy rather than floating-point sums that drift over millions of
+rows. Models convert at their boundary: to_minor() for values bound into SQL,
+`column / 100.0` or to_major() for values handed to widgets and charts, and
+Money where code adds amounts up itself.
+"""
+import re
+from decimal import ROUND_HALF_UP, Decimal, InvalidOperation
+from functools import total_ordering
+
+# ISO 4217 minor-unit exponent: every currency CurrencyManager offers has two
+# decimal places, and all amounts are stored at that scale
+MINOR_UNIT_EXPONENT = 2
+MINOR_UNITS = 10 ** MINOR_UNIT_EXPONENT
+
+# An amount as typed: a sign and a currency symbol or code, in either order and
+# both optional, digits with optional thousands separators, an optional
+# fraction, and optionally a currency code after it
+_AMOUNT = re.compile(r"""
+    \s* (?P<sign>[+-]?) \s* (?:[$£€]|[A-Z]{3})? \s* (?P<inner_sign>[+-]?)
+    (?P<whole>\d{1,3}(?:,\d{3})+|\d*) (?P<fraction>\.\d*)?
+    \s* (?:[A-Z]{3})? \s* \Z
+""", re.VERBOSE)
+
+
+def _parse_amount(text):
+    # Decimal would read '1e3' or 'NaN' as numbers, so the text has to look
+    # like an amount first
+    match = _AMOUNT.match(text)
+    digits = match and match['whole'] + (match['fraction'] or '')
+    if match is None or (match['sign'] and match['inner_sign']) or not any(c.isdigit() for c in digits):
+        raise ValueError(f"Not an amount of money: {text!r}")
+    return (f"{match['sign'] or match['inner_sign']}{match['whole'].replace(',', '') or '0'}"
+            f"{match['fraction'] or ''}")
+
+
+def to_minor(amount):
+    """Minor units for an amount in major units (int, float, Decimal, str or Money). None stays None."""
+    if amount is None:
+        return None
+    return Money.from_major(amount).minor
+
+
+def to_major(minor):
+    return None if minor is None else minor / MINOR_UNITS
+
+
+@total_ordering
+class Money:
+    """An amount of money held as a whole number of minor units."""
+    __slots__ = ('minor',)
+
+    def __init__(self, minor=0):
+        self.minor = int(minor)
+
+    @classmethod
+    def from_major(cls, value):
+        """Parse 12.5, '12.50', '$1,234.56' or Decimal('0.1') into Money, rounding half up to a minor unit."""
+        if isinstance(value, Money):
+            return value
+        if isinstance(value, int):
+            return cls(value * MINOR_UNITS)
+        if isinstance(value, str):
+            value = _parse_amount(value)
+        elif isinstance(value, float):
+            # The shortest repr is what the user typed: 0.1 rather than 0.1000000000000000055...
+            value = repr(value)
+        try:
+            minor = (Decimal(value) * MINOR_UNITS).to_integral_value(ROUND_HALF_UP)
+            return cls(int(minor))
+        except (InvalidOperation, ValueError, OverflowError):
+            raise ValueError(f"Not an amount of money: {value!r}") from None
+
+    @property
+    def major(self):
+        return self.minor / MINOR_UNITS
+
+    def __float__(self):
+        return self.major
+
+    def __str__(self):
+        sign = '-' if self.minor < 0 else ''
+        whole, cents = divmod(abs(self.minor), MINOR_UNITS)
+        return f"{sign}{whole}.{cents:0{MINOR_UNIT_EXPONENT}d}"
+
+    def __repr__(self):
+        return f"Money('{self}')"
+
+    def __format__(self, spec):
+        # Decimal formats exactly, so f"{money:,.2f}" never shows float noise
+        return format(Decimal(self.minor).scaleb(-MINOR_UNIT_EXPONENT), spec) if spec else str(self)
+
+    def __add__(self, other):
+        if isinstance(other, Money):
+            return Money(self.minor + other.minor)
+        if other == 0:
+            # Lets sum() start from its default of 0
+            return self
+        return NotImplemented
+
+    __radd__ = __add__
+
+    def __sub__(self, other):
+        if isinstance(other, Money):
+            return Money(self.minor - other.minor)
+        return NotImplemented
+
+    def __mul__(self, factor):
+        if isinstance(factor, (int, float, Decimal)) and not isinstance(factor, bool):
+            minor = (Decimal(self.minor) * Decimal(repr(factor) if isinstance(factor, float) else factor))
+            return Money(int(minor.to_integral_value(ROUND_HALF_UP)))
+        return NotImplemented
+
+    __rmul__ = __mul__
+
+    def __neg__(self):
+        return Money(-self.minor)
+
+    def __abs__(self):
+        return Money(abs(self.minor))
+
+    def __bool__(self):
+        return self.minor != 0
+
+    def __eq__(self, other):
+        if isinstance(other, Money):
+            return self.minor == other.minor
+        return NotImplemented
+
+    def __lt__(self, other):
+        if isinstance(other, Money):
+            return self.minor < other.minor
+        return NotImplemented
+
+    def __hash__(self):
+        return hash(self.minor)
@@ -0,0 +1,118 @@
+"""In-process cache of model read results.
+
+One refresh of the UI asks the same questions many times over: the budget
+planner reads a month's total income three times, every tab reads the
+budgets and spending totals. cached_read() keeps the answers of a model read
+method in a shared LRU, keyed by the method and its arguments, and stores
+with each one the write counters (database.get_table_versions) of the tables
+it was read from. A lookup whose tables have been written since is a miss and
+reads again, so no result outlives a write made through the models.
+
+Writes from another process are not seen until a write made here touches
+the same tables, or clear() is called.
+"""
+import copy
+import functools
+import threading
+from collections import OrderedDict, defaultdict
+
+from database import get_table_versions
+
+MAX_ENTRIES = 512
+# Results with more items than this are returned uncached: keeping them would
+# hold their memory, and copying them out would cost most of a query
+MAX_RESULT_ITEMS = 2000
+
+# Returned as they are; anything else is copied so callers may modify it
+_IMMUTABLE = (type(None), bool, int, float, str, bytes)
+
+
+class ReadCache:
+    def __init__(self, max_entries=MAX_ENTRIES, max_result_items=MAX_RESULT_ITEMS):
+        self.max_entries = max_entries
+        self.max_result_items = max_result_items
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._counts = defaultdict(lambda: {'hits': 0, 'misses': 0})
+        self.evictions = 0
+
+    def get(self, key, tables, read):
+        """The cached result for `key` if none of `tables` was written since it was read, else read()."""
+        versions = get_table_versions(tables)
+        with self._lock:
+            entry = self._entries.get(key)
+            hit = entry is not None and entry[0] == versions
+            if hit:
+                self._entries.move_to_end(key)
+            self._counts[key[0]]['hits' if hit else 'misses'] += 1
+        if hit:
+            return _copy(entry[1])
+
+        # Versions were taken before reading: a write that lands during the
+        # read leaves this entry already out of date rather than stale
+        result = read()
+        if not hasattr(result, '__len__') or len(result) <= self.max_result_items:
+            with self._lock:
+                self._entries[key] = (versions, _copy(result))
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+                    self.evictions += 1
+        return result
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """Hit and miss counts, overall and per method, with the current entry count."""
+        with self._lock:
+            methods = {name: dict(counts) for name, counts in self._counts.items()}
+            entries = len(self._entries)
+        hits = sum(counts['hits'] for counts in methods.values())
+        misses = sum(counts['misses'] for counts in methods.values())
+        return {
+            'hits': hits,
+            'misses': misses,
+            'hit_rate': hits / (hits + misses) if hits + misses else 0.0,
+            'entries': entries,
+            'evictions': self.evictions,
+            'methods': methods,
+        }
+
+    def reset_stats(self):
+        with self._lock:
+            self._counts.clear()
+            self.evictions = 0
+
+
+def _copy(value):
+    return value if isinstance(value, _IMMUTABLE) else copy.deepcopy(value)
+
+
+read_cache = ReadCache()
+
+
+def cached_read(*tables):
+    """Decorate a model read method whose result depends only on its arguments and `tables`.
+
+    Tables kept by triggers are covered by the table they follow: a read of
+    transaction_rollups names 'transactions'. The instance is not part of the
+    key, as models keep no state of their own. Calls with unhashable
+    arguments go straight through.
+    """
+    def decorator(method):
+        name = method.__qualname__
+
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            key = (name, args, tuple(sorted(kwargs.items())))
+            try:
+                hash(key)
+            except TypeError:
+                return method(self, *args, **kwargs)
+            return read_cache.get(key, tables, lambda: method(self, *args, **kwargs))
+
+        return wrapper
+
+    return decorator
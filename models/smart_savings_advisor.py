@@ -120,13 +120,10 @@ class EnhancedSmartSavingsAdvisor:
     def analyze_cash_flow(self) -> Tuple[float, Dict[str, float]]:
         end_date = datetime.now()
         start_date = end_date - timedelta(days=30)
-        transactions = self.transaction_model.get_transactions_in_range(start_date, end_date)
+        frame = self.transaction_model.get_transaction_frame(start_date, end_date)
 
-        income = sum(float(t[3]) for t in transactions if t[4] == 'Income')
-        expenses = {
-            category: sum(float(t[3]) for t in transactions if t[2] == category and t[4] == 'Expense')
-            for category in set(t[2] for t in transactions if t[4] == 'Expense')
-        }
+        income = frame.total(frame.income)
+        expenses = frame.sum_by_category(frame.expenses)
 
         return income, expenses
 
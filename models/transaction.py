@@ -1,140 +1,668 @@
 import logging
+import re
+import time
+from collections import defaultdict
+from datetime import datetime
+from functools import lru_cache
 
-from dateutil.relativedelta import relativedelta
-
-from database import get_db_connection
+from database import db_connection, get_table_columns, get_thread_connection, on_commit, record_write
+from migrations import REBUILD_ROLLUPS_SQL, WELL_FORMED_MONTH
+from models.budget_alerts import budget_alerts
+from models.category import get_category_registry
+from models.column_cache import get_column_cache
+from models.money import MINOR_UNITS, to_major, to_minor
+from models.read_cache import cached_read
+from models.transaction_frame import FRAME_SELECT, TransactionFrame, day_number
 
 logging.basicConfig(level=logging.DEBUG, filename='transaction.log', filemode='w',
                     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+TRANSACTION_COLUMNS = ('id', 'date', 'category', 'amount', 'type', 'comment', 'currency', 'goal_id')
+MONTHLY_TOTAL_COLUMNS = ('month', 'category', 'type', 'currency', 'total', 'count')
+
+# Amounts are stored in minor units and categories as ids; rows handed out by
+# the model carry major units and category names. The expressions are left
+# unaliased so that ORDER BY and WHERE on "amount" still mean the indexed
+# column.
+_SELECT_EXPRESSIONS = {
+    'category': "(SELECT name FROM categories WHERE categories.id = transactions.category_id)",
+    'amount': f"transactions.amount / {MINOR_UNITS}.0",
+}
+TRANSACTION_SELECT = ', '.join(_SELECT_EXPRESSIONS.get(column, f"transactions.{column}")
+                               for column in TRANSACTION_COLUMNS)
+
+# Columns the transaction list can be sorted on, with the tie-breaker columns
+# that let an index serve the whole ORDER BY; id always breaks the final tie.
+# Dates sort on the integer day column, which orders rows as the dates do;
+# rows without a readable date sort on UNDATED_DAY, before every real day.
+# Category names are not stored with transactions, so that sort is paged one
+# category at a time (see _category_page).
+SORT_KEYS = {
+    'date': ('day',),
+    'category': ('category', 'day'),
+    'amount': ('amount',),
+    'type': ('type',),
+    'comment': ('comment',),
+    'currency': ('currency',),
+}
+# Unindexed text columns sort NULL as '' so the keyset row-value comparison
+# never meets a NULL.
+_NULLABLE_SORT_COLUMNS = {'type', 'comment', 'currency'}
+
+# The day key of legacy rows whose date could not be read, and the expression
+# the date indexes are built on (migration 12), which never yields NULL
+UNDATED_DAY = -2147483648
+DAY_KEY = f"ifnull(day, {UNDATED_DAY})"
+
+
+# Spellings accepted for a transaction date; it is always stored as YYYY-MM-DD
+DATE_FORMATS = ('%Y-%m-%d', '%Y/%m/%d', '%Y.%m.%d', '%Y%m%d')
+
+
+@lru_cache(maxsize=4096)
+def _parse_date(value):
+    # Bulk inserts repeat the same few thousand dates, so each is parsed once
+    text = value.strip().replace('T', ' ').split(' ')[0]
+    for date_format in DATE_FORMATS:
+        try:
+            return datetime.strptime(text, date_format).strftime('%Y-%m-%d')
+        except ValueError:
+            pass
+    raise ValueError(f"Invalid date: {value!r}; expected YYYY-MM-DD")
+
+
+def normalize_date(value):
+    """A date, datetime or date string as YYYY-MM-DD. Raises ValueError for anything else; None stays None."""
+    if value is None:
+        return None
+    if hasattr(value, 'strftime'):
+        return value.strftime('%Y-%m-%d')
+    if not isinstance(value, str):
+        raise ValueError(f"Invalid date: {value!r}; expected YYYY-MM-DD")
+    return _parse_date(value)
+
+
+def _row_day(date):
+    # Python twin of the day column: NULL for dates SQLite cannot read
+    try:
+        return day_number(date)
+    except (TypeError, ValueError):
+        return None
+
+
+def _sort_sql(column):
+    if column == 'day':
+        return DAY_KEY
+    return f"ifnull({column}, '')" if column in _NULLABLE_SORT_COLUMNS else column
+
+
+def transaction_sort_key(transaction, sort_column='date'):
+    """The keyset position of a transaction row when the list is sorted on `sort_column`."""
+    values = []
+    for column in SORT_KEYS[sort_column]:
+        if column == 'day':
+            day = _row_day(transaction[1])
+            values.append(UNDATED_DAY if day is None else day)
+        else:
+            value = transaction[TRANSACTION_COLUMNS.index(column)]
+            values.append('' if value is None else value)
+    return (*values, transaction[0])
+
+
+def search_tokens(text):
+    return re.findall(r'\w+', (text or '').lower())
+
+
+def fts_query(text):
+    """Turn free text into an FTS5 query in which every word must match, as a prefix.
+
+    Only word characters survive, so user input can never inject FTS5 syntax.
+    """
+    return ' '.join(f'"{token}"*' for token in search_tokens(text))
+
+
+def transaction_matches(transaction, filters):
+    """Python twin of TransactionModel._filter_clauses, for rows that did not come from a query."""
+    if not filters:
+        return True
+    _, date, category, amount, transaction_type, comment, currency, _ = transaction
+    start_date, end_date = normalize_date(filters.get('start_date')), normalize_date(filters.get('end_date'))
+    day = _row_day(date) if start_date or end_date else None
+    return ((not start_date or (day is not None and day >= day_number(start_date)))
+            and (not end_date or (day is not None and day <= day_number(end_date)))
+            and (not filters.get('category') or category == filters['category'])
+            and (not filters.get('categories') or category in filters['categories'])
+            and (not filters.get('type') or transaction_type == filters['type'])
+            and (not filters.get('currency') or currency == filters['currency'])
+            and (filters.get('min_amount') is None
+                 or (amount is not None and to_minor(amount) >= to_minor(filters['min_amount'])))
+            and (filters.get('max_amount') is None
+                 or (amount is not None and to_minor(amount) <= to_minor(filters['max_amount'])))
+            and (not filters.get('comment') or filters['comment'].lower() in (comment or '').lower())
+            and (not filters.get('search') or _matches_search(comment, filters['search'])))
+
+
+def _matches_search(comment, text):
+    words = search_tokens(comment)
+    return all(any(word.startswith(token) for word in words) for token in search_tokens(text))
+
 
 class TransactionModel:
+    # Above this many matches search() returns newest first instead of ranking,
+    # and sorted listings stop driving the query from the full-text index
+    RANKED_SEARCH_LIMIT = 5000
+
     def add_transaction(self, date, category, amount, transaction_type, comment, currency_code, goal_id=None):
+        """Insert a transaction and return the new row, in TRANSACTION_COLUMNS order.
+
+        Raises ValueError if `date` cannot be read as a date.
+        """
+        date = normalize_date(date)
+        registry = get_category_registry()
         try:
-            conn = get_db_connection()
-            cursor = conn.cursor()
-            cursor.execute("""
-                INSERT INTO transactions (date, category, amount, type, comment, currency, goal_id)
-                VALUES (?, ?, ?, ?, ?, ?, ?)
-            """, (date, category, amount, transaction_type, comment, currency_code, goal_id))
-            conn.commit()
+            minor = to_minor(amount)
+            with db_connection() as conn:
+                record_write('transactions')
+                category_id = registry.ensure(category)
+                cursor = conn.cursor()
+                cursor.execute("""
+                    INSERT INTO transactions (date, category_id, amount, type, comment, currency, goal_id)
+                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                """, (date, category_id, minor, transaction_type, comment, currency_code, goal_id))
+                if transaction_type == 'Expense' and date is not None:
+                    on_commit(lambda: budget_alerts.record({(date[:7], category_id): minor}))
+                transaction = (cursor.lastrowid, date, category, to_major(minor), transaction_type, comment,
+                               currency_code, goal_id)
 
-            if goal_id and transaction_type in ['Savings', 'Investment']:
-                self.update_goal_progress(goal_id, amount)
+                if goal_id and transaction_type in ['Savings', 'Investment']:
+                    self.update_goal_progress(goal_id, amount)
 
             logger.info("Transaction added successfully")
+            return transaction
         except Exception as e:
+            # A category created for this row went away with the rollback
+            registry.invalidate()
             logger.exception("Error adding transaction")
             raise
-        finally:
-            conn.close()
+
+    def add_transactions_bulk(self, transactions):
+        """Insert many transactions in a single database transaction.
+
+        `transactions` is any iterable of (date, category, amount, type, comment,
+        currency_code[, goal_id]) tuples. It is consumed lazily by executemany,
+        so a generator over millions of rows never has to be held in memory.
+        Goal progress is accumulated per goal and applied with one UPDATE each,
+        and expenses per month and category for the budget alerts.
+        A date that cannot be read raises ValueError and nothing is inserted.
+        Returns a dict with the row count, elapsed seconds and rows per second.
+        """
+        goal_deltas = defaultdict(int)
+        expense_deltas = defaultdict(int)
+        registry = get_category_registry()
+        category_ids = {}
+        count = 0
+
+        def rows():
+            nonlocal count
+            for date, category, amount, transaction_type, comment, currency_code, *rest in transactions:
+                goal_id = rest[0] if rest else None
+                amount = to_minor(amount)
+                if goal_id and transaction_type in ['Savings', 'Investment']:
+                    goal_deltas[goal_id] += amount
+                if category not in category_ids:
+                    category_ids[category] = registry.ensure(category)
+                date = normalize_date(date)
+                if transaction_type == 'Expense' and date is not None:
+                    expense_deltas[date[:7], category_ids[category]] += amount
+                count += 1
+                yield date, category_ids[category], amount, transaction_type, comment, currency_code, goal_id
+
+        start = time.perf_counter()
+        try:
+            with db_connection() as conn:
+                record_write('transactions', 'investment_savings_goals')
+                cursor = conn.cursor()
+                cursor.executemany("""
+                    INSERT INTO transactions (date, category_id, amount, type, comment, currency, goal_id)
+                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                """, rows())
+                cursor.executemany("""
+                    UPDATE investment_savings_goals
+                    SET current_amount = current_amount + ?
+                    WHERE id = ?
+                """, [(delta, goal_id) for goal_id, delta in goal_deltas.items()])
+                on_commit(lambda: budget_alerts.record(expense_deltas))
+        except Exception as e:
+            registry.invalidate()
+            logger.exception("Error adding transactions in bulk")
+            raise
+
+        elapsed = time.perf_counter() - start
+        stats = {
+            'rows': count,
+            'seconds': elapsed,
+            'rows_per_second': count / elapsed if elapsed > 0 else 0.0,
+        }
+        logger.info(f"Bulk inserted {count} transactions in {elapsed:.2f}s "
+                    f"({stats['rows_per_second']:.0f} rows/s), updated {len(goal_deltas)} goals")
+        return stats
 
     def update_goal_progress(self, goal_id, amount):
         try:
-            conn = get_db_connection()
-            cursor = conn.cursor()
-            cursor.execute("""
-                UPDATE investment_savings_goals
-                SET current_amount = current_amount + ?
-                WHERE id = ?
-            """, (amount, goal_id))
-            conn.commit()
+            with db_connection() as conn:
+                record_write('investment_savings_goals')
+                cursor = conn.cursor()
+                cursor.execute("""
+                    UPDATE investment_savings_goals
+                    SET current_amount = current_amount + ?
+                    WHERE id = ?
+                """, (to_minor(amount), goal_id))
             logger.info(f"Updated progress for goal {goal_id}")
         except Exception as e:
             logger.exception(f"Error updating progress for goal {goal_id}")
             raise
-        finally:
-            conn.close()
 
     def get_all_transactions(self):
         logger.info("Fetching all transactions")
         try:
-            conn = get_db_connection()
-            cursor = conn.cursor()
-            cursor.execute("SELECT * FROM transactions ORDER BY date DESC")
-            transactions = cursor.fetchall()
+            with db_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(f"SELECT {TRANSACTION_SELECT} FROM transactions ORDER BY {DAY_KEY} DESC, id DESC")
+                transactions = cursor.fetchall()
             logger.info(f"Fetched {len(transactions)} transactions")
             return transactions
         except Exception as e:
             logger.exception("Error fetching transactions")
             raise
-        finally:
-            conn.close()
 
-    def get_category_spending(self, month, category):
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        start_date = month.strftime('%Y-%m-01')
-        end_date = (month + relativedelta(months=1)).strftime('%Y-%m-01')
+    def get_transactions_page(self, after_key=None, limit=200, filters=None, sort_column='date', descending=True):
+        """Return the next `limit` matching transactions in the requested order.
+
+        `after_key` is the transaction_sort_key of the last row of the previous
+        page, or None for the first page. Seeking past it on the sort column's
+        index keeps every page equally cheap however far down the list it is,
+        unlike OFFSET. `filters` is a dict as accepted by _filter_clauses.
+        """
+        if sort_column == 'category':
+            return self._category_page(after_key, limit, filters or {}, descending)
+        key_sql = [_sort_sql(column) for column in SORT_KEYS[sort_column]] + ['id']
+        where, params = self._filter_clauses(filters or {})
+        if after_key is not None:
+            where += (" AND " if where else " WHERE ")
+            seek = '<' if descending else '>'
+            key_params = [to_minor(value) if column == 'amount' else value
+                          for column, value in zip((*SORT_KEYS[sort_column], 'id'), after_key)]
+            # The bound on the first key alone is implied by the row value,
+            # but SQLite only seeks an expression index on a plain comparison
+            where += f"{key_sql[0]} {seek}= ? AND ({', '.join(key_sql)}) {seek} ({', '.join('?' * len(key_sql))})"
+            params.extend([key_params[0], *key_params])
+        direction = 'DESC' if descending else 'ASC'
+        with db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(f"""
+                SELECT {TRANSACTION_SELECT} FROM transactions{where}
+                ORDER BY {', '.join(f'{sql} {direction}' for sql in key_sql)}
+                LIMIT ?
+            """, (*params, limit))
+            return cursor.fetchall()
 
-        cursor.execute("""
-            SELECT SUM(amount) FROM transactions 
-            WHERE date >= ? AND date < ? AND category = ? AND type = 'Expense'
-        """, (start_date, end_date, category))
+    def _category_page(self, after_key, limit, filters, descending):
+        # Category names order the list, but only their ids are indexed. Each
+        # category's rows come off the (category_id, day) index in date order,
+        # so walking the categories in name order and topping the page up
+        # from each in turn keeps every page an index seek.
+        categories = sorted([('', None)] + [(name, category_id)
+                                            for category_id, name in get_category_registry().items()],
+                            reverse=descending)
+        wanted = [filters['category']] if filters.get('category') else filters.get('categories')
+        if wanted:
+            categories = [category for category in categories if category[0] in wanted]
+        if after_key is not None:
+            categories = [category for category in categories
+                          if (category[0] <= after_key[0] if descending else category[0] >= after_key[0])]
+        where, params = self._filter_clauses(filters)
+        where += " AND " if where else " WHERE "
+        direction, seek = ('DESC', '<') if descending else ('ASC', '>')
+        rows = []
+        with db_connection() as conn:
+            cursor = conn.cursor()
+            for name, category_id in categories:
+                category_sql, category_params = "category_id IS NULL", []
+                if category_id is not None:
+                    category_sql, category_params = "category_id = ?", [category_id]
+                if after_key is not None and name == after_key[0]:
+                    category_sql += f" AND {DAY_KEY} {seek}= ? AND ({DAY_KEY}, id) {seek} (?, ?)"
+                    category_params += [after_key[1], *after_key[1:]]
+                cursor.execute(f"""
+                    SELECT {TRANSACTION_SELECT} FROM transactions{where}{category_sql}
+                    ORDER BY {DAY_KEY} {direction}, id {direction}
+                    LIMIT ?
+                """, (*params, *category_params, limit - len(rows)))
+                rows += cursor.fetchall()
+                if len(rows) >= limit:
+                    break
+        return rows
+
+    @cached_read('transactions', 'categories')
+    def get_category_spending(self, month, category):
+        category_id = get_category_registry().id_of(category)
+        if category_id is None:
+            return 0.0
+        with db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT SUM(total) FROM transaction_rollups
+                WHERE month = ? AND category_id = ? AND type = 'Expense'
+            """, (month.strftime('%Y-%m'), category_id))
+            result = cursor.fetchone()[0]
 
-        result = cursor.fetchone()[0]
-        conn.close()
-        return result if result is not None else 0.0
+        return to_major(result) if result is not None else 0.0
 
     def delete_transaction(self, transaction_id):
+        """Delete a transaction and return the deleted row, or None if it did not exist."""
         logger.info(f"Attempting to delete transaction with id: {transaction_id}")
         try:
-            conn = get_db_connection()
-            cursor = conn.cursor()
-            cursor.execute("DELETE FROM transactions WHERE id = ?", (transaction_id,))
-            conn.commit()
+            with db_connection() as conn:
+                record_write('transactions')
+                cursor = conn.cursor()
+                cursor.execute(f"SELECT {TRANSACTION_SELECT}, category_id, transactions.amount FROM transactions "
+                               "WHERE id = ?", (transaction_id,))
+                row = cursor.fetchone()
+                transaction = row[:len(TRANSACTION_COLUMNS)] if row else None
+                cursor.execute("DELETE FROM transactions WHERE id = ?", (transaction_id,))
+                # Legacy rows without a readable date count towards no month
+                if row and row[4] == 'Expense' and _row_day(row[1]) is not None:
+                    on_commit(lambda: budget_alerts.record({(row[1][:7], row[-2]): -row[-1]}))
             logger.info("Transaction deleted successfully")
+            return transaction
         except Exception as e:
             logger.exception("Error deleting transaction")
             raise
-        finally:
-            conn.close()
 
     def get_transactions_in_range(self, start_date, end_date):
         logger.info(f"Fetching transactions between {start_date} and {end_date}")
         try:
-            conn = get_db_connection()
-            cursor = conn.cursor()
-            cursor.execute("""
-                SELECT * FROM transactions 
-                WHERE date BETWEEN ? AND ? 
-                ORDER BY date DESC
-            """, (start_date.strftime("%Y-%m-%d"), end_date.strftime("%Y-%m-%d")))
-            transactions = cursor.fetchall()
+            with db_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(f"""
+                    SELECT {TRANSACTION_SELECT} FROM transactions
+                    WHERE {DAY_KEY} BETWEEN ? AND ?
+                    ORDER BY {DAY_KEY} DESC, id DESC
+                """, (day_number(start_date), day_number(end_date)))
+                transactions = cursor.fetchall()
             logger.info(f"Fetched {len(transactions)} transactions in the date range")
             return transactions
         except Exception as e:
             logger.exception("Error fetching transactions in range")
             raise
-        finally:
-            conn.close()
 
+    def get_transaction_frame(self, start_date=None, end_date=None):
+        """Transactions dated within the range (inclusive) as a TransactionFrame.
+
+        Served from the memory-mapped column cache when one can be kept beside
+        the database; a date range selects from it rather than querying.
+        """
+        cache = get_column_cache()
+        if cache is not None:
+            try:
+                frame = cache.frame()
+                if start_date is None and end_date is None:
+                    return frame
+                return frame.select(frame.between(start_date, end_date))
+            except OSError as e:
+                logger.warning(f"Column cache unavailable, reading transactions instead: {e}")
+
+        where, params = self._filter_clauses({'start_date': start_date, 'end_date': end_date})
+        start = time.perf_counter()
+        try:
+            with db_connection() as conn:
+                rows = conn.execute(f"{FRAME_SELECT} {where.replace('WHERE', 'AND', 1)}", params).fetchall()
+            covering = max((row[2] for row in rows), default=0)
+            frame = TransactionFrame.from_rows(rows, get_category_registry().names(covering))
+            logger.info(f"Loaded {len(frame)} transactions into a frame in {time.perf_counter() - start:.3f}s")
+            return frame
+        except Exception as e:
+            logger.exception("Error loading transaction frame")
+            raise
+
+    @cached_read('transactions', 'categories')
     def get_spending_by_category(self):
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute("""
-            SELECT category, SUM(amount) 
-            FROM transactions 
-            WHERE type = 'Expense' 
-            GROUP BY category
-        """)
-        results = cursor.fetchall()
-        conn.close()
-        return {category: amount for category, amount in results}
+        with db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT category_id, SUM(total)
+                FROM transaction_rollups
+                WHERE type = 'Expense'
+                GROUP BY category_id
+            """)
+            results = cursor.fetchall()
+        registry = get_category_registry()
+        return {registry.name(category_id): to_major(total) for category_id, total in results}
 
+    @cached_read('transactions')
     def get_income_vs_expenses(self):
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute("""
-            SELECT strftime('%Y-%m', date) as month,
-                   SUM(CASE WHEN type = 'Income' THEN amount ELSE 0 END) as income,
-                   SUM(CASE WHEN type = 'Expense' THEN amount ELSE 0 END) as expenses
-            FROM transactions
-            GROUP BY month
-            ORDER BY month
-            LIMIT 12
-        """)
-        results = cursor.fetchall()
-        conn.close()
-        return {month: {'income': income, 'expenses': expenses} for month, income, expenses in results}
\ No newline at end of file
+        # Transactions without a readable date have no month to chart
+        with db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(f"""
+                SELECT month,
+                       SUM(CASE WHEN type = 'Income' THEN total ELSE 0 END) as income,
+                       SUM(CASE WHEN type = 'Expense' THEN total ELSE 0 END) as expenses
+                FROM transaction_rollups
+                WHERE {WELL_FORMED_MONTH}
+                GROUP BY month
+                ORDER BY month
+                LIMIT 12
+            """)
+            results = cursor.fetchall()
+        return {month: {'income': to_major(income), 'expenses': to_major(expenses)}
+                for month, income, expenses in results}
+
+    def rebuild_rollups(self):
+        """Recompute transaction_rollups from the transactions table.
+
+        The triggers keep the rollups current on every write; this is for
+        repairing a database whose rollups were edited or lost.
+        """
+        logger.info("Rebuilding transaction rollups")
+        try:
+            with db_connection() as conn:
+                record_write('transactions')
+                cursor = conn.cursor()
+                cursor.execute("DELETE FROM transaction_rollups")
+                cursor.execute(REBUILD_ROLLUPS_SQL)
+                cursor.execute("SELECT COUNT(*) FROM transaction_rollups")
+                count = cursor.fetchone()[0]
+                on_commit(budget_alerts.reset)
+            logger.info(f"Rebuilt {count} transaction rollups")
+            return count
+        except Exception as e:
+            logger.exception("Error rebuilding transaction rollups")
+            raise
+
+    def _filter_clauses(self, filters):
+        """Compile a filter dict into a parameterized WHERE clause.
+
+        Recognised keys are start_date and end_date (inclusive; anything
+        normalize_date accepts, compared on the indexed day column),
+        category, categories (a list), type, currency, min_amount,
+        max_amount, comment (case-insensitive substring) and search (words
+        that must all start a word of the comment, matched on the full-text
+        index when there is one). Empty values are ignored. Returns
+        (" WHERE ..." or "", params).
+        """
+        clauses, params = [], []
+        # On the expression the date indexes are built on; undated rows fall
+        # below every start date, and an end date alone bounds them out too
+        if filters.get('start_date'):
+            clauses.append(f"{DAY_KEY} >= ?")
+            params.append(day_number(normalize_date(filters['start_date'])))
+        if filters.get('end_date'):
+            clauses.append(f"{DAY_KEY} BETWEEN ? AND ?")
+            params.extend((UNDATED_DAY + 1, day_number(normalize_date(filters['end_date']))))
+        if filters.get('category'):
+            # An unknown name binds NULL, which matches nothing
+            clauses.append("category_id = ?")
+            params.append(get_category_registry().id_of(filters['category']))
+        if filters.get('categories'):
+            clauses.append(f"category_id IN ({','.join('?' * len(filters['categories']))})")
+            params.extend(get_category_registry().id_of(name) for name in filters['categories'])
+        if filters.get('type'):
+            clauses.append("type = ?")
+            params.append(filters['type'])
+        if filters.get('currency'):
+            clauses.append("currency = ?")
+            params.append(filters['currency'])
+        if filters.get('min_amount') is not None:
+            clauses.append("amount >= ?")
+            params.append(to_minor(filters['min_amount']))
+        if filters.get('max_amount') is not None:
+            clauses.append("amount <= ?")
+            params.append(to_minor(filters['max_amount']))
+        if filters.get('comment'):
+            escaped = filters['comment'].replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+            clauses.append("comment LIKE ? ESCAPE '\\'")
+            params.append(f"%{escaped}%")
+        if search_tokens(filters.get('search')):
+            if self.has_full_text_search():
+                query = fts_query(filters['search'])
+                # A narrow search drives the query from the FTS index. For a
+                # broad one, "+id" stops SQLite from doing that, so it walks
+                # the ORDER BY index and stops once the page is full.
+                id_sql = "id" if self._is_narrow_search(query) else "+id"
+                clauses.append(f"{id_sql} IN (SELECT rowid FROM transactions_fts WHERE transactions_fts MATCH ?)")
+                params.append(query)
+            else:
+                for token in search_tokens(filters['search']):
+                    clauses.append("comment LIKE ?")
+                    params.append(f"%{token}%")
+        return (" WHERE " + " AND ".join(clauses) if clauses else ""), params
+
+    def has_full_text_search(self):
+        return bool(get_table_columns('transactions_fts'))
+
+    def search(self, text, filters=None, after_key=None, limit=200):
+        """Full-text search over comments, a page at a time.
+
+        Every word of `text` must appear in the comment, as a word or word
+        prefix. `filters` narrows the matches like get_transactions_page.
+        Rows are transaction tuples with the match rank appended; pass the
+        (rank, id) of the last row as `after_key` for the next page.
+
+        Results are ordered best match first while there are at most
+        RANKED_SEARCH_LIMIT matches. Ranking has to score every match, so
+        broader searches come back newest first instead, ranked 0, which
+        FTS5 can stream straight from its index.
+        """
+        if not search_tokens(text):
+            return []
+        if not self.has_full_text_search():
+            where, params = self._filter_clauses({**(filters or {}), 'search': text})
+            return self._search_newest_first(f"SELECT {TRANSACTION_SELECT}, 0 FROM transactions", where, "id", params,
+                                             after_key, limit)
+
+        query = fts_query(text)
+        where, params = self._filter_clauses(filters or {})
+        start = time.perf_counter()
+        try:
+            ranked = self._is_narrow_search(query)
+
+            matches = f"""
+                SELECT {TRANSACTION_SELECT}, {'matches.rank' if ranked else '0'}
+                FROM (
+                    SELECT rowid AS match_id{', rank' if ranked else ''}
+                    FROM transactions_fts WHERE transactions_fts MATCH ?
+                ) AS matches
+                JOIN transactions ON transactions.id = matches.match_id
+            """
+            if not ranked:
+                results = self._search_newest_first(matches, where, "matches.match_id", [query, *params],
+                                                    after_key, limit)
+            else:
+                if after_key is not None:
+                    where += (" AND " if where else " WHERE ") + "(matches.rank, transactions.id) > (?, ?)"
+                    params.extend(after_key)
+                with db_connection() as conn:
+                    cursor = conn.cursor()
+                    cursor.execute(f"{matches}{where} ORDER BY matches.rank, transactions.id LIMIT ?",
+                                   (query, *params, limit))
+                    results = cursor.fetchall()
+            logger.info(f"Search for {text!r} returned {len(results)} {'ranked ' if ranked else ''}rows in "
+                        f"{(time.perf_counter() - start) * 1000:.1f} ms")
+            return results
+        except Exception as e:
+            logger.exception(f"Error searching transactions for {text!r}")
+            raise
+
+    def _is_narrow_search(self, query):
+        with db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT COUNT(*) FROM (
+                    SELECT 1 FROM transactions_fts WHERE transactions_fts MATCH ? LIMIT ?
+                )
+            """, (query, self.RANKED_SEARCH_LIMIT + 1))
+            return cursor.fetchone()[0] <= self.RANKED_SEARCH_LIMIT
+
+    def _search_newest_first(self, query, where, id_sql, params, after_key, limit):
+        if after_key is not None:
+            where += (" AND " if where else " WHERE ") + f"{id_sql} < ?"
+            params = [*params, after_key[1]]
+        with db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(f"{query}{where} ORDER BY {id_sql} DESC LIMIT ?", (*params, limit))
+            return cursor.fetchall()
+
+    def _iter_batches(self, query, params, batch_size):
+        # Deliberately not a db_connection() block: the generator may stay
+        # suspended between batches, and an open unit of work would hold back
+        # commits of any write made on this thread in the meantime.
+        cursor = get_thread_connection().cursor()
+        try:
+            cursor.execute(query, params)
+            while True:
+                batch = cursor.fetchmany(batch_size)
+                if not batch:
+                    return
+                yield batch
+        finally:
+            cursor.close()
+
+    def iter_transaction_batches(self, start_date=None, end_date=None, categories=None, batch_size=5000):
+        """Stream transactions as lists of at most batch_size rows, in TRANSACTION_COLUMNS order.
+
+        Date range and category filters run in SQL, so memory use does not
+        depend on how many rows match.
+        """
+        where, params = self._filter_clauses({'start_date': start_date, 'end_date': end_date, 'categories': categories})
+        query = f"SELECT {TRANSACTION_SELECT} FROM transactions{where} ORDER BY {DAY_KEY}, id"
+        return self._iter_batches(query, params, batch_size)
+
+    def iter_monthly_total_batches(self, start_date=None, end_date=None, categories=None, batch_size=5000):
+        """Stream per-month totals, in MONTHLY_TOTAL_COLUMNS order, with the same filters."""
+        if start_date is None and end_date is None:
+            # Whole months only, so the rollups already hold the answer
+            where, params = self._filter_clauses({'categories': categories})
+            query = f"""
+                SELECT month, category_id, type, currency, total / {MINOR_UNITS}.0, count
+                FROM transaction_rollups{where}
+                ORDER BY month, category_id, type, currency
+            """
+            return self._with_category_names(self._iter_batches(query, params, batch_size))
+
+        where, params = self._filter_clauses({'start_date': start_date, 'end_date': end_date, 'categories': categories})
+        query = f"""
+            SELECT substr(date, 1, 7) AS month, ifnull(category_id, 0), type, currency, SUM(amount) / {MINOR_UNITS}.0,
+                   COUNT(*)
+            FROM transactions{where}
+            GROUP BY 1, 2, 3, 4
+            ORDER BY 1, 2, 3, 4
+        """
+        return self._with_category_names(self._iter_batches(query, params, batch_size))
+
+    @staticmethod
+    def _with_category_names(batches):
+        registry = get_category_registry()
+        for batch in batches:
+            yield [(month, registry.name(category_id), *rest) for month, category_id, *rest in batch]
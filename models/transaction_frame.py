@@ -0,0 +1,226 @@
+"""Columnar, NumPy-backed snapshot of transactions for analytics.
+
+Looping over transaction tuples in Python costs one pass per question asked
+(per category, per month, ...). A TransactionFrame holds the columns
+analytics need as flat arrays, so those questions become single vectorized
+passes: a groupby is one np.bincount, a rolling window one cumulative sum.
+"""
+from datetime import date, datetime, timedelta
+
+import numpy as np
+
+from models.money import MINOR_UNITS
+
+TYPES = ('Expense', 'Income', 'Savings', 'Investment')
+BUCKETS = ('day', 'week', 'month', 'year')
+
+# Rows in the shape TransactionFrame.from_rows takes; unknown types code as -1.
+# Legacy rows whose date could not be read have no day and are left out, so
+# callers narrow the selection with AND.
+FRAME_SELECT = f"""
+    SELECT id, day, ifnull(category_id, 0), ifnull(amount, 0),
+           CASE type {' '.join(f"WHEN '{name}' THEN {code}" for code, name in enumerate(TYPES))} ELSE -1 END
+    FROM transactions
+    WHERE day IS NOT NULL
+"""
+
+_EPOCH = date(1970, 1, 1)
+
+
+def day_number(value):
+    """Days since 1970-01-01 for a date, datetime or ISO date string."""
+    if isinstance(value, str):
+        value = date.fromisoformat(value[:10])
+    elif isinstance(value, datetime):
+        value = value.date()
+    return (value - _EPOCH).days
+
+
+def day_date(day):
+    return _EPOCH + timedelta(days=int(day))
+
+
+def _group_sums(keys, amounts, size):
+    # bincount accumulates in float64, which is exact for integer sums below
+    # 2**53 minor units, so rounding the result back recovers the exact total
+    return np.rint(np.bincount(keys, weights=amounts, minlength=size)).astype(np.int64)
+
+
+class TransactionFrame:
+    """Transactions as parallel arrays, one element per transaction.
+
+    `day` is days since 1970-01-01 (int32), `category` holds category ids
+    (0 for none) indexing `categories`, a list of names by id, `type` codes
+    into TYPES and `amount` is int64 minor units. Methods that
+    aggregate take an optional boolean `mask` selecting the transactions to
+    include; they sum exactly in minor units and return major units.
+    """
+
+    def __init__(self, ids, day, category, amount, type_code, categories):
+        self.ids = ids
+        self.day = day
+        self.category = category
+        self.amount = amount
+        self.type = type_code
+        self.categories = list(categories)
+        # The columns never change, so derived bucket columns are kept
+        self._buckets = {}
+
+    @classmethod
+    def from_rows(cls, rows, categories=()):
+        """Build a frame from (id, day, category_id, amount, type_code) rows, as selected by FRAME_SELECT.
+
+        `categories` names the category ids, as CategoryRegistry.names() does.
+        """
+        if rows:
+            ids, days, category_ids, amounts, types = zip(*rows)
+        else:
+            ids = days = category_ids = amounts = types = ()
+        return cls(
+            np.array(ids, dtype=np.int64),
+            np.array(days, dtype=np.int32),
+            np.array(category_ids, dtype=np.int32),
+            np.array(amounts, dtype=np.int64),
+            np.array(types, dtype=np.int8),
+            categories,
+        )
+
+    def __len__(self):
+        return len(self.ids)
+
+    def select(self, mask):
+        """A new frame holding only the transactions where `mask` is true."""
+        return TransactionFrame(self.ids[mask], self.day[mask], self.category[mask], self.amount[mask],
+                                self.type[mask], self.categories)
+
+    # Masks
+
+    def is_type(self, transaction_type):
+        return self.type == TYPES.index(transaction_type)
+
+    @property
+    def expenses(self):
+        return self.is_type('Expense')
+
+    @property
+    def income(self):
+        return self.is_type('Income')
+
+    def between(self, start_date=None, end_date=None):
+        """Mask of transactions dated from `start_date` to `end_date`, both inclusive."""
+        mask = np.ones(len(self), dtype=bool)
+        if start_date is not None:
+            mask &= self.day >= day_number(start_date)
+        if end_date is not None:
+            mask &= self.day <= day_number(end_date)
+        return mask
+
+    def in_categories(self, names):
+        codes = [code for code, name in enumerate(self.categories) if name is not None and name in names]
+        return np.isin(self.category, codes)
+
+    # Aggregates
+
+    def total(self, mask=None):
+        minor = self.amount.sum() if mask is None else self.amount[mask].sum()
+        return int(minor) / MINOR_UNITS
+
+    def sum_by_category(self, mask=None):
+        """{category: total} over the categories that have at least one transaction under `mask`."""
+        category, amount = self._masked(mask)
+        size = len(self.categories)
+        totals = _group_sums(category, amount, size)
+        present = np.bincount(category, minlength=size) > 0
+        return {self.categories[code]: int(totals[code]) / MINOR_UNITS for code in np.flatnonzero(present)}
+
+    def buckets(self, freq='month'):
+        """Bucket number of every transaction: days, Monday-based weeks, months or years since 1970."""
+        if freq == 'day':
+            return self.day
+        if freq == 'week':
+            # 1970-01-01 was a Thursday
+            return (self.day + 3) // 7
+        if freq in ('month', 'year'):
+            if freq not in self._buckets:
+                self._buckets[freq] = self._calendar_buckets('M' if freq == 'month' else 'Y')
+            return self._buckets[freq]
+        raise ValueError(f"Unknown bucket {freq!r}; expected one of {BUCKETS}")
+
+    @staticmethod
+    def bucket_start(bucket, freq='month'):
+        """First day of a bucket number returned by buckets()."""
+        if freq == 'day':
+            return day_date(bucket)
+        if freq == 'week':
+            return day_date(bucket * 7 - 3)
+        if freq == 'month':
+            return date(1970 + int(bucket) // 12, int(bucket) % 12 + 1, 1)
+        if freq == 'year':
+            return date(1970 + int(bucket), 1, 1)
+        raise ValueError(f"Unknown bucket {freq!r}; expected one of {BUCKETS}")
+
+    def sum_by_bucket(self, freq='month', mask=None, by_category=False):
+        """Totals per date bucket, from the first to the last bucket with transactions under `mask`.
+
+        Returns (bucket_starts, totals); buckets in between without
+        transactions are included with zero totals. totals is 1-D, or with
+        `by_category` a (buckets x categories) array indexed by category code.
+        """
+        buckets = self.buckets(freq)
+        if mask is not None:
+            buckets = buckets[mask]
+        category, amount = self._masked(mask)
+        if not len(buckets):
+            return [], np.zeros((0, len(self.categories)) if by_category else 0)
+        # Offsets from the first bucket index a bincount directly
+        first = int(buckets.min())
+        offset = buckets - first
+        span = int(offset.max()) + 1
+        starts = [self.bucket_start(first + bucket, freq) for bucket in range(span)]
+        if not by_category:
+            return starts, _group_sums(offset, amount, span) / MINOR_UNITS
+        size = len(self.categories)
+        totals = _group_sums(offset * size + category, amount, span * size)
+        return starts, totals.reshape(span, size) / MINOR_UNITS
+
+    def daily_totals(self, mask=None, start_date=None, end_date=None):
+        """(first_day, totals) with one total per calendar day, days without transactions included."""
+        first_day, totals = self._daily_minor(mask, start_date, end_date)
+        return first_day, totals / MINOR_UNITS
+
+    def rolling_sum(self, window_days, mask=None, start_date=None, end_date=None):
+        """(first_day, sums) where sums[i] totals the `window_days` calendar days ending on day i.
+
+        Days before the first one count as empty, so early windows are partial.
+        """
+        first_day, totals = self._daily_minor(mask, start_date, end_date)
+        running = np.concatenate(([0], np.cumsum(totals)))
+        ends = np.arange(1, len(running))
+        return first_day, (running[ends] - running[np.maximum(ends - window_days, 0)]) / MINOR_UNITS
+
+    def rolling_mean(self, window_days, mask=None, start_date=None, end_date=None):
+        first_day, sums = self.rolling_sum(window_days, mask, start_date, end_date)
+        return first_day, sums / window_days
+
+    def _daily_minor(self, mask, start_date, end_date):
+        days = self.day if mask is None else self.day[mask]
+        amount = self.amount if mask is None else self.amount[mask]
+        first = day_number(start_date) if start_date is not None else (int(days.min()) if len(days) else 0)
+        last = day_number(end_date) if end_date is not None else (int(days.max()) if len(days) else first - 1)
+        keep = (days >= first) & (days <= last)
+        return day_date(first), _group_sums(days[keep] - first, amount[keep], last - first + 1)
+
+    def _calendar_buckets(self, unit):
+        if not len(self):
+            return self.day
+        # Convert each distinct day once and gather: far cheaper than casting
+        # every element through datetime64
+        first = int(self.day.min())
+        days = np.arange(first, int(self.day.max()) + 1).astype('datetime64[D]')
+        lookup = days.astype(f'datetime64[{unit}]').astype(np.int32)
+        return lookup[self.day - first]
+
+    def _masked(self, mask):
+        if mask is None:
+            return self.category, self.amount
+        return self.category[mask], self.amount[mask]
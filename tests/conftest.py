@@ -0,0 +1,14 @@
+import pytest
+
+import database
+from models.read_cache import read_cache
+
+
+@pytest.fixture
+def db(tmp_path):
+    """A fresh, migrated database for the test, with nothing cached from earlier ones."""
+    database.set_database(str(tmp_path / 'expenses.db'))
+    database.init_db()
+    read_cache.clear()
+    yield database
+    database.close_thread_connection()
@@ -0,0 +1,42 @@
+from datetime import datetime
+
+from models.budget_alerts import budget_alerts
+from models.budget_models import BudgetModel
+from models.transaction import TransactionModel
+
+
+def test_alerts_fire_when_spending_crosses_thresholds(db):
+    BudgetModel().apply_changes(datetime(2024, 3, 1), {'Food': {'amount': 100, 'type': 'Mandatory'}})
+    transactions = TransactionModel()
+    raised = []
+    budget_alerts.add_listener(raised.append)
+    try:
+        transactions.add_transaction('2024-03-02', 'Food', 70, 'Expense', '', 'USD')
+        transactions.add_transaction('2024-03-03', 'Food', 15, 'Expense', '', 'USD')
+        transactions.add_transactions_bulk([('2024-03-04', 'Food', 20, 'Expense', '', 'USD')])
+    finally:
+        budget_alerts.remove_listener(raised.append)
+    assert [(alert['threshold'], alert['spent']) for alerts in raised for alert in alerts] == [(0.8, 85.0), (1.0, 105.0)]
+
+
+def test_deleting_an_undated_expense_raises_nothing(db):
+    transactions = TransactionModel()
+    transactions.add_transaction('2024-03-02', 'Food', 10, 'Expense', '', 'USD')
+    with db.db_connection() as conn:
+        conn.execute("INSERT INTO transactions (date, category_id, amount, type, comment, currency) "
+                     "SELECT NULL, category_id, 1000, 'Expense', '', 'USD' FROM transactions LIMIT 1")
+        undated_id = conn.execute("SELECT max(id) FROM transactions").fetchone()[0]
+
+    assert transactions.delete_transaction(undated_id)[0] == undated_id
+
+
+def test_a_failing_alert_check_does_not_fail_a_committed_write(db, monkeypatch):
+    BudgetModel().apply_changes(datetime(2024, 3, 1), {'Food': {'amount': 100, 'type': 'Mandatory'}})
+
+    def fail(*args):
+        raise RuntimeError("rollups unreadable")
+    monkeypatch.setattr(budget_alerts, '_read_spent', fail)
+
+    transaction = TransactionModel().add_transaction('2024-03-02', 'Food', 90, 'Expense', '', 'USD')
+    with db.db_connection() as conn:
+        assert conn.execute("SELECT count(*) FROM transactions WHERE id = ?", (transaction[0],)).fetchone()[0] == 1
@@ -0,0 +1,18 @@
+from datetime import datetime
+
+from models.budget_models import BudgetModel
+from models.transaction import TransactionModel
+
+
+def test_suggestion_leaves_out_uncategorized_spending(db):
+    transactions = TransactionModel()
+    for month in range(1, 7):
+        transactions.add_transaction(f'2024-{month:02d}-10', 'Food', 150, 'Expense', '', 'USD')
+        transactions.add_transaction(f'2024-{month:02d}-11', '', 40, 'Expense', '', 'USD')
+
+    budget_model = BudgetModel()
+    suggestion = budget_model.suggest_budget(datetime(2024, 7, 1), 1000)
+
+    assert list(suggestion) == ['Food']
+    budget_model.apply_changes(datetime(2024, 7, 1), suggestion)
+    assert budget_model.get_budget(datetime(2024, 7, 1)) == suggestion
@@ -0,0 +1,23 @@
+from datetime import datetime
+
+import pytest
+
+from models.budget_models import BudgetModel
+from models.transaction import TransactionModel
+
+
+@pytest.mark.parametrize('date', [None, 'garbage'])
+def test_variance_leaves_out_spending_without_a_readable_date(db, date):
+    transactions = TransactionModel()
+    transactions.add_transaction('2024-03-10', 'Food', 150, 'Expense', '', 'USD')
+    transactions.add_transaction('2024-04-10', 'Food', 90, 'Expense', '', 'USD')
+    budget_model = BudgetModel()
+    budget_model.apply_changes(datetime(2024, 3, 1), {'Food': {'amount': 100, 'type': 'Flexible'}})
+    with db.db_connection() as conn:
+        conn.execute("INSERT INTO transactions (date, category_id, amount, type, comment, currency) "
+                     "SELECT ?, category_id, 1000, 'Expense', '', 'USD' FROM transactions LIMIT 1", (date,))
+
+    variance = budget_model.get_budget_variance()
+
+    assert variance.months == ['2024-03', '2024-04']
+    assert variance.actual.tolist() == [[15000], [9000]]
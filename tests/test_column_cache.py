@@ -0,0 +1,24 @@
+from models.column_cache import get_column_cache
+from models.transaction import TransactionModel
+
+
+def test_frames_keep_their_snapshot_when_rows_are_updated_and_deleted(db):
+    transactions = TransactionModel()
+    for amount in (10, 20, 30):
+        transactions.add_transaction('2024-03-10', 'Food', amount, 'Expense', '', 'USD')
+    cache = get_column_cache()
+    before = cache.frame()
+    ids = before.ids.tolist()
+
+    with db.db_connection() as conn:
+        conn.execute("UPDATE transactions SET amount = 9900 WHERE id = ?", (ids[0],))
+    transactions.delete_transaction(ids[1])
+    transactions.add_transaction('2024-03-11', 'Food', 40, 'Expense', '', 'USD')
+    stats = cache.refresh()
+    after = cache.frame()
+
+    assert stats['rebuilt'] is False and stats['patched'] == 1 and stats['deleted'] == 1
+    assert before.ids.tolist() == ids
+    assert before.amount.tolist() == [1000, 2000, 3000]
+    assert after.ids.tolist() == [ids[0], ids[2], ids[2] + 1]
+    assert after.amount.tolist() == [9900, 3000, 4000]
@@ -0,0 +1,64 @@
+import pytest
+
+from importers.parsers import StatementParseError
+from importers.pipeline import StatementImporter, fingerprint
+from models.transaction import TransactionModel
+
+
+def _record(date, amount, description, record_id=None):
+    return {'date': date, 'amount': amount, 'description': description, 'category': None,
+            'currency': None, 'id': record_id}
+
+
+def test_identical_lines_on_one_day_keep_distinct_fingerprints_across_other_days():
+    records = [_record('2024-03-05', -3.5, 'Coffee'),
+               _record('2024-03-04', -2.0, 'Bus'),
+               _record('2024-03-05', -3.5, 'Coffee')]
+    fingerprints = [record['fingerprint'] for record in fingerprint(records)]
+    assert len(set(fingerprints)) == 3
+
+
+def test_fingerprints_are_stable_between_imports():
+    def lines():
+        return [_record('2024-03-05', -3.5, 'Coffee'), _record('2024-03-04', -2.0, 'Bus'),
+                _record('2024-03-05', -3.5, 'Coffee'), _record('2024-03-06', 10.0, 'Refund', 'FIT1')]
+
+    first = [record['fingerprint'] for record in fingerprint(lines())]
+    second = [record['fingerprint'] for record in fingerprint(lines())]
+    assert first == second
+
+
+def _write_statements(directory, files=4, lines=25):
+    paths = []
+    for number in range(files):
+        path = directory / f'statement{number}.csv'
+        rows = [f'2024-03-{line % 28 + 1:02d},-{number + 1}.{line:02d},Shop {line}' for line in range(lines)]
+        path.write_text('Date,Amount,Description\n' + '\n'.join(rows + ['not a date,1,Bad']) + '\n')
+        paths.append(str(path))
+    return paths
+
+
+def test_parallel_import_streams_batches_like_a_serial_one(db, tmp_path):
+    paths = _write_statements(tmp_path)
+    progress = []
+    importer = StatementImporter(TransactionModel(), ['Food'], default_currency='USD', batch_size=10,
+                                 processes=2, parallel_threshold=1)
+
+    summary = importer.import_files(paths, progress_callback=lambda *args: progress.append(args))
+
+    assert (summary['imported'], summary['duplicates'], summary['skipped']) == (100, 0, 4)
+    assert progress[-1] == (100, 4, 4)
+    # Batches of ten from four files, each file's end reported too
+    assert len(progress) == 12 + 4
+    serial = StatementImporter(TransactionModel(), ['Food'], default_currency='USD', batch_size=10)
+    assert serial.import_files(paths)['duplicates'] == 100
+
+
+def test_parallel_import_reports_an_unreadable_file(db, tmp_path):
+    paths = _write_statements(tmp_path, files=2)
+    broken = tmp_path / 'broken.csv'
+    broken.write_text('Foo,Bar\n1,2\n')
+    importer = StatementImporter(TransactionModel(), ['Food'], processes=2, parallel_threshold=1)
+
+    with pytest.raises(StatementParseError):
+        importer.import_files(paths + [str(broken)])
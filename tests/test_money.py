@@ -0,0 +1,30 @@
+import pytest
+
+from models.money import MINOR_UNIT_EXPONENT, MINOR_UNITS, Money
+
+
+@pytest.mark.parametrize('text, minor', [
+    ('12.50', 1250),
+    ('$1,234.56', 123456),
+    ('-$5', -500),
+    ('$-5', -500),
+    ('GBP 3.2', 320),
+    ('3.2 USD', 320),
+    ('.5', 50),
+    (' 7 ', 700),
+])
+def test_parses_amounts_as_typed(text, minor):
+    assert Money.from_major(text).minor == minor
+
+
+@pytest.mark.parametrize('text', ['1e3', '', 'abc', '1.2.3', '12,34', '--5', '-$-5', '.', 'NaN', 'Infinity'])
+def test_rejects_malformed_amounts(text):
+    with pytest.raises(ValueError):
+        Money.from_major(text)
+
+
+def test_formats_at_the_minor_unit_scale():
+    assert MINOR_UNITS == 10 ** MINOR_UNIT_EXPONENT
+    assert f"{Money(123456):,.2f}" == '1,234.56'
+    assert f"{Money(-5)}" == '-0.05'
+    assert str(Money(7)) == '0.07'
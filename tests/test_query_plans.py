@@ -0,0 +1,77 @@
+"""Every hot model query must reach the transactions through an index.
+
+Each case lists the tables its query is allowed to read in full: only ones
+sized by months and categories rather than by transactions, and only where
+the query wants all of their rows anyway. Any other full scan fails.
+"""
+import re
+from datetime import datetime
+
+import pytest
+
+from models.budget_models import BudgetModel
+from models.read_cache import read_cache
+from models.transaction import TransactionModel
+from models.transaction_frame import day_number
+
+MONTH = datetime(2024, 1, 1)
+
+# (case, call on (TransactionModel, BudgetModel), tables read in full)
+QUERIES = [
+    ('category_spending', lambda t, b: t.get_category_spending(MONTH, 'Food'), set()),
+    ('transactions_in_range', lambda t, b: t.get_transactions_in_range(MONTH, datetime(2024, 1, 31)), set()),
+    ('page_by_date', lambda t, b: t.get_transactions_page((day_number('2024-01-15'), 5), 200), set()),
+    ('page_filtered', lambda t, b: t.get_transactions_page(None, 200, {'category': 'Food',
+                                                                        'start_date': '2024-01-01'}), set()),
+    ('page_by_amount', lambda t, b: t.get_transactions_page((100.0, 5), 200, {}, 'amount', False), set()),
+    ('page_by_category', lambda t, b: t.get_transactions_page(('Food', day_number('2024-01-15'), 5), 200, {},
+                                                              'category'), set()),
+    # Totals of every month and category: the rollups are what they are read from
+    ('spending_by_category', lambda t, b: t.get_spending_by_category(), {'transaction_rollups'}),
+    ('income_vs_expenses', lambda t, b: t.get_income_vs_expenses(), {'transaction_rollups'}),
+    ('available_months', lambda t, b: b.get_available_months(), {'monthly_income'}),
+    ('budget', lambda t, b: b.get_budget(MONTH), set()),
+    ('budget_report', lambda t, b: b.get_budget_report(MONTH), set()),
+    ('total_income', lambda t, b: b.get_total_income(MONTH), set()),
+    # Every budget line of every month, and the expense rollups of budgeted categories
+    ('budget_variance', lambda t, b: b.get_budget_variance(), {'monthly_budgets', 'transaction_rollups'}),
+    ('suggest_budget', lambda t, b: b.suggest_budget(MONTH), set()),
+]
+
+_FULL_SCAN = re.compile(r'SCAN (\w+)$')
+
+
+@pytest.fixture
+def models(db):
+    transactions = TransactionModel()
+    for day in range(1, 29):
+        transactions.add_transaction(f'2023-12-{day:02d}', 'Food', 10 + day, 'Expense', '', 'USD')
+        transactions.add_transaction(f'2024-01-{day:02d}', 'Rent', 500, 'Expense', '', 'USD')
+    budget_model = BudgetModel()
+    budget_model.apply_changes(MONTH, {'Food': {'amount': 300, 'type': 'Flexible'}}, total_income=2000)
+    return transactions, budget_model
+
+
+def query_plans(db, call):
+    """EXPLAIN QUERY PLAN steps of each SELECT `call` sends to SQLite."""
+    statements = []
+    # A cached result would send nothing to SQLite
+    read_cache.clear()
+    conn = db.get_thread_connection()
+    conn.set_trace_callback(statements.append)
+    try:
+        call()
+    finally:
+        conn.set_trace_callback(None)
+    return [[row[3] for row in conn.execute("EXPLAIN QUERY PLAN " + statement)]
+            for statement in statements if statement.lstrip().upper().startswith('SELECT')]
+
+
+@pytest.mark.parametrize('call, full_scans', [case[1:] for case in QUERIES], ids=[case[0] for case in QUERIES])
+def test_query_reads_only_expected_tables_in_full(db, models, call, full_scans):
+    plans = query_plans(db, lambda: call(*models))
+
+    assert plans
+    # "SCAN t" alone walks the table; "SCAN t USING [COVERING] INDEX i" only the index
+    scanned = {match.group(1) for plan in plans for step in plan for match in [_FULL_SCAN.match(step)] if match}
+    assert scanned == full_scans, plans
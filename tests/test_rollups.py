@@ -0,0 +1,17 @@
+import pytest
+
+from models.transaction import TransactionModel
+
+
+@pytest.mark.parametrize('date', [None, 'garbage'])
+def test_income_vs_expenses_leaves_out_transactions_without_a_readable_date(db, date):
+    transactions = TransactionModel()
+    transactions.add_transaction('2024-03-10', 'Food', 150, 'Expense', '', 'USD')
+    transactions.add_transaction('2024-03-25', 'Salary', 2000, 'Income', '', 'USD')
+    with db.db_connection() as conn:
+        conn.execute("INSERT INTO transactions (date, category_id, amount, type, comment, currency) "
+                     "SELECT ?, category_id, 1000, 'Expense', '', 'USD' FROM transactions LIMIT 1", (date,))
+
+    assert transactions.get_income_vs_expenses() == {'2024-03': {'income': 2000.0, 'expenses': 150.0}}
+    # Undated spending still counts towards its category's total
+    assert transactions.get_spending_by_category() == {'Food': 160.0}
@@ -0,0 +1,51 @@
+import pytest
+
+from models.money import Money
+from models.transaction import TransactionModel, transaction_matches, transaction_sort_key
+
+
+@pytest.fixture
+def transactions(db):
+    """Seven dated transactions and, as id 4, a legacy row whose date cannot be read."""
+    model = TransactionModel()
+    for day in range(1, 4):
+        model.add_transaction(f'2024-01-{day:02d}', 'Food', 10, 'Expense', '', 'USD')
+    with db.db_connection() as conn:
+        conn.execute("INSERT INTO transactions (date, category_id, amount, type, comment, currency) "
+                     "SELECT 'someday', category_id, 1000, 'Expense', '', 'USD' FROM transactions LIMIT 1")
+    for day in range(4, 8):
+        model.add_transaction(f'2024-01-{day:02d}', 'Food', 10, 'Expense', '', 'USD')
+    return model
+
+
+def page_through(model, sort_column, descending):
+    ids, after_key = [], None
+    while True:
+        page = model.get_transactions_page(after_key, 1, sort_column=sort_column, descending=descending)
+        if not page:
+            return ids
+        ids.append(page[0][0])
+        after_key = transaction_sort_key(page[0], sort_column)
+
+
+@pytest.mark.parametrize('sort_column', ['date', 'category'])
+def test_paging_passes_undated_rows(transactions, sort_column):
+    assert page_through(transactions, sort_column, descending=True) == [8, 7, 6, 5, 3, 2, 1, 4]
+    assert page_through(transactions, sort_column, descending=False) == [4, 1, 2, 3, 5, 6, 7, 8]
+
+
+def test_sort_keys_of_undated_rows_compare_with_dated_ones(transactions):
+    rows = transactions.get_all_transactions()
+    keys = [transaction_sort_key(row) for row in rows]
+    assert keys == sorted(keys, reverse=True)
+    assert [row[0] for row in rows][-1] == 4
+
+
+@pytest.mark.parametrize('min_amount, max_amount, count', [('10.00', '$10', 8), ('10.01', None, 0), (None, '9.99', 0)])
+def test_in_memory_amount_filter_agrees_with_the_query(transactions, min_amount, max_amount, count):
+    filters = {'min_amount': min_amount and Money.from_major(min_amount),
+               'max_amount': max_amount and Money.from_major(max_amount)}
+    rows = transactions.get_all_transactions()
+    matching = [row[0] for row in rows if transaction_matches(row, filters)]
+    assert matching == [row[0] for row in transactions.get_transactions_page(None, 20, filters)]
+    assert len(matching) == count
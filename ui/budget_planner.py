@@ -5,13 +5,35 @@ from PyQt6.QtWidgets import (QApplication, QWidget, QVBoxLayout, QHBoxLayout, QL
                              QLineEdit, QPushButton, QComboBox, QScrollArea, QFrame,
                              QGridLayout, QSizePolicy, QMessageBox, QTableWidget, QTableWidgetItem, QInputDialog,
                              QDialogButtonBox, QDialog)
-from PyQt6.QtCore import Qt, pyqtSignal, pyqtSlot
+from PyQt6.QtCore import Qt, QTimer, pyqtSignal, pyqtSlot
 from PyQt6.QtGui import QColor, QFont
 from dateutil.relativedelta import relativedelta
 import logging
 import models.budget_models
+from models.budget_session import BudgetSession
+from models.money import Money
+from ui.db_executor import DatabaseExecutor
 
 logger = logging.getLogger(__name__)
+
+# Edits are saved once typing has paused this long
+SAVE_DELAY_MS = 750
+
+# Budget History columns: header and BudgetVariance.summary() field
+HISTORY_COLUMNS = [
+    ("Category", 'category'),
+    ("Months Budgeted", 'budgeted_months'),
+    ("Months Over", 'overspent_months'),
+    ("Current Streak", 'current_streak'),
+    ("Longest Streak", 'longest_streak'),
+    ("3-Month Avg", 'mean_3'),
+    ("6-Month Avg", 'mean_6'),
+    ("12-Month Avg", 'mean_12'),
+    ("Median", 'p50'),
+    ("90th Pct", 'p90'),
+]
+
+
 class BudgetUpdateDialog(QDialog):
     def __init__(self, current_budget, parent=None):
         super().__init__(parent)
@@ -40,7 +62,7 @@ class BudgetUpdateDialog(QDialog):
         updated_budget = {}
         for category, input_widget in self.category_inputs.items():
             try:
-                updated_budget[category] = float(input_widget.text())
+                updated_budget[category] = Money.from_major(input_widget.text())
             except ValueError:
                 QMessageBox.warning(self, "Invalid Input", f"Please enter a valid number for {category}")
                 return None
@@ -81,12 +103,21 @@ class BudgetItemWidget(QFrame):
 
 
 class BudgetPlanner(QWidget):
-    def __init__(self, category_model, budget_model, transaction_model):
+    def __init__(self, category_model, budget_model, transaction_model, db_executor=None):
         super().__init__()
         self.category_model = category_model
         self.budget_model = budget_model
         self.transaction_model = transaction_model
+        self.db_executor = db_executor or DatabaseExecutor(self)
         self.current_month = datetime.now().replace(day=1)
+        # The month on display. Edits go to it first and reach the database in
+        # batches, once save_timer runs out or something needs them saved
+        self.session = BudgetSession(self.current_month)
+        self.session_rows = {}
+        self.save_timer = QTimer(self)
+        self.save_timer.setSingleShot(True)
+        self.save_timer.setInterval(SAVE_DELAY_MS)
+        self.save_timer.timeout.connect(self.flush_session)
         self.init_ui()
 
     def init_ui(self):
@@ -145,6 +176,15 @@ class BudgetPlanner(QWidget):
 
         main_layout.addLayout(sections_layout)
 
+        # Budget history of every budgeted category up to the month on display
+        self.history_section = CollapsibleSection("Budget History")
+        self.history_table = QTableWidget()
+        self.history_table.setColumnCount(len(HISTORY_COLUMNS))
+        self.history_table.setHorizontalHeaderLabels([header for header, _ in HISTORY_COLUMNS])
+        self.history_table.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+        self.history_section.add_item(self.history_table)
+        main_layout.addWidget(self.history_section)
+
         # Totals and remaining display
         totals_layout = QHBoxLayout()
         self.total_budgeted = QLabel("Total Budgeted: $0")
@@ -161,8 +201,20 @@ class BudgetPlanner(QWidget):
         self.new_month_button.clicked.connect(self.create_next_month_budget)
         self.update_button = QPushButton("Update Budget")
         self.update_button.clicked.connect(self.update_current_budget)
+        self.roll_forward_button = QPushButton("Roll Forward...")
+        self.roll_forward_button.clicked.connect(self.roll_budget_forward)
+        self.save_template_button = QPushButton("Save as Template...")
+        self.save_template_button.clicked.connect(self.save_budget_template)
+        self.apply_template_button = QPushButton("Apply Template...")
+        self.apply_template_button.clicked.connect(self.apply_budget_template)
         button_layout.addWidget(self.new_month_button)
         button_layout.addWidget(self.update_button)
+        button_layout.addWidget(self.roll_forward_button)
+        button_layout.addWidget(self.save_template_button)
+        button_layout.addWidget(self.apply_template_button)
+        self.suggest_button = QPushButton("Suggest Budget")
+        self.suggest_button.clicked.connect(self.suggest_budget)
+        button_layout.addWidget(self.suggest_button)
         main_layout.addLayout(button_layout)
 
         # Initialize data
@@ -171,7 +223,7 @@ class BudgetPlanner(QWidget):
         self.load_current_month_budget()
 
         # Connect signals
-        self.income_input.textChanged.connect(self.update_budget_remaining)
+        self.income_input.textChanged.connect(self.income_edited)
         self.month_selector.currentIndexChanged.connect(self.load_selected_month_budget)
 
     def load_categories(self):
@@ -180,60 +232,129 @@ class BudgetPlanner(QWidget):
         self.category_input.addItems(categories)
         #self.update_budget_table()
 
+    def income_edited(self, text):
+        # Runs on every keystroke: the session absorbs it, and the database
+        # sees the income once typing pauses
+        try:
+            total_income = Money.from_major(text or 0)
+        except ValueError:
+            return
+        if self.session.set_income(total_income):
+            self.save_timer.start()
+        self.update_budget_remaining()
+
     def save_total_income(self):
         try:
-            total_income = float(self.income_input.text() or 0)
-            self.budget_model.update_total_income(self.current_month, total_income)
-            logger.info(f"Saved total income: {total_income}")
-            self.update_budget_remaining()  # Update the display immediately
+            Money.from_major(self.income_input.text() or 0)
         except ValueError:
             logger.warning("Invalid total income entered")
             QMessageBox.warning(self, "Invalid Input", "Please enter a valid number for total income.")
-
-    def update_month_selector(self):
-        self.month_selector.clear()
-        months = self.budget_model.get_available_months()
-        for month in months:
-            self.month_selector.addItem(month.strftime("%B %Y"), month)
-        self.month_selector.setCurrentIndex(self.month_selector.count() - 1)
-        self.month_selector.currentIndexChanged.connect(self.load_selected_month_budget)
+            return
+        self.flush_session()
+
+    def flush_session(self):
+        """Save pending edits on the database thread."""
+        self.save_timer.stop()
+        session = self.session
+        changes = session.take_changes()
+        if changes is not None:
+            # Not keyed: a later flush must not cancel this one, whose changes
+            # the session no longer holds
+            self.db_executor.submit(self.budget_model.apply_changes, **changes,
+                                    on_error=lambda error: self.show_save_error(session, changes, error))
+
+    def save_session(self):
+        """Save pending edits before returning, for code that reads the budget straight from the database."""
+        self.save_timer.stop()
+        changes = self.session.take_changes()
+        if changes is not None:
+            try:
+                self.budget_model.apply_changes(**changes)
+            except Exception:
+                self.session.restore_changes(changes)
+                raise
+
+    def show_save_error(self, session, changes, error):
+        if session is self.session:
+            session.restore_changes(changes)
+        QMessageBox.critical(self, "Error", f"An error occurred while saving the budget: {str(error)}")
+
+    def update_month_selector(self, selected=None):
+        """Refill the selector and select `selected`, or else the latest month, without loading it."""
+        self.month_selector.blockSignals(True)
+        try:
+            self.month_selector.clear()
+            months = self.budget_model.get_available_months()
+            for month in months:
+                self.month_selector.addItem(month.strftime("%B %Y"), month)
+            index = self.month_selector.count() - 1
+            if selected is not None:
+                keys = [month.strftime('%Y-%m') for month in months]
+                if selected.strftime('%Y-%m') in keys:
+                    index = keys.index(selected.strftime('%Y-%m'))
+            self.month_selector.setCurrentIndex(index)
+        finally:
+            self.month_selector.blockSignals(False)
 
     def load_current_month_budget(self):
-        budget = self.budget_model.get_budget(self.current_month)
-        total_income = self.budget_model.get_total_income(self.current_month)
-        self.income_input.setText(str(total_income))
-        self.display_budget(budget)
+        self.load_month_budget(self.current_month)
 
     def load_selected_month_budget(self):
         selected_month = self.month_selector.currentData()
-        budget = self.budget_model.get_budget(selected_month)
-        total_income = self.budget_model.get_total_income(selected_month)
-        self.income_input.setText(str(total_income))
-        self.display_budget(budget)
-
-    def display_budget(self, budget):
-        # Filter out the TotalIncome entry from the budget display
-        filtered_budget = {k: v for k, v in budget.items() if k != 'TotalIncome'}
-
-        self.budget_table.setRowCount(len(filtered_budget))
-        for row, (category, item) in enumerate(filtered_budget.items()):
+        if selected_month is not None:
+            # Edits, income and actuals all follow the month being viewed
+            self.current_month = selected_month
+            self.load_month_budget(selected_month)
+
+    def load_month_budget(self, month, on_loaded=None):
+        # The worker runs jobs in order, so pending edits are saved before the
+        # month is read back
+        self.flush_session()
+        # A newer load (e.g. scrolling through the month selector) supersedes this one
+        self.db_executor.submit(self.fetch_month_budget, month, key='budget',
+                                on_result=lambda session: self.show_month_budget(session, on_loaded),
+                                on_error=self.show_load_error)
+
+    def fetch_month_budget(self, month):
+        # Runs on the database thread
+        return BudgetSession.load(self.budget_model, month)
+
+    def show_month_budget(self, session, on_loaded=None):
+        # Edits made while the month was loading are saved rather than lost
+        self.flush_session()
+        self.session = session
+        self.display_budget()
+        self.load_budget_history()
+        if on_loaded:
+            on_loaded(session.lines)
+
+    def load_budget_history(self):
+        month = self.session.month.strftime('%Y-%m')
+        self.db_executor.submit(self.budget_model.get_budget_variance, key='variance',
+                                on_result=lambda variance: self.display_budget_history(variance.until(month)),
+                                on_error=lambda error: logger.error(f"Error loading budget history: {error}"))
+
+    def display_budget_history(self, variance):
+        rows = sorted(variance.summary(), key=lambda row: row['category'])
+        self.history_table.setRowCount(len(rows))
+        for row, summary in enumerate(rows):
+            for column, (_, field) in enumerate(HISTORY_COLUMNS):
+                value = summary[field]
+                item = QTableWidgetItem(f"${value:.2f}" if isinstance(value, float) else str(value))
+                if field == 'current_streak' and value:
+                    item.setForeground(QColor('red'))
+                self.history_table.setItem(row, column, item)
+
+    def show_load_error(self, error):
+        QMessageBox.critical(self, "Error", f"An error occurred while loading the budget: {str(error)}")
+
+    def display_budget(self):
+        lines = sorted(self.session.lines.items())
+        self.session_rows = {category: row for row, (category, _) in enumerate(lines)}
+        self.budget_table.setRowCount(len(lines))
+        for row, (category, line) in enumerate(lines):
             self.budget_table.setItem(row, 0, QTableWidgetItem(category))
-
-            if isinstance(item, dict):
-                amount = item['amount']
-                item_type = item.get('type', 'Mandatory')
-            else:
-                amount = item
-                item_type = 'Mandatory'
-
-            self.budget_table.setItem(row, 1, QTableWidgetItem(f"${amount:.2f}"))
-            self.budget_table.setItem(row, 2, QTableWidgetItem(item_type))
-
-            actual = self.transaction_model.get_category_spending(self.current_month, category)
-            self.budget_table.setItem(row, 3, QTableWidgetItem(f"${actual:.2f}"))
-
-            remaining = amount - actual
-            self.budget_table.setItem(row, 4, QTableWidgetItem(f"${remaining:.2f}"))
+            self.show_line(row, line)
 
             # Create a widget to hold both Edit and Delete buttons
             button_widget = QWidget()
@@ -241,7 +362,7 @@ class BudgetPlanner(QWidget):
             button_layout.setContentsMargins(0, 0, 0, 0)
 
             edit_button = QPushButton("Edit")
-            edit_button.clicked.connect(lambda _, c=category, a=amount: self.edit_budget_item(c, a))
+            edit_button.clicked.connect(lambda _, c=category: self.edit_budget_item(c))
             button_layout.addWidget(edit_button)
 
             delete_button = QPushButton("Delete")
@@ -252,25 +373,30 @@ class BudgetPlanner(QWidget):
 
         self.budget_table.resizeColumnsToContents()
         self.update_totals()
-        self.update_budget_remaining()
 
-        # Update the income input field
-        total_income = self.budget_model.get_total_income(self.current_month)
-        self.income_input.setText(f"{total_income:.2f}")
+        # Matches the session's income, so textChanged saves nothing
+        self.income_input.setText(f"{self.session.total_income:.2f}")
+        self.update_budget_remaining()
 
+    def show_line(self, row, line):
+        self.budget_table.setItem(row, 1, QTableWidgetItem(f"${line.budgeted:.2f}"))
+        self.budget_table.setItem(row, 2, QTableWidgetItem(line.item_type))
+        self.budget_table.setItem(row, 3, QTableWidgetItem(f"${line.actual:.2f}"))
+        self.budget_table.setItem(row, 4, QTableWidgetItem(f"${line.remaining:.2f}"))
 
-    def edit_budget_item(self, category, current_amount):
+    def edit_budget_item(self, category):
+        line = self.session.lines.get(category)
+        if line is None:
+            return
         new_amount, ok = QInputDialog.getDouble(self, f"Edit {category}",
                                                 "Enter new amount:",
-                                                current_amount, 0, 1000000, 2)
+                                                float(line.budgeted), 0, 1000000, 2)
         if ok:
-            current_budget = self.budget_model.get_budget(self.current_month)
-            if isinstance(current_budget[category], dict):
-                current_budget[category]['amount'] = new_amount
-            else:
-                current_budget[category] = {'amount': new_amount, 'type': 'Mandatory'}
-            self.budget_model.update_budget(self.current_month, current_budget)
-            self.load_current_month_budget()
+            self.session.set_budgeted(category, new_amount)
+            self.show_line(self.session_rows[category], line)
+            self.update_totals()
+            self.update_budget_remaining()
+            self.save_timer.start()
 
     def update_section(self, section, items):
         try:
@@ -282,13 +408,8 @@ class BudgetPlanner(QWidget):
                     widget.setParent(None)
 
             # Add updated items to the layout
-            for category, item in items:
-                if isinstance(item, dict):
-                    amount = item['amount']
-                else:
-                    amount = item
-
-                item_widget = QLabel(f"{category}: ${amount:.2f}")
+            for category, line in items:
+                item_widget = QLabel(f"{category}: ${line.budgeted:.2f}")
                 item_widget.setStyleSheet("""
                      background-color: #f0f0f0;
                      border: 1px solid #ddd;
@@ -308,27 +429,15 @@ class BudgetPlanner(QWidget):
             QMessageBox.warning(self, "Warning", f"An error occurred while updating {section.title}: {str(e)}")
 
     def refresh_budget_display(self):
+        logger.info("Starting to refresh budget display")
+        # Reload all budget items from the database, then update the
+        # Mandatory, Flexible, and Optional sections from the same result
+        self.load_month_budget(self.current_month, on_loaded=self.finish_budget_refresh)
+
+    def finish_budget_refresh(self, all_items):
         try:
-            logger.info("Starting to refresh budget display")
-            # Reload all budget items from the database
-            all_items = self.budget_model.get_budget(self.current_month)
-            total_income = self.budget_model.get_total_income(self.current_month)
             logger.debug(f"Retrieved budget items: {all_items}")
-            logger.debug(f"Retrieved total income: {total_income}")
-
-            # Update main table
-            self.display_budget(all_items)
-
-            # Set total income
-            self.income_input.setText(f"{total_income:.2f}")
-
-            # Update Mandatory, Flexible, and Optional sections
             self.update_category_sections(all_items)
-
-            # Update totals
-            self.update_totals()
-            self.update_budget_remaining()
-
             logger.info("Budget display refreshed successfully")
         except Exception as e:
             logger.exception(f"Error refreshing budget display: {str(e)}")
@@ -341,18 +450,14 @@ class BudgetPlanner(QWidget):
             flexible_items = []
             optional_items = []
 
-            for category, item in items.items():
-                if isinstance(item, dict):
-                    item_type = item.get('type', 'Mandatory')
-                else:
-                    item_type = 'Mandatory'
-
+            for category, line in sorted(items.items()):
+                item_type = line.item_type
                 if item_type == 'Mandatory':
-                    mandatory_items.append((category, item))
+                    mandatory_items.append((category, line))
                 elif item_type == 'Flexible':
-                    flexible_items.append((category, item))
+                    flexible_items.append((category, line))
                 elif item_type == 'Optional':
-                    optional_items.append((category, item))
+                    optional_items.append((category, line))
 
             self.update_section(self.mandatory_section, mandatory_items)
             self.update_section(self.flexible_section, flexible_items)
@@ -370,24 +475,16 @@ class BudgetPlanner(QWidget):
 
 
     def update_totals(self):
-        total_budgeted = 0
-        total_actual = 0
-        for row in range(self.budget_table.rowCount()):
-            try:
-                budgeted = float(self.budget_table.item(row, 1).text().replace('$', ''))
-                actual = float(self.budget_table.item(row, 3).text().replace('$', ''))
-                total_budgeted += budgeted
-                total_actual += actual
-            except (ValueError, AttributeError) as e:
-                logger.warning(f"Error processing row {row} in update_totals: {str(e)}")
-
-        total_remaining = total_budgeted - total_actual
+        # Running totals of the session, not a pass over the lines
+        total_budgeted = self.session.total_budgeted
+        total_actual = self.session.total_actual
+        total_remaining = self.session.total_remaining
 
         self.total_budgeted.setText(f"Total Budgeted: ${total_budgeted:.2f}")
         self.total_actual.setText(f"Total Actual: ${total_actual:.2f}")
         self.total_remaining.setText(f"Total Remaining: ${total_remaining:.2f}")
 
-        logger.info(
+        logger.debug(
             f"Updated totals: Budgeted ${total_budgeted:.2f}, Actual ${total_actual:.2f}, Remaining ${total_remaining:.2f}")
 
     def clear_inputs(self):
@@ -396,31 +493,112 @@ class BudgetPlanner(QWidget):
         self.category_input.setCurrentIndex(0)
 
     def create_next_month_budget(self):
-        next_month = self.current_month + relativedelta(months=1)
-        current_budget = self.budget_model.get_budget(self.current_month)
-        self.budget_model.create_budget(next_month, current_budget)
-        self.current_month = next_month
-        self.update_month_selector()
+        month = self.current_month
+        # Queued behind the flush, so the pending edits are rolled forward too
+        self.flush_session()
+        self.db_executor.submit(self.budget_model.roll_forward, 1, from_month=month,
+                                on_result=lambda planned: self.show_planned_month(month + relativedelta(months=1)),
+                                on_error=lambda error: self.show_planning_error("creating the budget", error))
+
+    def roll_budget_forward(self):
+        months, ok = QInputDialog.getInt(self, "Roll Forward", "Number of months to budget:", 12, 1, 120)
+        if not ok:
+            return
+        inflation, ok = QInputDialog.getDouble(self, "Roll Forward", "Monthly increase (%):", 0, -100, 100, 2)
+        if not ok:
+            return
+        self.flush_session()
+        self.db_executor.submit(self.budget_model.roll_forward, months, from_month=self.current_month,
+                                inflation=inflation / 100, on_result=self.show_rolled_forward,
+                                on_error=lambda error: self.show_planning_error("rolling the budget forward", error))
+
+    def show_rolled_forward(self, planned):
+        if planned:
+            self.show_planned_month(planned[-1])
+
+    def save_budget_template(self):
+        name, ok = QInputDialog.getText(self, "Save as Template", "Template name:")
+        if ok and name:
+            month = self.current_month
+            self.flush_session()
+            self.db_executor.submit(self.budget_model.save_month_as_template, name, month,
+                                    on_result=lambda _: QMessageBox.information(
+                                        self, "Success", f"Saved {month:%B %Y} as template '{name}'."),
+                                    on_error=lambda error: self.show_planning_error("saving the template", error))
+
+    def apply_budget_template(self):
+        names = self.budget_model.get_template_names()
+        if not names:
+            QMessageBox.information(self, "Apply Template", "There are no budget templates yet.")
+            return
+        name, ok = QInputDialog.getItem(self, "Apply Template", "Template:", names, 0, False)
+        if not ok:
+            return
+        month = self.current_month
+        months, ok = QInputDialog.getInt(self, "Apply Template",
+                                         f"Number of months to budget from {month:%B %Y}:", 1, 1, 120)
+        if not ok:
+            return
+        self.flush_session()
+        self.db_executor.submit(self.budget_model.apply_template, name, month, months,
+                                on_result=lambda _: self.show_planned_month(month),
+                                on_error=lambda error: self.show_planning_error("applying the template", error))
+
+    def show_planning_error(self, action, error):
+        logger.error(f"Error {action}: {error}")
+        QMessageBox.critical(self, "Error", f"An error occurred while {action}: {str(error)}")
+
+    def suggest_budget(self):
+        # The income as typed, saved or not, is what the suggestion has to fit
+        session = self.session
+        self.db_executor.submit(self.budget_model.suggest_budget, session.month, session.total_income,
+                                key='suggest', on_result=lambda suggestion: self.apply_suggestion(session, suggestion),
+                                on_error=lambda error: QMessageBox.critical(
+                                    self, "Error", f"An error occurred while suggesting a budget: {str(error)}"))
+
+    def apply_suggestion(self, session, suggestion):
+        if session is not self.session:
+            return
+        if not suggestion:
+            QMessageBox.information(self, "Suggest Budget", "There is no spending history to suggest a budget from.")
+            return
+        total = sum(Money.from_major(item['amount']) for item in suggestion.values())
+        reply = QMessageBox.question(self, "Suggest Budget",
+                                     f"Budget {len(suggestion)} categories for {session.month:%B %Y}, "
+                                     f"${total:.2f} in total, from the last months' spending?",
+                                     QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No,
+                                     QMessageBox.StandardButton.Yes)
+        if reply != QMessageBox.StandardButton.Yes:
+            return
+        for category, item in suggestion.items():
+            session.set_budgeted(category, item['amount'], item['type'])
+        # Reloading saves the lines first and brings in their actuals
+        self.load_current_month_budget()
+
+    def show_planned_month(self, month):
+        self.update_month_selector(month)
+        self.current_month = month
         self.load_current_month_budget()
 
     def update_current_budget(self):
-        current_budget = self.budget_model.get_budget(self.current_month)
+        current_budget = {category: line.budgeted for category, line in sorted(self.session.lines.items())}
         dialog = BudgetUpdateDialog(current_budget, self)
         if dialog.exec() == QDialog.DialogCode.Accepted:
             updated_budget = dialog.get_updated_budget()
             if updated_budget:
-                self.budget_model.update_budget(self.current_month, updated_budget)
-                self.load_current_month_budget()
+                for category, amount in updated_budget.items():
+                    self.session.set_budgeted(category, amount)
+                self.display_budget()
+                self.flush_session()
 
     def add_budget_category(self):
         category, ok = QInputDialog.getText(self, "Add Category", "Enter new category name:")
         if ok and category:
             self.category_model.add_category(category)
             self.load_categories()
-            current_budget = self.budget_model.get_budget(self.current_month)
-            current_budget[category] = 0
-            self.budget_model.update_budget(self.current_month, current_budget)
-            self.load_current_month_budget()
+            self.session.set_budgeted(category, 0)
+            self.display_budget()
+            self.flush_session()
 
     def delete_budget_item(self, category):
         reply = QMessageBox.question(self, 'Delete Budget Item',
@@ -430,14 +608,12 @@ class BudgetPlanner(QWidget):
 
         if reply == QMessageBox.StandardButton.Yes:
             try:
-                success = self.budget_model.delete_budget_item(self.current_month, category)
-                if success:
-                    logger.info(f"Deleted budget item: {category}")
-                    QMessageBox.information(self, "Success", f"Budget item '{category}' has been deleted.")
-                    self.refresh_budget_display()  # Refresh the display after deletion
-                else:
-                    logger.warning(f"Failed to delete budget item: {category}")
-                    QMessageBox.warning(self, "Warning", f"Failed to delete budget item '{category}'.")
+                self.session.remove(category)
+                self.display_budget()
+                self.update_category_sections(self.session.lines)
+                self.save_timer.start()
+                logger.info(f"Deleted budget item: {category}")
+                QMessageBox.information(self, "Success", f"Budget item '{category}' has been deleted.")
             except Exception as e:
                 logger.exception(f"Error deleting budget item {category}: {str(e)}")
                 QMessageBox.critical(self, "Error", f"An error occurred while deleting the budget item: {str(e)}")
@@ -452,8 +628,8 @@ class BudgetPlanner(QWidget):
             return
 
         try:
-            amount = float(self.amount_input.text())
-            if amount <= 0:
+            amount = Money.from_major(self.amount_input.text())
+            if amount.minor <= 0:
                 raise ValueError("Amount must be positive")
         except ValueError as e:
             QMessageBox.warning(self, "Invalid Input", f"Please enter a valid positive amount. Error: {str(e)}")
@@ -463,58 +639,39 @@ class BudgetPlanner(QWidget):
         item_type = self.type_input.currentText()  # Get the selected item type
 
         try:
-            current_budget = self.budget_model.get_budget(self.current_month)
-            total_income = self.budget_model.get_total_income(self.current_month)
-            logger.debug(f"Current budget: {current_budget}")
-
-            if category not in current_budget:
-                current_budget[category] = {'amount': 0, 'type': item_type}
-
-            if isinstance(current_budget[category], dict):
-                current_budget[category]['amount'] += amount
-                current_budget[category]['type'] = item_type
-            else:
-                current_budget[category] = {'amount': current_budget[category] + amount, 'type': item_type}
-
+            is_new = category not in self.session.lines
             logger.info(f"Updating budget for {category}: adding {amount} of type {item_type}")
-            self.budget_model.update_budget(self.current_month, current_budget)
-            self.budget_model.update_total_income(self.current_month, total_income)  # Preserve total income
-
-            self.load_current_month_budget()
+            self.session.add_to_budgeted(category, amount, item_type)
+            self.display_budget()
+            self.update_category_sections(self.session.lines)
+            self.save_timer.start()
+            if is_new:
+                # Spending on a newly budgeted category is one rollup lookup
+                self.db_executor.submit(self.transaction_model.get_category_spending, self.current_month, category,
+                                        on_result=lambda spent, s=self.session: self.show_actual(s, category, spent))
             self.clear_inputs()
             QMessageBox.information(self, "Success", f"Added ${amount:.2f} to {category} as {item_type}")
         except Exception as e:
             QMessageBox.critical(self, "Error", f"An error occurred while adding the budget item: {str(e)}")
             logger.exception("Error in add_budget_item")
 
-        try:
-            self.refresh_budget_display()
-        except Exception as e:
-            logger.exception(f"Error refreshing budget display after adding item: {str(e)}")
-            QMessageBox.warning(self, "Warning",
-                                f"The item was added, but there was an error refreshing the display: {str(e)}")
+    def show_actual(self, session, category, spent):
+        if session is self.session and category in self.session_rows:
+            session.set_actual(category, spent)
+            self.show_line(self.session_rows[category], session.lines[category])
+            self.update_totals()
 
     def update_budget_remaining(self):
-        total_income = self.budget_model.get_total_income(self.current_month)
-
-        total_budgeted = 0
-        for row in range(self.budget_table.rowCount()):
-            try:
-                budgeted = float(self.budget_table.item(row, 1).text().replace('$', ''))
-                total_budgeted += budgeted
-            except (ValueError, AttributeError) as e:
-                logger.warning(f"Error processing row {row} in update_budget_remaining: {str(e)}")
-
-        remaining = total_income - total_budgeted
+        remaining = self.session.unallocated
 
         self.total_remaining.setText(f"Total Remaining: ${remaining:.2f}")
 
-        if remaining < 0:
+        if remaining.minor < 0:
             self.total_remaining.setStyleSheet("color: red;")
         else:
             self.total_remaining.setStyleSheet("color: green;")
 
-        logger.info(f"Updated budget remaining: ${remaining:.2f}")
+        logger.debug(f"Updated budget remaining: ${remaining:.2f}")
 
     @pyqtSlot()
     def load_budget_categories(self):
@@ -1,5 +1,5 @@
-from PyQt6.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QLabel, QLineEdit,
-                             QPushButton, QTableWidget, QTableWidgetItem, QDialogButtonBox, QComboBox)
+from PyQt6.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QLabel, QLineEdit, QWidget, QInputDialog,
+                             QMessageBox, QPushButton, QTableWidget, QTableWidgetItem, QDialogButtonBox, QComboBox)
 from PyQt6.QtCore import pyqtSignal
 
 class ConfigDialog(QDialog):
@@ -55,12 +55,33 @@ class ConfigDialog(QDialog):
         self.category_list.setRowCount(len(categories))
         for row, category in enumerate(categories):
             self.category_list.setItem(row, 0, QTableWidgetItem(category[1]))
+
+            button_widget = QWidget()
+            button_layout = QHBoxLayout(button_widget)
+            button_layout.setContentsMargins(0, 0, 0, 0)
+            rename_button = QPushButton("Rename")
+            rename_button.clicked.connect(lambda _, cid=category[0], name=category[1]: self.rename_category(cid, name))
+            button_layout.addWidget(rename_button)
             delete_button = QPushButton("Delete")
             delete_button.clicked.connect(lambda _, cid=category[0]: self.delete_category(cid))
-            self.category_list.setCellWidget(row, 1, delete_button)
+            button_layout.addWidget(delete_button)
+            self.category_list.setCellWidget(row, 1, button_widget)
+
+    def rename_category(self, category_id, name):
+        new_name, ok = QInputDialog.getText(self, "Rename Category", "New name:", text=name)
+        new_name = new_name.strip()
+        if ok and new_name and new_name != name:
+            try:
+                self.category_model.rename_category(category_id, new_name)
+            except Exception as e:
+                QMessageBox.warning(self, "Rename Failed", f"Could not rename {name}: {str(e)}")
+            self.load_categories()
 
     def delete_category(self, category_id):
-        self.category_model.delete_category(category_id)
+        try:
+            self.category_model.delete_category(category_id)
+        except ValueError as e:
+            QMessageBox.warning(self, "Category In Use", str(e))
         self.load_categories()
 
     def update_currency(self):
@@ -0,0 +1,99 @@
+import itertools
+import logging
+import queue
+import threading
+
+from PyQt6.QtCore import QObject, pyqtSignal
+
+from database import close_thread_connection
+
+logger = logging.getLogger(__name__)
+
+
+class DbJob:
+    """Handle for a unit of database work submitted to a DatabaseExecutor."""
+
+    def __init__(self, job_id, fn, args, kwargs, key, on_result, on_error):
+        self.id = job_id
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.key = key
+        self.on_result = on_result
+        self.on_error = on_error
+        self.cancelled = False
+
+    def cancel(self):
+        # A job that has not started yet is skipped by the worker; one that is
+        # already running finishes, but its result is never delivered.
+        self.cancelled = True
+
+
+class DatabaseExecutor(QObject):
+    """Runs model calls on a dedicated worker thread that owns its own SQLite connection.
+
+    Results come back on the GUI thread through a queued Qt signal, so
+    callbacks may touch widgets directly. Jobs submitted with a `key` supersede
+    any earlier job with the same key: the earlier one is cancelled, which
+    keeps a burst of refresh requests from rendering stale data.
+    """
+    job_finished = pyqtSignal(object, object, object)  # job, result, error
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._queue = queue.Queue()
+        self._latest = {}
+        self._ids = itertools.count(1)
+        self.job_finished.connect(self._dispatch)
+        self._thread = threading.Thread(target=self._run, name='DatabaseExecutor', daemon=True)
+        self._thread.start()
+
+    def submit(self, fn, *args, key=None, on_result=None, on_error=None, **kwargs):
+        job = DbJob(next(self._ids), fn, args, kwargs, key, on_result, on_error)
+        if key is not None:
+            self.cancel(key)
+            self._latest[key] = job
+        self._queue.put(job)
+        return job
+
+    def cancel(self, key):
+        job = self._latest.pop(key, None)
+        if job is not None:
+            job.cancel()
+
+    def cancel_all(self):
+        for key in list(self._latest):
+            self.cancel(key)
+
+    def shutdown(self, wait=True):
+        self.cancel_all()
+        self._queue.put(None)
+        if wait:
+            self._thread.join()
+
+    def _run(self):
+        while True:
+            job = self._queue.get()
+            if job is None:
+                break
+            if job.cancelled:
+                continue
+            result, error = None, None
+            try:
+                result = job.fn(*job.args, **job.kwargs)
+            except Exception as e:
+                logger.exception(f"Database job {job.id} ({getattr(job.fn, '__qualname__', job.fn)}) failed")
+                error = e
+            self.job_finished.emit(job, result, error)
+        close_thread_connection()
+
+    def _dispatch(self, job, result, error):
+        if job.key is not None and self._latest.get(job.key) is job:
+            del self._latest[job.key]
+        if job.cancelled:
+            return
+        if error is not None:
+            if job.on_error:
+                job.on_error(error)
+        elif job.on_result:
+            job.on_result(result)
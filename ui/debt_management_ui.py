@@ -4,11 +4,15 @@ from PyQt6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel, QLineEdi
 from PyQt6.QtGui import QColor
 from PyQt6.QtCore import Qt
 
+from ui.db_executor import DatabaseExecutor
+
 class DebtManagementUI(QWidget):
-    def __init__(self, debt_model, currency_manager):
+    def __init__(self, debt_model, currency_manager, db_executor=None):
         super().__init__()
         self.model = debt_model
         self.currency_manager = currency_manager
+        self.db_executor = db_executor or DatabaseExecutor(self)
+        self.debt_items = {}  # debt id -> name cell, whose row() locates the debt in the table
         self.init_ui()
 
     def init_ui(self):
@@ -52,38 +56,53 @@ class DebtManagementUI(QWidget):
             QMessageBox.warning(self, "Invalid Input", "Please enter valid numbers for balance and APR.")
             return
 
-        self.model.add_debt(name, balance, apr)
-        self.update_debts_display()
+        debt = self.model.add_debt(name, balance, apr)
+        row = self.debts_table.rowCount()
+        self.debts_table.insertRow(row)
+        self.set_debt_row(row, debt)
         self.clear_inputs()
 
     def update_debts_display(self):
-        debts = self.model.get_all_debts()
+        self.db_executor.submit(self.fetch_debts, key='debts', on_result=self.display_debts)
+
+    def fetch_debts(self):
+        # Runs on the database thread
+        return [(debt, self.model.calculate_repayment_progress(debt[0])) for debt in self.model.get_all_debts()]
+
+    def display_debts(self, debts):
+        self.debt_items = {}
         self.debts_table.setRowCount(len(debts))
+        for row, (debt, progress) in enumerate(debts):
+            self.set_debt_row(row, debt, progress)
+
+    def set_debt_row(self, row, debt, progress=None):
+        if progress is None:
+            progress = self.model.repayment_progress(debt[2], debt[3])
         currency_symbol = self.currency_manager.get_default_currency().symbol
-        for row, debt in enumerate(debts):
-            self.debts_table.setItem(row, 0, QTableWidgetItem(debt[1]))  # Name
-            self.debts_table.setItem(row, 1, QTableWidgetItem(f"{currency_symbol}{debt[2]:,.2f}"))  # Original Balance
-            self.debts_table.setItem(row, 2, QTableWidgetItem(f"{currency_symbol}{debt[3]:,.2f}"))  # Current Balance
-            self.debts_table.setItem(row, 3, QTableWidgetItem(f"{debt[4]:.2f}%"))  # APR
+        name_item = QTableWidgetItem(debt[1])
+        self.debt_items[debt[0]] = name_item
+        self.debts_table.setItem(row, 0, name_item)  # Name
+        self.debts_table.setItem(row, 1, QTableWidgetItem(f"{currency_symbol}{debt[2]:,.2f}"))  # Original Balance
+        self.debts_table.setItem(row, 2, QTableWidgetItem(f"{currency_symbol}{debt[3]:,.2f}"))  # Current Balance
+        self.debts_table.setItem(row, 3, QTableWidgetItem(f"{debt[4]:.2f}%"))  # APR
 
-            progress = self.model.calculate_repayment_progress(debt[0])
-            progress_bar = QProgressBar()
-            progress_bar.setValue(int(progress))
-            self.debts_table.setCellWidget(row, 4, progress_bar)
+        progress_bar = QProgressBar()
+        progress_bar.setValue(int(progress))
+        self.debts_table.setCellWidget(row, 4, progress_bar)
 
-            delete_button = QPushButton("Delete")
-            delete_button.clicked.connect(lambda _, d_id=debt[0]: self.delete_debt(d_id))
-            self.debts_table.setCellWidget(row, 5, delete_button)
+        delete_button = QPushButton("Delete")
+        delete_button.clicked.connect(lambda _, d_id=debt[0]: self.delete_debt(d_id))
+        self.debts_table.setCellWidget(row, 5, delete_button)
 
-            payment_button = QPushButton("Make Payment")
-            payment_button.clicked.connect(lambda _, d_id=debt[0]: self.make_payment(d_id))
-            self.debts_table.setCellWidget(row, 6, payment_button)
+        payment_button = QPushButton("Make Payment")
+        payment_button.clicked.connect(lambda _, d_id=debt[0]: self.make_payment(d_id))
+        self.debts_table.setCellWidget(row, 6, payment_button)
 
-            details_button = QPushButton("Details")
-            details_button.clicked.connect(lambda _, d_id=debt[0]: self.view_debt_details(d_id))
-            self.debts_table.setCellWidget(row, 7, details_button)
+        details_button = QPushButton("Details")
+        details_button.clicked.connect(lambda _, d_id=debt[0]: self.view_debt_details(d_id))
+        self.debts_table.setCellWidget(row, 7, details_button)
 
-            self.apply_row_color(row, progress)
+        self.apply_row_color(row, progress)
 
     def apply_row_color(self, row, progress):
         if progress >= 100:
@@ -108,14 +127,17 @@ class DebtManagementUI(QWidget):
                                      QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No)
         if reply == QMessageBox.StandardButton.Yes:
             self.model.delete_debt(debt_id)
-            self.update_debts_display()
+            name_item = self.debt_items.pop(debt_id, None)
+            if name_item is not None:
+                self.debts_table.removeRow(name_item.row())
 
     def make_payment(self, debt_id):
         amount, ok = QInputDialog.getDouble(self, "Make Payment", "Enter payment amount:",
                                             0, 0, 1000000, 2)
         if ok and amount > 0:
-            self.model.update_debt_balance(debt_id, amount)
-            self.update_debts_display()
+            debt = self.model.update_debt_balance(debt_id, amount)
+            if debt is not None and debt_id in self.debt_items:
+                self.set_debt_row(self.debt_items[debt_id].row(), debt)
 
     def view_debt_details(self, debt_id):
         # Implement a method to show detailed information about the debt
@@ -0,0 +1,68 @@
+from PyQt6.QtWidgets import (QDialog, QFormLayout, QComboBox, QCheckBox, QDateEdit, QDialogButtonBox,
+                             QListWidget, QListWidgetItem, QAbstractItemView)
+from PyQt6.QtCore import QDate
+
+from exporters.writers import pyarrow
+
+EXPORT_FORMATS = (
+    ("CSV", 'csv', "CSV files (*.csv)"),
+    ("JSON Lines", 'jsonl', "JSON Lines files (*.jsonl)"),
+    ("Parquet", 'parquet', "Parquet files (*.parquet)"),
+)
+
+
+class ExportDialog(QDialog):
+    def __init__(self, category_names, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Export Transactions")
+        layout = QFormLayout(self)
+
+        self.content_combo = QComboBox(self)
+        self.content_combo.addItem("Transactions", 'transactions')
+        self.content_combo.addItem("Monthly totals by category", 'monthly_totals')
+        layout.addRow("Export:", self.content_combo)
+
+        self.format_combo = QComboBox(self)
+        for label, fmt, _ in EXPORT_FORMATS:
+            if fmt == 'parquet' and pyarrow is None:
+                continue
+            self.format_combo.addItem(label, fmt)
+        layout.addRow("Format:", self.format_combo)
+
+        today = QDate.currentDate()
+        self.start_check = QCheckBox("From", self)
+        self.start_date = QDateEdit(today.addMonths(-12), self)
+        self.start_date.setCalendarPopup(True)
+        self.start_date.setEnabled(False)
+        self.start_check.toggled.connect(self.start_date.setEnabled)
+        layout.addRow(self.start_check, self.start_date)
+
+        self.end_check = QCheckBox("To", self)
+        self.end_date = QDateEdit(today, self)
+        self.end_date.setCalendarPopup(True)
+        self.end_date.setEnabled(False)
+        self.end_check.toggled.connect(self.end_date.setEnabled)
+        layout.addRow(self.end_check, self.end_date)
+
+        # Nothing selected means every category
+        self.category_list = QListWidget(self)
+        self.category_list.setSelectionMode(QAbstractItemView.SelectionMode.MultiSelection)
+        for name in category_names:
+            QListWidgetItem(name, self.category_list)
+        layout.addRow("Categories:", self.category_list)
+
+        button_box = QDialogButtonBox(QDialogButtonBox.StandardButton.Ok | QDialogButtonBox.StandardButton.Cancel)
+        button_box.accepted.connect(self.accept)
+        button_box.rejected.connect(self.reject)
+        layout.addRow(button_box)
+
+    def get_options(self):
+        fmt = self.format_combo.currentData()
+        return {
+            'content': self.content_combo.currentData(),
+            'fmt': fmt,
+            'file_filter': next(file_filter for _, key, file_filter in EXPORT_FORMATS if key == fmt),
+            'start_date': self.start_date.date().toPyDate() if self.start_check.isChecked() else None,
+            'end_date': self.end_date.date().toPyDate() if self.end_check.isChecked() else None,
+            'categories': [item.text() for item in self.category_list.selectedItems()] or None,
+        }
@@ -8,6 +8,8 @@ from PyQt6.QtCore import Qt
 import numpy as np
 from matplotlib import dates as mdates
 
+from ui.db_executor import DatabaseExecutor
+
 
 class ChartWidget(QWidget):
     def __init__(self, model):
@@ -18,13 +20,19 @@ class ChartWidget(QWidget):
         self.canvas = FigureCanvas(self.figure)
         layout.addWidget(self.canvas)
 
-    def update_chart(self):
+    def load_data(self):
+        # Called on the database thread; must not touch any widgets
+        raise NotImplementedError("Subclasses must implement load_data method")
+
+    def update_chart(self, data):
         raise NotImplementedError("Subclasses must implement update_chart method")
 
 
 class SpendingBreakdownChart(ChartWidget):
-    def update_chart(self):
-        spending_data = self.model.get_spending_by_category()
+    def load_data(self):
+        return self.model.get_spending_by_category()
+
+    def update_chart(self, spending_data):
         self.ax.clear()
         categories = list(spending_data.keys())
         amounts = list(spending_data.values())
@@ -35,8 +43,10 @@ class SpendingBreakdownChart(ChartWidget):
 
 
 class IncomeVsExpensesChart(ChartWidget):
-    def update_chart(self):
-        data = self.model.get_income_vs_expenses()
+    def load_data(self):
+        return self.model.get_income_vs_expenses()
+
+    def update_chart(self, data):
         self.ax.clear()
         months = list(data.keys())
         income = [d['income'] for d in data.values()]
@@ -54,8 +64,10 @@ class IncomeVsExpensesChart(ChartWidget):
 
 
 class NetWorthTrendChart(ChartWidget):
-    def update_chart(self):
-        data = self.model.get_net_worth_trend()
+    def load_data(self):
+        return self.model.get_net_worth_trend()
+
+    def update_chart(self, data):
         self.ax.clear()
 
         dates = [datetime.strptime(date, '%Y-%m') for date in data.keys()]
@@ -82,8 +94,10 @@ class NetWorthTrendChart(ChartWidget):
 
 
 class DebtRepaymentProgressChart(ChartWidget):
-    def update_chart(self):
-        data = self.model.get_debt_repayment_progress()
+    def load_data(self):
+        return self.model.get_debt_repayment_progress()
+
+    def update_chart(self, data):
         self.ax.clear()
         debts = list(data.keys())
         progress = list(data.values())
@@ -100,11 +114,12 @@ class DebtRepaymentProgressChart(ChartWidget):
 
 
 class FinancialDashboard(QWidget):
-    def __init__(self, transaction_model, debt_model, investment_model):
+    def __init__(self, transaction_model, debt_model, investment_model, db_executor=None):
         super().__init__()
         self.transaction_model = transaction_model
         self.debt_model = debt_model
         self.investment_model = investment_model
+        self.db_executor = db_executor or DatabaseExecutor(self)
         self.init_ui()
 
     def init_ui(self):
@@ -147,4 +162,6 @@ class FinancialDashboard(QWidget):
     def refresh_charts(self):
         current_chart = self.chart_stack.currentWidget()
         if current_chart:
-            current_chart.update_chart()
\ No newline at end of file
+            # Switching charts quickly supersedes the previous chart's pending load
+            self.db_executor.submit(current_chart.load_data, key='dashboard',
+                                    on_result=current_chart.update_chart)
\ No newline at end of file
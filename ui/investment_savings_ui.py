@@ -7,13 +7,18 @@ from PyQt6.QtCore import QRegularExpression
 from datetime import datetime
 from models.consolidated_investment_savings_model import UnifiedInvestmentSavingsModel, GoalType, GoalCategory, \
     RiskLevel
+from ui.db_executor import DatabaseExecutor
 
 
 class InvestmentSavingsUI(QWidget):
-    def __init__(self, investment_savings_model, currency_manager):
+    def __init__(self, investment_savings_model, currency_manager, db_executor=None):
         super().__init__()
         self.model = investment_savings_model
         self.currency_manager = currency_manager
+        self.db_executor = db_executor or DatabaseExecutor(self)
+        # goal id -> (name cell, goal); the cell's row() locates the goal in the table
+        self.goal_rows = {}
+        self.totals = {GoalType.SAVINGS: 0, GoalType.INVESTMENT: 0}
         self.init_ui()
 
     def init_ui(self):
@@ -88,7 +93,7 @@ class InvestmentSavingsUI(QWidget):
         risk_level = RiskLevel(self.risk_level_input.currentText())
 
         try:
-            self.model.add_goal(
+            goal = self.model.add_goal(
                 name=name,
                 target_amount=target_amount,
                 target_date=target_date,
@@ -96,43 +101,76 @@ class InvestmentSavingsUI(QWidget):
                 category=category,
                 risk_level=risk_level
             )
-            self.update_goals_display()
+            row = self.goals_table.rowCount()
+            self.goals_table.insertRow(row)
+            self.set_goal_row(row, goal)
+            self.totals[goal['goal_type']] += goal['current_amount']
+            self.update_totals_display()
             self.clear_inputs()
             QMessageBox.information(self, "Success", "Goal added successfully.")
         except Exception as e:
             QMessageBox.critical(self, "Error", f"An error occurred while adding the goal: {str(e)}")
 
     def update_goals_display(self):
-        goals = self.model.get_all_goals()
-        self.goals_table.setRowCount(len(goals))
-        currency_symbol = self.currency_manager.get_default_currency().symbol
-        for row, goal in enumerate(goals):
-            self.goals_table.setItem(row, 0, QTableWidgetItem(goal['name']))
-            self.goals_table.setItem(row, 1, QTableWidgetItem(f"{currency_symbol}{goal['target_amount']:,.2f}"))
-            self.goals_table.setItem(row, 2, QTableWidgetItem(f"{currency_symbol}{goal['current_amount']:,.2f}"))
+        self.db_executor.submit(self.fetch_goals, key='goals', on_result=self.display_goals)
 
-            progress = self.model.calculate_progress(goal['id'])
-            progress_bar = QProgressBar()
-            progress_bar.setValue(int(progress))
-            self.goals_table.setCellWidget(row, 3, progress_bar)
+    def fetch_goals(self):
+        # Runs on the database thread
+        goals = [(goal, self.model.calculate_progress(goal['id'])) for goal in self.model.get_all_goals()]
+        return goals, self.model.calculate_total_savings(), self.model.calculate_total_investments()
 
-            self.goals_table.setItem(row, 4, QTableWidgetItem(goal['target_date'].strftime("%Y-%m-%d")))
-            self.goals_table.setItem(row, 5, QTableWidgetItem(goal['goal_type'].value))
-            self.goals_table.setItem(row, 6, QTableWidgetItem(goal['category'].value))
-            self.goals_table.setItem(row, 7, QTableWidgetItem(goal['risk_level'].value))
-
-            delete_button = QPushButton("Delete")
-            delete_button.clicked.connect(lambda _, g=goal: self.delete_goal(g))
-            self.goals_table.setCellWidget(row, 8, delete_button)
+    def display_goals(self, data):
+        goals, total_savings, total_investments = data
+        self.goal_rows = {}
+        self.goals_table.setRowCount(len(goals))
+        for row, (goal, progress) in enumerate(goals):
+            self.set_goal_row(row, goal, progress)
 
-            # Apply color to the row based on progress
-            self.apply_row_color(row, progress)
+        self.totals = {GoalType.SAVINGS: total_savings, GoalType.INVESTMENT: total_investments}
+        self.update_totals_display()
 
-        total_savings = self.model.calculate_total_savings()
-        total_investments = self.model.calculate_total_investments()
-        self.total_savings_label.setText(f"Total Savings: {currency_symbol}{total_savings:,.2f}")
-        self.total_investments_label.setText(f"Total Investments: {currency_symbol}{total_investments:,.2f}")
+    def set_goal_row(self, row, goal, progress=None):
+        if progress is None:
+            progress = self.model.goal_progress(goal['current_amount'], goal['target_amount'])
+        currency_symbol = self.currency_manager.get_default_currency().symbol
+        name_item = QTableWidgetItem(goal['name'])
+        self.goal_rows[goal['id']] = (name_item, goal)
+        self.goals_table.setItem(row, 0, name_item)
+        self.goals_table.setItem(row, 1, QTableWidgetItem(f"{currency_symbol}{goal['target_amount']:,.2f}"))
+        self.goals_table.setItem(row, 2, QTableWidgetItem(f"{currency_symbol}{goal['current_amount']:,.2f}"))
+
+        progress_bar = QProgressBar()
+        progress_bar.setValue(int(progress))
+        self.goals_table.setCellWidget(row, 3, progress_bar)
+
+        self.goals_table.setItem(row, 4, QTableWidgetItem(goal['target_date'].strftime("%Y-%m-%d")))
+        self.goals_table.setItem(row, 5, QTableWidgetItem(goal['goal_type'].value))
+        self.goals_table.setItem(row, 6, QTableWidgetItem(goal['category'].value))
+        self.goals_table.setItem(row, 7, QTableWidgetItem(goal['risk_level'].value))
+
+        delete_button = QPushButton("Delete")
+        delete_button.clicked.connect(lambda _, g=goal: self.delete_goal(g))
+        self.goals_table.setCellWidget(row, 8, delete_button)
+
+        # Apply color to the row based on progress
+        self.apply_row_color(row, progress)
+
+    def refresh_goal(self, goal_id):
+        """Re-read one goal, e.g. after a transaction changed its progress, and update its row."""
+        goal = self.model.get_goal(goal_id)
+        if goal is None or goal_id not in self.goal_rows:
+            return
+        name_item, old_goal = self.goal_rows[goal_id]
+        self.totals[old_goal['goal_type']] -= old_goal['current_amount']
+        self.totals[goal['goal_type']] += goal['current_amount']
+        self.set_goal_row(name_item.row(), goal)
+        self.update_totals_display()
 
+    def update_totals_display(self):
+        currency_symbol = self.currency_manager.get_default_currency().symbol
+        self.total_savings_label.setText(f"Total Savings: {currency_symbol}{self.totals[GoalType.SAVINGS]:,.2f}")
+        self.total_investments_label.setText(
+            f"Total Investments: {currency_symbol}{self.totals[GoalType.INVESTMENT]:,.2f}")
 
     def apply_row_color(self, row, progress):
         if progress >= 100:
@@ -157,7 +195,11 @@ class InvestmentSavingsUI(QWidget):
                                      QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No)
         if reply == QMessageBox.StandardButton.Yes:
             self.model.delete_goal(goal['id'])
-            self.update_goals_display()
+            name_item, goal = self.goal_rows.pop(goal['id'], (None, goal))
+            if name_item is not None:
+                self.goals_table.removeRow(name_item.row())
+                self.totals[goal['goal_type']] -= goal['current_amount']
+                self.update_totals_display()
 
     def clear_inputs(self):
         self.name_input.clear()
@@ -2,15 +2,23 @@ import logging
 
 from PyQt6.QtGui import QColor
 from PyQt6.QtWidgets import (QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, QLabel,
-                             QLineEdit, QPushButton, QComboBox, QTableWidget, QTabWidget,
-                             QInputDialog, QTableWidgetItem, QHeaderView, QMessageBox, QTextEdit)
-from PyQt6.QtCore import Qt, pyqtSlot
+                             QLineEdit, QPushButton, QComboBox, QTableView, QTabWidget,
+                             QInputDialog, QHeaderView, QMessageBox, QTextEdit,
+                             QFileDialog, QStyle, QSystemTrayIcon)
+from PyQt6.QtCore import Qt, pyqtSignal, pyqtSlot
 from datetime import datetime
 
+from exporters import export_monthly_totals, export_transactions
+from importers import StatementImporter
+from models.budget_alerts import budget_alerts
 from models.budget_models import BudgetModel
 from ui.config_dialog import ConfigDialog
-from models.transaction import TransactionModel
+from ui.db_executor import DatabaseExecutor
+from ui.export_dialog import ExportDialog
+from ui.transaction_table import DeleteButtonDelegate, TransactionTableModel
+from models.transaction import TransactionModel, normalize_date
 from models.debt import DebtModel
+from models.money import Money
 from models.category import CategoryModel
 from ui.debt_management_ui import DebtManagementUI
 from ui.debt_payoff_planner import DebtPayoffPlanner, DebtRepaymentUI
@@ -27,6 +35,9 @@ from currency import CurrencyManager
 
 
 class MainWindow(QMainWindow):
+    import_progress = pyqtSignal(int, int, int)  # rows done, files done, total files
+    budget_alerts_raised = pyqtSignal(object)  # list of BudgetAlerts alerts
+
     def __init__(self):
         super().__init__()
         self.setWindowTitle("Expense, Income, and Debt Tracker")
@@ -38,6 +49,13 @@ class MainWindow(QMainWindow):
         self.savings_goal_model = SavingsGoalModel()
         self.currency_manager = CurrencyManager()
         self.budget_model = BudgetModel()
+        self.db_executor = DatabaseExecutor(self)
+        self.import_progress.connect(self.show_import_progress)
+        # Alerts are raised on whichever thread wrote; the signal hops them to the GUI thread
+        self.tray_icon = None
+        self.budget_alerts_raised.connect(self.show_budget_alerts)
+        self.alert_listener = self.budget_alerts_raised.emit
+        budget_alerts.add_listener(self.alert_listener)
         self.init_ui()
 
     def init_ui(self):
@@ -53,7 +71,7 @@ class MainWindow(QMainWindow):
         self.tab_widget.addTab(transactions_tab, "Transactions")
 
         # Debt Management Tab
-        self.debt_management_ui = DebtManagementUI(self.debt_model, self.currency_manager)
+        self.debt_management_ui = DebtManagementUI(self.debt_model, self.currency_manager, self.db_executor)
         self.tab_widget.addTab(self.debt_management_ui, "Debt Management")
 
         # Debt Payoff Planner Tab
@@ -61,11 +79,13 @@ class MainWindow(QMainWindow):
         self.tab_widget.addTab(self.debt_planner, "Debt Payoff Planner")
 
         # Budget Planning Tab
-        self.budget_planner = BudgetPlanner(self.category_model, self.budget_model, self.transaction_model)
+        self.budget_planner = BudgetPlanner(self.category_model, self.budget_model, self.transaction_model,
+                                            self.db_executor)
         self.tab_widget.addTab(self.budget_planner, "Budget Planner")
 
         # Investment & Savings Tab
-        self.investment_savings_ui = InvestmentSavingsUI(self.investment_savings_model, self.currency_manager)
+        self.investment_savings_ui = InvestmentSavingsUI(self.investment_savings_model, self.currency_manager,
+                                                         self.db_executor)
         self.tab_widget.addTab(self.investment_savings_ui, "Investments & Savings")
 
         # Smart Savings Advisor Tab
@@ -73,7 +93,8 @@ class MainWindow(QMainWindow):
             self.transaction_model,
             self.debt_model,
             self.savings_goal_model,
-            self.investment_savings_model  # Pass the investment_model here
+            self.investment_savings_model,  # Pass the investment_model here
+            self.db_executor
         )
         self.tab_widget.addTab(self.smart_savings_advisor, "Smart Savings Advisor")
 
@@ -81,7 +102,8 @@ class MainWindow(QMainWindow):
         self.financial_dashboard = FinancialDashboard(
             self.transaction_model,
             self.debt_model,
-            self.investment_savings_model
+            self.investment_savings_model,
+            self.db_executor
         )
         self.tab_widget.addTab(self.financial_dashboard, "Financial Dashboard")
 
@@ -128,6 +150,14 @@ class MainWindow(QMainWindow):
         add_transaction_layout.addWidget(self.transaction_type_input)
         add_transaction_layout.addWidget(add_button)
 
+        import_button = QPushButton("Import Statements...")
+        import_button.clicked.connect(self.import_statements)
+        add_transaction_layout.addWidget(import_button)
+
+        export_button = QPushButton("Export...")
+        export_button.clicked.connect(self.export_transactions)
+        add_transaction_layout.addWidget(export_button)
+
         transactions_layout.addLayout(add_transaction_layout)
         transactions_layout.addWidget(QLabel("Comment:"))
         transactions_layout.addWidget(self.comment_input)
@@ -140,15 +170,117 @@ class MainWindow(QMainWindow):
         add_transaction_layout.addWidget(self.goal_selection)
 
 
+        transactions_layout.addLayout(self.create_filter_bar())
+
         # Transaction Table
-        self.transaction_table = QTableWidget()
-        self.transaction_table.setColumnCount(6)
-        self.transaction_table.setHorizontalHeaderLabels(["Date", "Category", "Amount", "Type", "Comment", "Action"])
+        self.transaction_table_model = TransactionTableModel(self.transaction_model, self.currency_manager,
+                                                             self.db_executor, parent=self)
+        self.transaction_table_model.load_failed.connect(self.show_load_error)
+        self.transaction_table_model.page_loaded.connect(self.show_page_timing)
+        self.transaction_table = QTableView()
+        self.transaction_table.setModel(self.transaction_table_model)
+        # Header clicks re-query with ORDER BY; start newest first
+        self.transaction_table.horizontalHeader().setSortIndicator(0, Qt.SortOrder.DescendingOrder)
+        self.transaction_table.setSortingEnabled(True)
         self.transaction_table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
+        # Fixed row heights let the view skip measuring rows it is not painting
+        self.transaction_table.verticalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Fixed)
+        self.delete_delegate = DeleteButtonDelegate(self.transaction_table)
+        self.delete_delegate.delete_requested.connect(
+            lambda row: self.delete_transaction(self.transaction_table_model.transaction_id(row)))
+        self.transaction_table.setItemDelegateForColumn(TransactionTableModel.ACTION_COLUMN, self.delete_delegate)
         transactions_layout.addWidget(self.transaction_table)
 
         return transactions_tab
 
+    def create_filter_bar(self):
+        filter_layout = QHBoxLayout()
+        self.filter_start_input = QLineEdit()
+        self.filter_start_input.setPlaceholderText("From (YYYY-MM-DD)")
+        self.filter_end_input = QLineEdit()
+        self.filter_end_input.setPlaceholderText("To (YYYY-MM-DD)")
+        self.filter_category_input = QComboBox()
+        self.filter_type_input = QComboBox()
+        self.filter_type_input.addItem("All Types", None)
+        for transaction_type in ["Expense", "Income", "Savings", "Investment"]:
+            self.filter_type_input.addItem(transaction_type, transaction_type)
+        self.filter_currency_input = QComboBox()
+        self.filter_currency_input.addItem("All Currencies", None)
+        for currency in self.currency_manager.get_all_currencies():
+            self.filter_currency_input.addItem(str(currency), currency.code)
+        self.filter_min_amount_input = QLineEdit()
+        self.filter_min_amount_input.setPlaceholderText("Min amount")
+        self.filter_max_amount_input = QLineEdit()
+        self.filter_max_amount_input.setPlaceholderText("Max amount")
+        self.search_input = QLineEdit()
+        self.search_input.setPlaceholderText("Search comments")
+        apply_button = QPushButton("Filter")
+        apply_button.clicked.connect(self.apply_filters)
+        clear_button = QPushButton("Clear")
+        clear_button.clicked.connect(self.clear_filters)
+
+        for line_edit in (self.filter_start_input, self.filter_end_input, self.filter_min_amount_input,
+                          self.filter_max_amount_input, self.search_input):
+            line_edit.returnPressed.connect(self.apply_filters)
+
+        filter_layout.addWidget(QLabel("Filter:"))
+        for widget in (self.filter_start_input, self.filter_end_input, self.filter_category_input,
+                       self.filter_type_input, self.filter_currency_input, self.filter_min_amount_input,
+                       self.filter_max_amount_input, self.search_input, apply_button, clear_button):
+            filter_layout.addWidget(widget)
+        return filter_layout
+
+    @pyqtSlot()
+    def apply_filters(self):
+        filters = {
+            'category': self.filter_category_input.currentData(),
+            'type': self.filter_type_input.currentData(),
+            'currency': self.filter_currency_input.currentData(),
+            'search': self.search_input.text().strip(),
+        }
+        try:
+            for key, line_edit in (('start_date', self.filter_start_input), ('end_date', self.filter_end_input)):
+                text = line_edit.text().strip()
+                filters[key] = normalize_date(text) if text else None
+        except ValueError:
+            QMessageBox.warning(self, "Invalid Date", "Please enter filter dates as YYYY-MM-DD.")
+            return
+        try:
+            for key, line_edit in (('min_amount', self.filter_min_amount_input),
+                                   ('max_amount', self.filter_max_amount_input)):
+                text = line_edit.text().strip()
+                filters[key] = Money.from_major(text) if text else None
+        except ValueError:
+            QMessageBox.warning(self, "Invalid Amount", "Please enter a valid number for the amount range.")
+            return
+        self.transaction_table_model.set_filters(filters)
+        self.update_sort_indicator()
+
+    def update_sort_indicator(self):
+        # Search results are in relevance order, which no column header represents
+        model = self.transaction_table_model
+        header = self.transaction_table.horizontalHeader()
+        header.blockSignals(True)
+        if model.ranked:
+            header.setSortIndicator(-1, Qt.SortOrder.DescendingOrder)
+        else:
+            order = Qt.SortOrder.DescendingOrder if model.descending else Qt.SortOrder.AscendingOrder
+            header.setSortIndicator(model.SORT_COLUMNS.index(model.sort_column), order)
+        header.blockSignals(False)
+
+    @pyqtSlot()
+    def clear_filters(self):
+        for line_edit in (self.filter_start_input, self.filter_end_input, self.filter_min_amount_input,
+                          self.filter_max_amount_input, self.search_input):
+            line_edit.clear()
+        for combo in (self.filter_category_input, self.filter_type_input, self.filter_currency_input):
+            combo.setCurrentIndex(0)
+        self.transaction_table_model.set_filters({})
+        self.update_sort_indicator()
+
+    def show_page_timing(self, rows, seconds):
+        self.statusBar().showMessage(f"Loaded {rows:,} transactions in {seconds * 1000:.1f} ms", 5000)
+
     def on_transaction_type_changed(self, transaction_type):
         if transaction_type in ['Savings', 'Investment']:
             self.load_goals_for_selection(transaction_type)
@@ -166,8 +298,10 @@ class MainWindow(QMainWindow):
         dialog = ConfigDialog(self.category_model, self.currency_manager)
         dialog.currency_changed.connect(self.update_currency_display)
         if dialog.exec():
-            self.load_categories()
             self.update_currency_display()
+        # Category edits apply as soon as they are made, even if the dialog is cancelled
+        self.load_categories()
+        self.transaction_table_model.reload()
 
 
     def load_categories(self):
@@ -175,6 +309,13 @@ class MainWindow(QMainWindow):
         self.category_input.clear()
         self.category_input.addItems(categories)
 
+        selected = self.filter_category_input.currentData()
+        self.filter_category_input.clear()
+        self.filter_category_input.addItem("All Categories", None)
+        for category in categories:
+            self.filter_category_input.addItem(category, category)
+        self.filter_category_input.setCurrentIndex(max(self.filter_category_input.findData(selected), 0))
+
     def quick_add_category(self):
         category, ok = QInputDialog.getText(self, "Add Category", "Enter new category name:")
         if ok and category:
@@ -199,47 +340,106 @@ class MainWindow(QMainWindow):
             return
 
         try:
-            amount = float(amount)
+            date = normalize_date(date)
+        except ValueError:
+            QMessageBox.warning(self, "Invalid Date", "Please enter the date as YYYY-MM-DD.")
+            return
+
+        try:
+            amount = Money.from_major(amount)
         except ValueError:
             QMessageBox.warning(self, "Invalid Amount", "Please enter a valid number for the amount.")
             return
 
         try:
-            self.transaction_model.add_transaction(
+            transaction = self.transaction_model.add_transaction(
                 date, category, amount, transaction_type, comment, currency.code, goal_id
             )
-            self.load_transactions()
+            self.transaction_table_model.insert_transaction(transaction)
             self.amount_input.clear()
             self.comment_input.clear()
             if goal_id:
-                self.investment_savings_ui.update_goals_display()
+                self.investment_savings_ui.refresh_goal(goal_id)
             QMessageBox.information(self, "Success", "Transaction added successfully.")
         except Exception as e:
             QMessageBox.critical(self, "Error", f"An error occurred while adding the transaction: {str(e)}")
             logging.exception("Error adding transaction")
 
+    @pyqtSlot()
+    def import_statements(self):
+        paths, _ = QFileDialog.getOpenFileNames(self, "Import Statements", "",
+                                                "Bank statements (*.csv *.ofx *.qfx *.qif);;All files (*)")
+        if not paths:
+            return
+
+        importer = StatementImporter(self.transaction_model, self.category_model.get_category_names(),
+                                     self.currency_manager.get_default_currency().code)
+        self.statusBar().showMessage(f"Importing {len(paths)} statement file(s)...")
+        # The progress callback runs on the database thread; the signal hops it to the GUI thread
+        self.db_executor.submit(importer.import_files, paths, progress_callback=self.import_progress.emit,
+                                on_result=self.finish_import, on_error=self.show_import_error)
+
+    @pyqtSlot(int, int, int)
+    def show_import_progress(self, rows_done, files_done, total_files):
+        self.statusBar().showMessage(f"Importing: {rows_done:,} rows read, {files_done} of {total_files} files done")
+
+    def finish_import(self, summary):
+        self.statusBar().showMessage(
+            f"Imported {summary['imported']:,} transactions in {summary['seconds']:.1f}s", 10000)
+        QMessageBox.information(self, "Import Complete",
+                                f"Imported {summary['imported']:,} transactions from {summary['files']} file(s).\n"
+                                f"Skipped {summary['duplicates']:,} already imported and "
+                                f"{summary['skipped']:,} unreadable lines.")
+        self.load_transactions()
+
+    def show_import_error(self, error):
+        self.statusBar().clearMessage()
+        QMessageBox.critical(self, "Import Failed", f"An error occurred while importing statements: {str(error)}")
+
+    @pyqtSlot(object)
+    def show_budget_alerts(self, alerts):
+        lines = [f"{alert['category']}: ${alert['spent']:.2f} of ${alert['budgeted']:.2f} "
+                 f"budgeted for {alert['month']} ({alert['threshold']:.0%})" for alert in alerts]
+        title = "Budget exceeded" if any(alert['threshold'] >= 1 for alert in alerts) else "Budget alert"
+        self.statusBar().showMessage(f"{title}: {'; '.join(lines)}", 10000)
+        if QSystemTrayIcon.isSystemTrayAvailable():
+            if self.tray_icon is None:
+                self.tray_icon = QSystemTrayIcon(
+                    self.style().standardIcon(QStyle.StandardPixmap.SP_MessageBoxWarning), self)
+                self.tray_icon.show()
+            if len(lines) > 5:
+                lines = lines[:5] + [f"and {len(lines) - 5} more"]
+            self.tray_icon.showMessage(title, '\n'.join(lines), QSystemTrayIcon.MessageIcon.Warning)
+
+    @pyqtSlot()
+    def export_transactions(self):
+        dialog = ExportDialog(self.category_model.get_category_names(), self)
+        if not dialog.exec():
+            return
+        options = dialog.get_options()
+        path, _ = QFileDialog.getSaveFileName(self, "Export Transactions", f"transactions.{options['fmt']}",
+                                              options['file_filter'])
+        if not path:
+            return
+
+        export = export_transactions if options['content'] == 'transactions' else export_monthly_totals
+        self.statusBar().showMessage(f"Exporting to {path}...")
+        self.db_executor.submit(export, self.transaction_model, path, options['fmt'],
+                                options['start_date'], options['end_date'], options['categories'],
+                                on_result=lambda count: self.statusBar().showMessage(
+                                    f"Exported {count:,} rows to {path}", 10000),
+                                on_error=self.show_export_error)
+
+    def show_export_error(self, error):
+        self.statusBar().clearMessage()
+        QMessageBox.critical(self, "Export Failed", f"An error occurred while exporting: {str(error)}")
+
     @pyqtSlot()
     def load_transactions(self):
-        transactions = self.transaction_model.get_all_transactions()
-        self.transaction_table.setColumnCount(7)  # Adjust to 7 columns
-        self.transaction_table.setHorizontalHeaderLabels(
-            ["Date", "Category", "Amount", "Currency", "Type", "Comment", "Action"])
-        self.transaction_table.setRowCount(len(transactions))
-        for row, transaction in enumerate(transactions):
-            self.transaction_table.setItem(row, 0, QTableWidgetItem(transaction[1]))  # Date
-            self.transaction_table.setItem(row, 1, QTableWidgetItem(transaction[2]))  # Category
-            self.transaction_table.setItem(row, 2, QTableWidgetItem(f"{transaction[3]:.2f}"))  # Amount
-            currency = self.currency_manager.get_currency_by_code(transaction[6])  # Assuming currency is the 7th field
-            self.transaction_table.setItem(row, 3, QTableWidgetItem(str(currency)))  # Currency
-            self.transaction_table.setItem(row, 4, QTableWidgetItem(transaction[4]))  # Type
-            self.transaction_table.setItem(row, 5, QTableWidgetItem(transaction[5]))  # Comment
-
-            delete_button = QPushButton("Delete")
-            delete_button.clicked.connect(self.create_delete_transaction_function(transaction[0]))
-            self.transaction_table.setCellWidget(row, 6, delete_button)  # Action
-
-    def create_delete_transaction_function(self, transaction_id):
-        return lambda: self.delete_transaction(transaction_id)
+        self.transaction_table_model.reload()
+
+    def show_load_error(self, error):
+        QMessageBox.critical(self, "Error", f"An error occurred while loading data: {str(error)}")
 
     @pyqtSlot(int)
     def delete_transaction(self, transaction_id):
@@ -247,8 +447,9 @@ class MainWindow(QMainWindow):
                                      "Are you sure you want to delete this transaction?",
                                      QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No)
         if reply == QMessageBox.StandardButton.Yes:
-            self.transaction_model.delete_transaction(transaction_id)
-            self.load_transactions()
+            transaction = self.transaction_model.delete_transaction(transaction_id)
+            if transaction is not None:
+                self.transaction_table_model.remove_transaction(transaction)
 
 
     def update_currency_display(self, currency_code=None):
@@ -273,4 +474,13 @@ class MainWindow(QMainWindow):
 
         # Update Smart Savings Advisor tab (if it has currency-related displays)
         if hasattr(self.smart_savings_advisor, 'update_currency'):
-            self.smart_savings_advisor.update_currency()
\ No newline at end of file
+            self.smart_savings_advisor.update_currency()
+
+    def closeEvent(self, event):
+        budget_alerts.remove_listener(self.alert_listener)
+        try:
+            self.budget_planner.save_session()
+        except Exception:
+            logging.exception("Error saving budget changes on exit")
+        self.db_executor.shutdown()
+        super().closeEvent(event)
@@ -1,13 +1,15 @@
 import logging
 from PyQt6.QtWidgets import QWidget, QVBoxLayout, QTextEdit, QPushButton, QMessageBox
 from models.smart_savings_advisor import EnhancedSmartSavingsAdvisor
+from ui.db_executor import DatabaseExecutor
 
 logger = logging.getLogger(__name__)
 
 
 class SmartSavingsAdvisorUI(QWidget):
-    def __init__(self, transaction_model, debt_model, savings_model, investment_model):
+    def __init__(self, transaction_model, debt_model, savings_model, investment_model, db_executor=None):
         super().__init__()
+        self.db_executor = db_executor or DatabaseExecutor(self)
         self.transaction_model = transaction_model
         self.debt_model = debt_model
         self.savings_goal_model = savings_model
@@ -34,13 +36,15 @@ class SmartSavingsAdvisorUI(QWidget):
         layout.addWidget(refresh_button)
 
     def update_advice(self):
-        try:
-            logger.info("Starting to generate comprehensive advice")
-            advice = self.advisor.generate_comprehensive_advice()
-            logger.info("Comprehensive advice generated successfully")
-            self.advice_text.setPlainText("\n\n".join(advice))
-        except Exception as e:
-            logger.exception("An error occurred while generating comprehensive advice")
-            QMessageBox.critical(self, "Error", f"An error occurred: {str(e)}")
-
-        logger.info("Comprehensive advice update complete")
\ No newline at end of file
+        logger.info("Starting to generate comprehensive advice")
+        self.db_executor.submit(self.advisor.generate_comprehensive_advice, key='advice',
+                                on_result=self.display_advice, on_error=self.show_advice_error)
+
+    def display_advice(self, advice):
+        logger.info("Comprehensive advice generated successfully")
+        self.advice_text.setPlainText("\n\n".join(advice))
+        logger.info("Comprehensive advice update complete")
+
+    def show_advice_error(self, error):
+        logger.error(f"An error occurred while generating comprehensive advice: {error}")
+        QMessageBox.critical(self, "Error", f"An error occurred: {str(error)}")
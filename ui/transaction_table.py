@@ -0,0 +1,234 @@
+import time
+
+from PyQt6.QtWidgets import QApplication, QStyle, QStyledItemDelegate, QStyleOptionButton
+from PyQt6.QtCore import Qt, QAbstractTableModel, QEvent, QModelIndex, pyqtSignal
+
+from models.transaction import search_tokens, transaction_matches, transaction_sort_key
+
+
+class TransactionTableModel(QAbstractTableModel):
+    """Transactions for a QTableView, loaded a page at a time as the view scrolls.
+
+    Pages come from TransactionModel.get_transactions_page on the database
+    thread. Only rows the user has scrolled past are held, and the view only
+    asks for the cells it paints, so no per-row widgets are created.
+    """
+    HEADERS = ["Date", "Category", "Amount", "Currency", "Type", "Comment", "Action"]
+    SORT_COLUMNS = ['date', 'category', 'amount', 'currency', 'type', 'comment']
+    ACTION_COLUMN = 6
+
+    load_failed = pyqtSignal(object)
+    page_loaded = pyqtSignal(int, float)  # rows, seconds spent in the query
+
+    def __init__(self, transaction_model, currency_manager, db_executor, page_size=200, parent=None):
+        super().__init__(parent)
+        self.transaction_model = transaction_model
+        self.currency_manager = currency_manager
+        self.db_executor = db_executor
+        self.page_size = page_size
+        self.filters = {}
+        self.sort_column = 'date'
+        self.descending = True
+        self._rows = []
+        self._currency_labels = {}
+        self._exhausted = False
+        self._fetching = False
+        # Edits made while a page is in flight; the page may predate them
+        self._pending_inserts = []
+        self._pending_removals = set()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.HEADERS)
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if orientation == Qt.Orientation.Horizontal and role == Qt.ItemDataRole.DisplayRole:
+            return self.HEADERS[section]
+        return None
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid() or role != Qt.ItemDataRole.DisplayRole:
+            return None
+        transaction = self._rows[index.row()]
+        column = index.column()
+        if column == 0:
+            return transaction[1]
+        if column == 1:
+            return transaction[2]
+        if column == 2:
+            return f"{transaction[3]:.2f}"
+        if column == 3:
+            return self.currency_label(transaction[6])
+        if column == 4:
+            return transaction[4]
+        if column == 5:
+            return transaction[5]
+        return "Delete"
+
+    def currency_label(self, code):
+        if code not in self._currency_labels:
+            self._currency_labels[code] = str(self.currency_manager.get_currency_by_code(code))
+        return self._currency_labels[code]
+
+    def transaction_id(self, row):
+        return self._rows[row][0]
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and not self._exhausted and not self._fetching
+
+    def fetchMore(self, parent=QModelIndex()):
+        if parent.isValid() or self._exhausted or self._fetching:
+            return
+        self._fetching = True
+        if not self._rows:
+            after_key = None
+        elif self.ranked:
+            after_key = (self._rows[-1][-1], self._rows[-1][0])
+        else:
+            after_key = transaction_sort_key(self._rows[-1], self.sort_column)
+        # A reload resubmits under the same key, so a page of stale rows is never appended
+        self.db_executor.submit(self._query_page, after_key, dict(self.filters), self.sort_column, self.descending,
+                                key='transactions_page', on_result=self._append_page,
+                                on_error=self._fetch_failed)
+
+    def _query_page(self, after_key, filters, sort_column, descending):
+        # Runs on the database thread
+        start = time.perf_counter()
+        if sort_column is None:
+            filters = dict(filters)
+            rows = self.transaction_model.search(filters.pop('search'), filters, after_key, self.page_size)
+        else:
+            rows = self.transaction_model.get_transactions_page(after_key, self.page_size, filters, sort_column,
+                                                                descending)
+        return rows, time.perf_counter() - start
+
+    @property
+    def ranked(self):
+        """True while showing search results in relevance order rather than sorted on a column."""
+        return self.sort_column is None
+
+    def _append_page(self, result):
+        rows, seconds = result
+        self._fetching = False
+        self._exhausted = len(rows) < self.page_size
+        if self._pending_removals:
+            rows = [row for row in rows if row[0] not in self._pending_removals]
+        if rows:
+            self.beginInsertRows(QModelIndex(), len(self._rows), len(self._rows) + len(rows) - 1)
+            self._rows.extend(rows)
+            self.endInsertRows()
+        self._apply_pending()
+        self.page_loaded.emit(len(rows), seconds)
+
+    def _fetch_failed(self, error):
+        self._fetching = False
+        self._apply_pending()
+        self.load_failed.emit(error)
+
+    def _apply_pending(self):
+        pending, self._pending_inserts, self._pending_removals = self._pending_inserts, [], set()
+        for transaction in pending:
+            self.insert_transaction(transaction)
+
+    def _position(self, transaction):
+        # Binary search over the loaded rows, which are in keyset order
+        key = transaction_sort_key(transaction, self.sort_column)
+        low, high = 0, len(self._rows)
+        while low < high:
+            middle = (low + high) // 2
+            middle_key = transaction_sort_key(self._rows[middle], self.sort_column)
+            if (middle_key > key) if self.descending else (middle_key < key):
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def insert_transaction(self, transaction):
+        """Show a newly added transaction without reloading the table."""
+        if not transaction_matches(transaction, self.filters):
+            return
+        if self._fetching:
+            self._pending_inserts.append(transaction)
+            return
+        if self.ranked:
+            # Its rank is only known to the database
+            self.reload()
+            return
+        position = self._position(transaction)
+        if position < len(self._rows) and self._rows[position][0] == transaction[0]:
+            return
+        if position == len(self._rows) and not self._exhausted:
+            # It sorts below the loaded pages and will arrive with a later fetch
+            return
+        self.beginInsertRows(QModelIndex(), position, position)
+        self._rows.insert(position, transaction)
+        self.endInsertRows()
+
+    def remove_transaction(self, transaction):
+        """Drop a deleted transaction from the table without reloading it."""
+        if self._fetching:
+            self._pending_removals.add(transaction[0])
+            self._pending_inserts = [t for t in self._pending_inserts if t[0] != transaction[0]]
+        if self.ranked:
+            position = next((i for i, row in enumerate(self._rows) if row[0] == transaction[0]), len(self._rows))
+        else:
+            position = self._position(transaction)
+        if position < len(self._rows) and self._rows[position][0] == transaction[0]:
+            self.beginRemoveRows(QModelIndex(), position, position)
+            del self._rows[position]
+            self.endRemoveRows()
+
+    def set_filters(self, filters):
+        """Apply a TransactionModel filter dict. A 'search' entry switches to relevance order."""
+        self.filters = filters
+        if search_tokens(filters.get('search')):
+            self.sort_column = None
+        elif self.sort_column is None:
+            self.sort_column, self.descending = 'date', True
+        self.reload()
+
+    def sort(self, column, order=Qt.SortOrder.AscendingOrder):
+        if column >= len(self.SORT_COLUMNS):
+            return
+        if column < 0:
+            # Sort indicator cleared: relevance order if searching, otherwise newest first
+            self.sort_column = None if search_tokens(self.filters.get('search')) else 'date'
+            self.descending = True
+        else:
+            self.sort_column = self.SORT_COLUMNS[column]
+            self.descending = order == Qt.SortOrder.DescendingOrder
+        self.reload()
+
+    def reload(self):
+        self.beginResetModel()
+        self._rows = []
+        self._exhausted = False
+        self._fetching = False
+        self._pending_inserts = []
+        self._pending_removals = set()
+        self.endResetModel()
+        self.fetchMore()
+
+
+class DeleteButtonDelegate(QStyledItemDelegate):
+    """Paints a push button in each cell and reports clicks, without a widget per row."""
+    delete_requested = pyqtSignal(int)  # row
+
+    def paint(self, painter, option, index):
+        button = QStyleOptionButton()
+        button.rect = option.rect.adjusted(2, 2, -2, -2)
+        button.text = index.data()
+        button.state = QStyle.StateFlag.State_Enabled
+        widget = option.widget
+        style = widget.style() if widget else QApplication.style()
+        style.drawControl(QStyle.ControlElement.CE_PushButton, button, painter, widget)
+
+    def editorEvent(self, event, model, option, index):
+        if (event.type() == QEvent.Type.MouseButtonRelease
+                and event.button() == Qt.MouseButton.LeftButton
+                and option.rect.contains(event.position().toPoint())):
+            self.delete_requested.emit(index.row())
+            return True
+        return super().editorEvent(event, model, option, index)